@@ -0,0 +1,10 @@
+"""
+Performance benchmarks for sdfbuilder. These are not part of the
+installed package; run them from the repository root, e.g.
+
+    python -m benchmarks --quick
+    python -m benchmarks world --json results.json
+    python -m benchmarks.posable
+
+See `python -m benchmarks --help` for the options.
+"""
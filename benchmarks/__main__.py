@@ -0,0 +1,60 @@
+"""
+Runs the benchmark scenarios and optionally writes the results as JSON,
+so that runs can be compared:
+
+    python -m benchmarks --quick
+    python -m benchmarks posable world --json results.json
+"""
+from __future__ import print_function
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+from . import harness
+from . import posable, inertia, render
+
+
+def main(argv=None):
+    """
+    :param argv:
+    :return:
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Runs sdfbuilder benchmarks.")
+    parser.add_argument("names", nargs="*", help="Only run scenarios whose name contains one of these")
+    parser.add_argument("--quick", action="store_true", help="Only run the first value of each parameter")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum timed seconds per case")
+    parser.add_argument("--no-isolate", action="store_true", help="Run all cases in this process")
+    parser.add_argument("--json", metavar="PATH", help="Write the results to a JSON file")
+    parser.add_argument("--list", action="store_true", help="List the scenarios and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for entry in harness.SCENARIOS:
+            print("%-30s %s" % (entry.name, entry.params))
+        return 0
+
+    results = harness.run(args.names, quick=args.quick, isolate=not args.no_isolate,
+                          min_time=args.min_time)
+
+    if args.json:
+        report = {
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'options': {'quick': args.quick, 'min_time': args.min_time,
+                        'isolate': not args.no_isolate},
+            'results': results
+        }
+
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    return 1 if any('error' in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
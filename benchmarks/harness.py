@@ -0,0 +1,272 @@
+"""
+Scenario registry and measurement for the benchmarks. A scenario is a
+function that takes its parameters as keyword arguments and returns a
+`Case`, the operation that is timed. Each parameter combination is
+measured in a fresh worker process, so the reported peak memory belongs
+to that combination alone.
+"""
+from __future__ import print_function
+from __future__ import division
+import itertools
+import multiprocessing
+import sys
+import timeit
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Registered scenarios, in order of registration
+SCENARIOS = []
+
+
+class Case(object):
+    """
+    A timed operation. If `setup` is given, it is called before every
+    call of `func` without being timed, and its result is passed to
+    `func`, e.g. to measure operations that change their input.
+    """
+
+    def __init__(self, func, setup=None):
+        """
+        :param func:
+        :type func: callable
+        :param setup:
+        :type setup: callable
+        :return:
+        """
+        self.func = func
+        self.setup = setup
+
+
+class Scenario(object):
+    """
+    A registered scenario with its parameter grid
+    """
+
+    def __init__(self, name, func, params):
+        """
+        :param name:
+        :type name: str
+        :param func: Function that creates the `Case` for a set of parameters
+        :type func: callable
+        :param params: List of values by parameter name
+        :type params: dict
+        :return:
+        """
+        self.name = name
+        self.func = func
+        self.params = params
+
+    def get_param_sets(self, quick=False):
+        """
+        :param quick: Only use the first value of each parameter
+        :type quick: bool
+        :return: All combinations of parameter values
+        :rtype: list[dict]
+        """
+        names = sorted(self.params)
+        values = [self.params[name][:1] if quick else self.params[name] for name in names]
+        return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def scenario(name, **params):
+    """
+    Decorator that registers a scenario function, the keyword
+    arguments give the lists of values for each parameter.
+    :param name:
+    :type name: str
+    :param params:
+    :return:
+    """
+    def register(func):
+        SCENARIOS.append(Scenario(name, func, params))
+        return func
+
+    return register
+
+
+def percentile(values, fraction):
+    """
+    :param values: Sorted list of values
+    :param fraction: Between 0 and 1
+    :return: Linearly interpolated percentile of the values
+    :rtype: float
+    """
+    position = fraction * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def get_peak_memory():
+    """
+    :return: Peak resident memory of the current process in kilobytes,
+             or `None` where this is not available.
+    :rtype: int
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(case, min_time=0.5, min_samples=5, max_samples=10000, warmup=1):
+    """
+    Times single calls of a case until both `min_time` seconds of calls
+    and `min_samples` calls have been timed.
+    :param case:
+    :type case: Case
+    :param min_time:
+    :param min_samples:
+    :param max_samples:
+    :param warmup: Number of untimed calls first
+    :return: Statistics of the call latencies in seconds
+    :rtype: dict
+    """
+    timer = timeit.default_timer
+    setup = case.setup
+    func = case.func
+
+    for _ in range(warmup):
+        func(setup() if setup else None)
+
+    samples = []
+    total = 0.0
+    while len(samples) < max_samples and (total < min_time or len(samples) < min_samples):
+        state = setup() if setup else None
+        start = timer()
+        func(state)
+        elapsed = timer() - start
+        samples.append(elapsed)
+        total += elapsed
+
+    samples.sort()
+    return {
+        'samples': len(samples),
+        'total': total,
+        'mean': total / len(samples),
+        'min': samples[0],
+        'p50': percentile(samples, 0.5),
+        'p90': percentile(samples, 0.9),
+        'p99': percentile(samples, 0.99),
+        'max': samples[-1],
+        'throughput': len(samples) / total if total else None
+    }
+
+
+def run_case(entry, params, options):
+    """
+    Creates and measures the case of a scenario for one set of parameters.
+    :param entry:
+    :type entry: Scenario
+    :param params:
+    :type params: dict
+    :param options: Keyword arguments for `measure`
+    :type options: dict
+    :return: Result dictionary
+    :rtype: dict
+    """
+    baseline = get_peak_memory()
+    start = timeit.default_timer()
+    case = entry.func(**params)
+    setup_time = timeit.default_timer() - start
+
+    result = {
+        'scenario': entry.name,
+        'params': params,
+        'setup_time': setup_time
+    }
+    result.update(measure(case, **options))
+    result['baseline_rss_kb'] = baseline
+    result['peak_rss_kb'] = get_peak_memory()
+    return result
+
+
+def _run_child(connection, index, params, options):
+    """
+    Worker process entry point.
+    :return:
+    """
+    try:
+        connection.send(run_case(SCENARIOS[index], params, options))
+    except Exception as e:
+        connection.send({'scenario': SCENARIOS[index].name, 'params': params,
+                         'error': "%s: %s" % (type(e).__name__, e)})
+    finally:
+        connection.close()
+
+
+def run_isolated(entry, params, options):
+    """
+    Runs `run_case` in a new process, so the peak memory is that of
+    this case alone. The scenario needs to be registered.
+    :param entry:
+    :param params:
+    :param options:
+    :return:
+    """
+    receiver, sender = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(target=_run_child, args=(
+        sender, SCENARIOS.index(entry), params, options))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {'scenario': entry.name, 'params': params,
+                  'error': "Worker exited with code %s" % process.exitcode}
+
+    process.join()
+    return result
+
+
+def run(names=None, quick=False, isolate=True, report=print, **options):
+    """
+    Runs the registered scenarios.
+    :param names: Substrings of the scenario names to run, all if not given
+    :type names: list
+    :param quick: Only run the first value of each parameter
+    :type quick: bool
+    :param isolate: Run each case in a separate process
+    :type isolate: bool
+    :param report: Called with a line of text for every result
+    :param options: Keyword arguments for `measure`
+    :return: List of result dictionaries
+    :rtype: list
+    """
+    results = []
+    for entry in SCENARIOS:
+        if names and not any(name in entry.name for name in names):
+            continue
+
+        for params in entry.get_param_sets(quick):
+            if isolate:
+                result = run_isolated(entry, params, options)
+            else:
+                result = run_case(entry, params, options)
+
+            results.append(result)
+            if report:
+                report(format_result(result))
+
+    return results
+
+
+def format_result(result):
+    """
+    :param result:
+    :return: A table row for a result
+    :rtype: str
+    """
+    params = ",".join("%s=%s" % item for item in sorted(result['params'].items()))
+    label = "%s(%s)" % (result['scenario'], params)
+    if 'error' in result:
+        return "%-45s ERROR %s" % (label, result['error'])
+
+    memory = "%8.1f MB" % (result['peak_rss_kb'] / 1024) if result['peak_rss_kb'] is not None else "%11s" % "-"
+    return "%-45s %10.1f us  p90 %10.1f us  p99 %10.1f us  %9.1f/s %s" % (
+        label, result['p50'] * 1e6, result['p90'] * 1e6, result['p99'] * 1e6,
+        result['throughput'], memory)
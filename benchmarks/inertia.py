@@ -0,0 +1,57 @@
+"""
+Benchmarks for inertia calculation on wide links, i.e. links that
+hold many collision elements.
+"""
+from __future__ import print_function
+from sdfbuilder import Link
+from sdfbuilder.math import Vector3
+from .harness import Case, scenario, run
+
+
+def make_wide_link(collisions=100):
+    """
+    :param collisions: Number of box collisions
+    :return: A link with rotated boxes spread over a grid, with its
+             center of mass aligned to the link frame.
+    """
+    link = Link("wide_link")
+    for i in range(collisions):
+        box = link.make_box(0.1 + 0.01 * (i % 7), 0.1, 0.2, 0.05, visual=False,
+                            inertia=False, name_prefix="box_%d_" % i)[0]
+        box.set_position(Vector3(0.3 * (i % 10), 0.3 * (i // 10 % 10), 0.3 * (i // 100)))
+        box.rotate_around(Vector3(1, 1, 0), 0.1 * i)
+
+    link.align_center_of_mass()
+    return link
+
+
+@scenario("wide_link.build", collisions=[100, 1000])
+def wide_link_build(collisions):
+    """
+    Construction of a wide link, including aligning its center of mass.
+    """
+    return Case(lambda _: make_wide_link(collisions))
+
+
+@scenario("wide_link.center_of_mass", collisions=[100, 1000])
+def wide_link_center_of_mass(collisions):
+    """
+    :param collisions:
+    :return:
+    """
+    link = make_wide_link(collisions)
+    return Case(lambda _: link.get_center_of_mass())
+
+
+@scenario("wide_link.calculate_inertial", collisions=[100, 1000])
+def wide_link_calculate_inertial(collisions):
+    """
+    :param collisions:
+    :return:
+    """
+    link = make_wide_link(collisions)
+    return Case(lambda _: link.calculate_inertial())
+
+
+if __name__ == '__main__':
+    run(["wide_link"])
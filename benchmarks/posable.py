@@ -0,0 +1,125 @@
+"""
+Micro benchmarks for posable alignment and group rotation, which are
+dominated by the small vector / quaternion math objects.
+"""
+from __future__ import print_function
+import itertools
+from sdfbuilder import Link, PosableGroup
+from sdfbuilder.math import Vector3, Quaternion
+from .harness import Case, scenario, run
+
+
+def make_align_pair():
+    """
+    :return: Two box links, the second to be aligned to the first
+    """
+    link1 = Link("box1")
+    link1.make_box(1.0, 0.1, 0.3, 0.5)
+    link1.rotate_around(Vector3(1, 1, 0), 0.3)
+
+    link2 = Link("box2")
+    link2.make_box(1.0, 0.1, 0.3, 0.5)
+    return link1, link2
+
+
+def bench_align(link1, link2):
+    """
+    Aligns the top of `link2` with the front of `link1`.
+    """
+    link2.align(
+        Vector3(0, 0, 0.25),
+        Vector3(0, 0, -1),
+        Vector3(1, 0, 0),
+
+        Vector3(0, -0.15, 0),
+        Vector3(0, 1, 0),
+        Vector3(0, 0, 1),
+
+        link1
+    )
+
+
+def make_group(size=100):
+    """
+    :param size: Number of links in the group
+    :return: A group of translated and rotated links
+    """
+    group = PosableGroup()
+    for i in range(size):
+        link = Link("link_%d" % i)
+        link.translate(Vector3(i, 0.5 * i, 0))
+        link.rotate_around(Vector3(0, 0, 1), 0.01 * i)
+        group.add_element(link)
+
+    return group
+
+
+def bench_group_rotation(group, angle):
+    """
+    Rotates the group to the given angle around a fixed axis.
+    """
+    group.set_rotation(Quaternion.from_angle_axis(angle, Vector3(1, 1, 0)))
+
+
+def make_nested_groups(depth=10, lazy=False):
+    """
+    :param depth: Number of nested groups
+    :param lazy: Create lazy groups
+    :return: The outer group and the link in the innermost group
+    """
+    outer = group = PosableGroup(lazy=lazy)
+    link = None
+    for i in range(depth):
+        link = Link("link_%d" % i)
+        link.translate(Vector3(0.1, 0, 0.2))
+        link.rotate_around(Vector3(0, 1, 0), 0.05 * i)
+        inner = PosableGroup(lazy=lazy)
+        inner.translate(Vector3(0, 0.1, 0))
+        group.add_element(link)
+        group.add_element(inner)
+        group = inner
+
+    return outer, link
+
+
+@scenario("posable.align")
+def align_scenario():
+    """
+    :return:
+    """
+    link1, link2 = make_align_pair()
+    return Case(lambda _: bench_align(link1, link2))
+
+
+@scenario("posable.group_rotation", size=[100, 1000])
+def group_rotation_scenario(size):
+    """
+    :param size:
+    :return:
+    """
+    group = make_group(size)
+    angles = itertools.count(0.01, 0.01)
+    return Case(lambda _: bench_group_rotation(group, next(angles)))
+
+
+@scenario("posable.deep_nesting", depth=[10, 50], lazy=[False, True])
+def deep_nesting_scenario(depth, lazy):
+    """
+    Rotates the outer group of deeply nested groups, and
+    gets the world pose of the innermost link.
+    :param depth:
+    :param lazy:
+    :return:
+    """
+    group, link = make_nested_groups(depth, lazy)
+    angles = itertools.count(0.01, 0.01)
+
+    def rotate_nested(_):
+        bench_group_rotation(group, next(angles))
+        return link.get_world_pose()
+
+    return Case(rotate_nested)
+
+
+if __name__ == '__main__':
+    run(["posable"])
@@ -0,0 +1,172 @@
+"""
+Benchmarks for building and rendering large models and worlds. The
+models follow the pattern of `sdfbuilder/examples/features.py`, with
+a chain of box / cylinder segments connected by wheel joints.
+"""
+from __future__ import print_function
+import math
+from sdfbuilder import Element, SDF, Model, Link, PosableGroup
+from sdfbuilder.structure import Box, Cylinder, Collision, Visual, StructureCombination
+from sdfbuilder.joint import Joint
+from sdfbuilder.math import Vector3
+from sdfbuilder.util import set_number_format, get_number_format
+from .harness import Case, scenario, run
+
+
+class NullStream(object):
+    """
+    Stream that discards everything written to it.
+    """
+
+    def write(self, data):
+        """
+        :param data:
+        :return:
+        """
+        pass
+
+
+def make_segment(name):
+    """
+    :param name:
+    :return: A link with a box and a cylinder on top, and
+             a wheel link aligned to it.
+    """
+    box_geom = Box(1.0, 1.0, 1.0, mass=0.5)
+    box = PosableGroup(elements=[Collision("box_collision", box_geom),
+                                 Visual("box_visual", box_geom.copy())])
+
+    cyl_geom = Cylinder(radius=0.25, length=0.5, mass=0.1)
+    cylinder = StructureCombination("cylinder", cyl_geom)
+    cylinder.align(Vector3(0, 0, -0.5 * cyl_geom.length), Vector3(0, 0, -1), Vector3(0, 1, 0),
+                   Vector3(0, 0, 0.5 * box_geom.size[2]), Vector3(0, 0, 1), Vector3(0, 1, 0),
+                   box)
+
+    link = Link(name, elements=[box, cylinder])
+    link.align_center_of_mass()
+    link.calculate_inertial()
+    link.rotate_around(Vector3(1, 0, 0), math.radians(45), relative_to_child=False)
+
+    wheel_geom = Cylinder(0.75, 0.1, mass=0.1)
+    wheel_link = Link(name + "_wheel", elements=[StructureCombination("wheel", wheel_geom)])
+    attachment_point = Vector3(0, 0, 0.5 * wheel_geom.length)
+    wheel_link.align(attachment_point, Vector3(0, 0, 1), Vector3(0, 1, 0),
+                     Vector3(0, 0, 0.5 * box_geom.size[0] + cyl_geom.length),
+                     Vector3(0, 0, 1), Vector3(1, 0, 0), link)
+
+    joint = Joint("revolute", link, wheel_link, axis=Vector3(0, 0, 1))
+    joint.set_position(attachment_point)
+    return link, wheel_link, joint
+
+
+def make_robot(name="robot", segments=10):
+    """
+    :param name:
+    :param segments: Number of segments, each has two links and a joint
+    :return: A model with a chain of segments
+    """
+    model = Model(name)
+    previous = None
+    for i in range(segments):
+        link, wheel_link, joint = make_segment("segment_%d" % i)
+        if previous is not None:
+            link.align(Vector3(-0.5, 0, 0), Vector3(-1, 0, 0), Vector3(0, 0, 1),
+                       Vector3(0.5, 0, 0), Vector3(1, 0, 0), Vector3(0, 0, 1),
+                       previous)
+            model.add_element(Joint("revolute", previous, link, axis=Vector3(0, 1, 0),
+                                    name="segment_joint_%d" % i))
+
+        model.add_elements([link, wheel_link, joint])
+        previous = link
+
+    model.set_position(Vector3(0, 0, math.sqrt(0.5)))
+    return model
+
+
+def make_world(models=100, segments=2):
+    """
+    :param models: Number of robots in the world
+    :param segments: Number of segments of each robot
+    :return: An SDF element with a world of robots on a grid
+    """
+    robot = make_robot(segments=segments)
+    world = Element(tag_name="world", attributes={"name": "default"})
+    for i in range(models):
+        model = robot.copy()
+        model.name = "robot_%d" % i
+        model.translate(Vector3(5 * (i % 20), 5 * (i // 20), 0))
+        world.add_element(model)
+
+    return SDF(elements=[world])
+
+
+def discard_renders():
+    """
+    Resetting the number format makes all cached renders stale,
+    so the next render is a cold one.
+    :return:
+    """
+    set_number_format(*get_number_format())
+
+
+@scenario("robot.build", segments=[10, 100])
+def robot_build(segments):
+    """
+    Construction of a robot, including alignment and inertia.
+    """
+    return Case(lambda _: make_robot(segments=segments))
+
+
+@scenario("robot.render", segments=[10, 100])
+def robot_render(segments):
+    """
+    Cold render of a newly built robot.
+    """
+    return Case(lambda sdf: str(sdf), lambda: SDF(elements=[make_robot(segments=segments)]))
+
+
+@scenario("world.build", models=[100, 1000])
+def world_build(models):
+    """
+    :param models:
+    :return:
+    """
+    return Case(lambda _: make_world(models))
+
+
+@scenario("world.render", models=[100, 1000])
+def world_render(models):
+    """
+    Render of a big world, with the cached renders discarded.
+    """
+    sdf = make_world(models)
+    return Case(lambda _: str(sdf), discard_renders)
+
+
+@scenario("world.render_cached", models=[100, 1000])
+def world_render_cached(models):
+    """
+    Render of a big world after changing one of its models.
+    """
+    sdf = make_world(models)
+    model = sdf.elements[0].elements[0]
+
+    def render_changed(_):
+        model.translate(Vector3(0, 0, 0.01))
+        return str(sdf)
+
+    return Case(render_changed)
+
+
+@scenario("world.write", models=[100, 1000])
+def world_write(models):
+    """
+    Streaming a big world, with the cached renders discarded.
+    """
+    sdf = make_world(models)
+    stream = NullStream()
+    return Case(lambda _: sdf.write(stream), discard_renders)
+
+
+if __name__ == '__main__':
+    run(["robot", "world"])
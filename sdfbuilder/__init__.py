@@ -3,4 +3,5 @@ from .model import Model
 from .link import Link
 from .posable import Pose, Posable, PosableGroup
 from .sdf import SDF
-from .joint import Joint, FixedJoint, Axis, Limit
\ No newline at end of file
+from .joint import Joint, FixedJoint, Axis, Limit
+from .parallel import render_many
\ No newline at end of file
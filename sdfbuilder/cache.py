@@ -0,0 +1,576 @@
+"""
+Content addressed on-disk cache for rendered SDF, which can be shared
+between runs and processes. Entries are keyed by a stable hash of either
+an element tree or a builder function and its arguments; in the latter
+case a cache hit skips building the tree altogether.
+
+The cache directory is bounded in size, the least recently used entries
+are removed when it grows too large. Entries are written atomically, so
+readers never see partially written files.
+
+Keys include the source of sdfbuilder itself, so entries rendered by
+another version of the package are not used.
+"""
+from __future__ import absolute_import
+import os
+import errno
+import types
+import hashlib
+import tempfile
+import numpy as np
+from .element import Element
+from .math import Transform
+from .util import get_number_format
+
+# Part of every key, change this when the key format changes
+KEY_VERSION = 3
+
+# Default maximum size of a cache directory, in bytes
+DEFAULT_MAX_SIZE = 1 << 30
+
+# Fraction of the maximum size the cache is reduced to when
+# it has grown too large, so eviction is not needed on every write.
+EVICT_TO = 0.8
+
+_EXTENSION = '.sdf'
+
+# Digest of the source of this package, `None` until it is calculated
+_source_digest = None
+
+# Permissions of new entries before the umask is applied
+_MODE = 0o666
+
+# Process umask, `None` until it is read
+_umask = None
+
+
+# Types of values written by their repr
+_SCALARS = frozenset([bool, int, long, float, str, unicode, type(None)])
+
+# Types of values written by their qualified name
+_NAMED = (type, types.ClassType, types.BuiltinFunctionType)
+
+
+class _KeyHasher(object):
+    """
+    Feeds a stable representation of values and element trees to a hash.
+    Elements passed as values and their children are written inline.
+    Other elements that are referenced from the state of an element are
+    written by their name if they have one (such as the links of a
+    joint), or by the digest of their content.
+
+    Functions are written with their code, default arguments, closure
+    and the globals they use. Classes and modules are written by name.
+    Values of other types cannot be hashed reliably, and raise a
+    `ValueError`.
+    """
+
+    def __init__(self):
+        self.hash = hashlib.sha256()
+        self.parts = []
+
+        # Digests of referenced elements by id,
+        # `None` while an element is being hashed.
+        self.memo = {}
+
+        # Ids of the functions that are being hashed
+        self.functions = set()
+
+        # Whether elements are referenced from the state of an
+        # element that is being written, rather than passed as values.
+        self.referenced = False
+
+    def hexdigest(self):
+        """
+        :return:
+        """
+        self.flush()
+        return self.hash.hexdigest()
+
+    def flush(self):
+        """
+        Feeds the collected parts to the hash.
+        :return:
+        """
+        self.hash.update("".join(self.parts))
+        del self.parts[:]
+
+    def update(self, value):
+        """
+        :param value:
+        :return:
+        """
+        write = self.parts.append
+        cls = type(value)
+        if cls in _SCALARS:
+            write('%r,' % (value,))
+        elif isinstance(value, np.generic):
+            # Numpy scalars
+            write('%s:%r,' % (cls.__name__, value.item()))
+        elif isinstance(value, Element):
+            if not self.referenced:
+                self.update_element(value)
+                return
+
+            name = value.__dict__.get('name')
+            if name is None:
+                write('R%s,' % self.element_digest(value))
+            else:
+                # Referenced by name, like the links of a joint
+                write('N%s.%s%r,' % (value.__class__.__module__, value.__class__.__name__, name))
+        elif isinstance(value, types.FunctionType):
+            self.update_function(value)
+        elif isinstance(value, types.ModuleType):
+            write('M%s,' % value.__name__)
+        elif isinstance(value, _NAMED):
+            write('C%s.%s,' % (getattr(value, '__module__', None), value.__name__))
+        elif isinstance(value, Transform):
+            self.update(('transform', value.position, value.rotation))
+        elif isinstance(value, dict):
+            write('d%d(' % len(value))
+            for key in sorted(value):
+                self.update(key)
+                self.update(value[key])
+
+            write(')')
+        elif hasattr(value, '__iter__'):
+            # Lists, tuples, vectors, arrays, ...
+            items = tuple(value)
+            if all(type(item) in _SCALARS for item in items):
+                write('%s.%s%r,' % (cls.__module__, cls.__name__, items))
+                return
+
+            write('%s.%s%d(' % (cls.__module__, cls.__name__, len(items)))
+            for item in items:
+                self.update(item)
+
+            write(')')
+        else:
+            raise ValueError("Cannot create a cache key for value of type '%s'." % cls.__name__)
+
+    def update_element(self, element):
+        """
+        Writes the class and state of an element, with its children inline.
+        :param element:
+        :type element: Element
+        :return:
+        """
+        element._materialize()
+        cls = element.__class__
+        write = self.parts.append
+        write('%s.%s(' % (cls.__module__, cls.__name__))
+
+        referenced = self.referenced
+        self.referenced = True
+
+        state = element.__dict__
+        skip = element.CACHE_ATTRIBUTES
+        children = element.CHILD_ATTRIBUTES
+        for name in sorted(state):
+            if name in skip:
+                continue
+
+            write(';' + name)
+            value = state[name]
+            if name == 'elements':
+                write('[%d' % len(value))
+                for child in value:
+                    if isinstance(child, Element):
+                        self.update_element(child)
+                    else:
+                        self.update(child)
+
+                write(']')
+            elif name in children and isinstance(value, Element):
+                self.update_element(value)
+            elif type(value) in _SCALARS:
+                write('%r,' % (value,))
+            else:
+                self.update(value)
+
+        write(')')
+        self.referenced = referenced
+        if len(self.parts) > 8192:
+            self.flush()
+
+    def update_function(self, func):
+        """
+        Writes the name, code, default arguments, closure and used
+        globals of a function. Functions that are being written are
+        written by name, so recursion ends.
+        :param func:
+        :type func: function
+        :return:
+        """
+        write = self.parts.append
+        write('F%s.%s' % (func.__module__, func.__name__))
+        if id(func) in self.functions:
+            write(',')
+            return
+
+        self.functions.add(id(func))
+        write('(')
+        code = func.__code__
+        self.update_code(code)
+        self.update(func.__defaults__)
+        self.update(getattr(func, '__kwdefaults__', None))
+        self.update(tuple(cell.cell_contents for cell in func.__closure__ or ()))
+
+        func_globals = func.__globals__
+        names = sorted(name for name in _get_names(code) if name in func_globals)
+        self.update(dict((name, func_globals[name]) for name in names))
+        write(')')
+        self.functions.discard(id(func))
+
+    def update_code(self, code):
+        """
+        Writes a code object and the code objects nested in it.
+        :param code:
+        :return:
+        """
+        write = self.parts.append
+        write('K%r%r%r%d(' % (code.co_code, code.co_names, code.co_varnames, code.co_argcount))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                self.update_code(const)
+            else:
+                self.update(const)
+
+        write(')')
+
+    def element_digest(self, element):
+        """
+        :param element:
+        :type element: Element
+        :return: Digest of a referenced element
+        :rtype: str
+        """
+        digest = self.memo.get(id(element), False)
+        if digest is None:
+            raise ValueError("Cannot create a cache key for an element that references itself.")
+        elif digest:
+            return digest
+
+        self.memo[id(element)] = None
+        outer = self.hash, self.parts
+        self.hash, self.parts = hashlib.sha256(), []
+        self.update_element(element)
+        digest = self.hexdigest()
+        self.hash, self.parts = outer
+        self.memo[id(element)] = digest
+        return digest
+
+
+def _get_names(code):
+    """
+    :param code:
+    :return: The global and attribute names used by a code object
+             and the code objects nested in it.
+    :rtype: set
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _get_names(const)
+
+    return names
+
+
+def _get_source_digest():
+    """
+    Returns a digest of the source files of this package. It is part of
+    every key, so entries rendered by another version of the package
+    are not used.
+    :return:
+    :rtype: str
+    """
+    global _source_digest
+    if _source_digest is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        paths = []
+        for directory, _, names in os.walk(root):
+            paths.extend(os.path.join(directory, name) for name in names if name.endswith('.py'))
+
+        digest = hashlib.sha256()
+        for path in sorted(paths):
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            digest.update('%s\0%d\0' % (os.path.relpath(path, root).replace(os.sep, '/'), len(data)))
+            digest.update(data)
+
+        _source_digest = digest.hexdigest()
+
+    return _source_digest
+
+
+def _get_umask():
+    """
+    :return: The umask of this process, which can only be read by setting it
+    :rtype: int
+    """
+    global _umask
+    if _umask is None:
+        _umask = os.umask(0o022)
+        os.umask(_umask)
+
+    return _umask
+
+
+def element_key(element):
+    """
+    Returns a key for the rendered SDF of an element tree, which is the
+    same for identical trees in other processes using the same version of
+    sdfbuilder. Changes made to the tree in place without invalidation
+    are included.
+    :param element:
+    :type element: Element
+    :return: Hexadecimal key
+    :rtype: str
+    """
+    hasher = _KeyHasher()
+    hasher.update(('element', KEY_VERSION, _get_source_digest(), get_number_format()))
+    hasher.update_element(element)
+    return hasher.hexdigest()
+
+
+def call_key(func, args=(), kwargs=None):
+    """
+    Returns a key for the rendered SDF of the tree that `func(*args, **kwargs)`
+    returns. The key includes the code of the function and of the functions
+    it uses through its globals and closure, along with the values of these,
+    and the source of sdfbuilder itself. The code of other classes and
+    modules is not included, so clear the cache when that changes.
+    :param func:
+    :type func: callable
+    :param args:
+    :type args: tuple
+    :param kwargs:
+    :type kwargs: dict
+    :return: Hexadecimal key
+    :rtype: str
+    :raises ValueError: If the function or arguments cannot be hashed reliably
+    """
+    hasher = _KeyHasher()
+    hasher.update(('call', KEY_VERSION, _get_source_digest(), get_number_format()))
+    if isinstance(func, (types.FunctionType, types.ModuleType) + _NAMED):
+        hasher.update(func)
+    else:
+        raise ValueError("Cannot create a cache key for callable '%r'." % (func,))
+
+    hasher.update(tuple(args))
+    hasher.update(kwargs or {})
+    return hasher.hexdigest()
+
+
+class RenderCache(object):
+    """
+    Directory of rendered SDF documents by key.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param directory: Cache directory, created if it does not exist
+        :type directory: str
+        :param max_size: Maximum total size of the cached documents in bytes,
+                         `None` for no limit.
+        :type max_size: int
+        :return:
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+        # Approximate total size of the cache, `None` until it is counted
+        self._size = None
+
+    def _path(self, key):
+        """
+        :param key:
+        :return: Path of the entry for a key
+        """
+        return os.path.join(self.directory, key[:2], key + _EXTENSION)
+
+    def get(self, key):
+        """
+        :param key:
+        :type key: str
+        :return: The cached document for a key, or `None`
+        :rtype: str
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            # Mark as recently used
+            os.utime(path, None)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+            return None
+
+        return data
+
+    def put(self, key, data):
+        """
+        Stores a document, replacing any existing entry atomically.
+        :param key:
+        :type key: str
+        :param data:
+        :type data: str
+        :return:
+        """
+        path = self._path(key)
+        shard = os.path.dirname(path)
+        try:
+            os.makedirs(shard)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        # Temporary files start with a dot, so they are not counted as entries
+        fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=shard)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+
+            # Temporary files are only readable by their owner, entries
+            # get the usual permissions so the cache can be shared.
+            os.chmod(tmp_path, _MODE & ~_get_umask())
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # The entry exists on platforms where rename does
+                # not replace; it was written by someone else.
+                if not os.path.exists(path):
+                    raise
+
+                os.remove(tmp_path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            raise
+
+        if self.max_size is not None:
+            if self._size is None:
+                self.evict()
+            else:
+                self._size += len(data)
+                if self._size > self.max_size:
+                    self.evict()
+
+    def render(self, element):
+        """
+        Returns the rendered element, from the cache if possible. Note
+        that creating the key walks the whole tree, so use `build` to
+        also skip building the tree.
+        :param element:
+        :type element: Element
+        :return:
+        :rtype: str
+        """
+        key = element_key(element)
+        data = self.get(key)
+        if data is None:
+            data = str(element)
+            self.put(key, data)
+
+        return data
+
+    def build(self, func, *args, **kwargs):
+        """
+        Returns the rendered result of `func(*args, **kwargs)`, without
+        calling `func` if the result is in the cache. `func` should
+        return an element and depend only on its arguments, globals
+        and closure. If these cannot be hashed, the result is rendered
+        without using the cache.
+        :param func:
+        :param args:
+        :param kwargs:
+        :return:
+        :rtype: str
+        """
+        try:
+            key = call_key(func, args, kwargs)
+        except ValueError:
+            return str(func(*args, **kwargs))
+
+        data = self.get(key)
+        if data is None:
+            data = str(func(*args, **kwargs))
+            self.put(key, data)
+
+        return data
+
+    def _entries(self):
+        """
+        :return: List of `(last used, size, path)` for all entries
+        :rtype: list
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith('.') or not name.endswith(_EXTENSION):
+                    continue
+
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Removed by another process
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def get_size(self):
+        """
+        :return: The total size of the cached documents in bytes
+        :rtype: int
+        """
+        return sum(entry[1] for entry in self._entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries if the cache is larger
+        than its maximum size.
+        :return: The number of removed entries
+        :rtype: int
+        """
+        entries = self._entries()
+        size = sum(entry[1] for entry in entries)
+        removed = 0
+
+        if self.max_size is not None and size > self.max_size:
+            entries.sort()
+            target = EVICT_TO * self.max_size
+            for _, entry_size, path in entries:
+                if size <= target:
+                    break
+
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+                size -= entry_size
+                removed += 1
+
+        self._size = size
+        return removed
+
+    def clear(self):
+        """
+        Removes all entries.
+        :return:
+        """
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        self._size = 0
@@ -2,9 +2,272 @@
 Basic SDF builder element.
 """
 from xml.sax.saxutils import quoteattr
-from .util import number_format as nf
+from .util import number_format as nf, get_format_generation
+from .math import Transform
+import weakref
 import copy
 
+# Version counter that is incremented on every change to any element,
+# used to validate caches that depend on other parts of the tree.
+_tree_version = 0
+
+# Transform of the root frame
+_IDENTITY = Transform()
+
+# Copy-on-write clones that have not been materialized yet
+_pending_clones = weakref.WeakSet()
+
+# Functions called with the root element before an element tree
+# is rendered, and the depth of the current render.
+_render_passes = []
+_render_depth = 0
+
+
+def get_tree_version():
+    """
+    :return: The current version of all element trees
+    :rtype: int
+    """
+    return _tree_version
+
+
+def add_render_pass(func):
+    """
+    Registers a function that is called with the root element
+    before an element tree is rendered or written, for instance to
+    prepare data for all elements in the tree at once.
+    :param func:
+    :return:
+    """
+    _render_passes.append(func)
+
+
+def _run_render_passes(root):
+    """
+    Runs the render passes if `root` is the root of the current render,
+    and returns whether it is.
+    :param root:
+    :return:
+    :rtype: bool
+    """
+    global _render_depth
+    is_root = not _render_depth
+    if is_root:
+        for func in _render_passes:
+            func(root)
+
+    _render_depth += 1
+    return is_root
+
+
+def _end_render():
+    """
+    Counterpart of `_run_render_passes`.
+    :return:
+    """
+    global _render_depth
+    _render_depth -= 1
+
+
+def _clone_value(value, memo, source, clone):
+    """
+    Copies an attribute value of `source` for its copy-on-write
+    clone `clone`. Elements are replaced by (shared) lazy clones,
+    containers are copied and other values are deep copied.
+    :param value:
+    :param memo: Dictionary of lazy clones by id of their source
+    :param source:
+    :param clone:
+    :return:
+    """
+    if isinstance(value, Element):
+        el_clone = memo.get(id(value))
+        if el_clone is None:
+            el_clone = value._lazy_clone(memo)
+        elif '_cow_source' not in el_clone.__dict__:
+            # A child shared with an element that was materialized
+            # earlier may have changed since.
+            clone.__dict__['_render_cache'] = None
+
+        if value.get_parent() is source:
+            el_clone._parent = weakref.ref(clone)
+        elif source in (value._shared_parents or ()):
+            el_clone._add_shared_parent(clone)
+
+        return el_clone
+    elif isinstance(value, list):
+        return [_clone_value(v, memo, source, clone) for v in value]
+    elif isinstance(value, tuple):
+        return tuple(_clone_value(v, memo, source, clone) for v in value)
+    elif isinstance(value, dict):
+        return dict((k, _clone_value(v, memo, source, clone)) for k, v in value.items())
+    elif isinstance(value, (basestring, int, long, float, bool, type(None))):
+        return value
+
+    return copy.deepcopy(value)
+
+
+def _defining_class(cls, name):
+    """
+    Returns the class in the MRO of `cls` that defines
+    the attribute `name`.
+    :param cls:
+    :param name:
+    :return:
+    """
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass
+
+    return None
+
+
+def _streamable(element, render_method, write_method):
+    """
+    Returns whether `write_method` can be used to produce the output
+    of `render_method` for the given element, i.e. whether the render
+    method has not been overridden below the class that provides
+    the write method.
+    :param element:
+    :param render_method:
+    :param write_method:
+    :return:
+    :rtype: bool
+    """
+    cls = element.__class__
+    render_cls = _defining_class(cls, render_method)
+    write_cls = _defining_class(cls, write_method)
+    return render_cls is write_cls or not issubclass(render_cls, write_cls)
+
+
+class _TagWriter(object):
+    """
+    Stream wrapper that delays writing an opening tag until the
+    first non-empty write, so we can still decide to render a
+    self-closing tag for elements with an empty body.
+    """
+
+    def __init__(self, stream, tag_open):
+        """
+        :param stream:
+        :param tag_open: The opening tag to write before the first data
+        :type tag_open: str
+        """
+        self.stream = stream
+        self.tag_open = tag_open
+        self.opened = False
+
+    def write(self, data):
+        """
+        :param data:
+        :type data: str
+        :return:
+        """
+        if not data:
+            return
+
+        if not self.opened:
+            self.stream.write(self.tag_open)
+            self.opened = True
+
+        self.stream.write(data)
+
+
+class ElementList(list):
+    """
+    The list of child elements of an element. Changing the list in place
+    adopts and releases the elements that are added and removed, and
+    invalidates the element, just like `add_element(s)` and
+    `remove_elements` do.
+    """
+    __slots__ = ('_owner',)
+
+    def __init__(self, owner, elements=()):
+        """
+        :param owner: The element this is the list of child elements of
+        :type owner: Element
+        :param elements:
+        :return:
+        """
+        super(ElementList, self).__init__(elements)
+        self._owner = weakref.ref(owner)
+
+    def __reduce_ex__(self, protocol):
+        """
+        Copies and pickles are plain lists, the element they
+        are assigned to becomes their owner.
+        :param protocol:
+        :return:
+        """
+        return list, (list(self),)
+
+    def _change(self, method, args, added=(), removed=()):
+        """
+        Changes the list with a method of `list`, and lets the owner
+        know which elements were added and removed.
+        :param method:
+        :param args:
+        :param added:
+        :param removed:
+        :return: The result of the method
+        """
+        owner = self._owner()
+        if owner is None:
+            return method(self, *args)
+
+        owner._before_change()
+        result = method(self, *args)
+        owner._elements_changed(added, removed)
+        return result
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            return self._change(list.__setitem__, (index, value), value, self[index])
+
+        return self._change(list.__setitem__, (index, value), [value], [self[index]])
+
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        return self._change(list.__delitem__, (index,), removed=removed)
+
+    def __setslice__(self, i, j, sequence):
+        sequence = list(sequence)
+        return self._change(list.__setslice__, (i, j, sequence), sequence, self[i:j])
+
+    def __delslice__(self, i, j):
+        return self._change(list.__delslice__, (i, j), removed=self[i:j])
+
+    def __iadd__(self, elements):
+        self.extend(elements)
+        return self
+
+    def __imul__(self, n):
+        self._change(list.__imul__, (n,), removed=list(self) if n <= 0 else ())
+        return self
+
+    def append(self, element):
+        return self._change(list.append, (element,), [element])
+
+    def extend(self, elements):
+        elements = list(elements)
+        return self._change(list.extend, (elements,), elements)
+
+    def insert(self, index, element):
+        return self._change(list.insert, (index, element), [element])
+
+    def pop(self, index=-1):
+        return self._change(list.pop, (index,), removed=[self[index]])
+
+    def remove(self, element):
+        return self._change(list.remove, (element,), removed=[self[self.index(element)]])
+
+    def reverse(self):
+        return self._change(list.reverse, ())
+
+    def sort(self, *args, **kwargs):
+        return self._change(lambda elements: list.sort(elements, *args, **kwargs), ())
+
 
 class Element(object):
     """
@@ -17,6 +280,60 @@ class Element(object):
     """
     TAG_NAME = None
 
+    """
+    Names of attributes that hold a child element which is rendered
+    as part of this element, but is not part of `elements`. Child
+    elements assigned to these attributes get this element as their
+    parent, so changes to them invalidate this element's render.
+    """
+    CHILD_ATTRIBUTES = ()
+
+    """
+    Names of attributes that only hold cached / bookkeeping data, setting
+    these does not invalidate the element.
+    """
+    CACHE_ATTRIBUTES = frozenset(['_parent', '_render_cache', '_type_index', '_name_index',
+                                  '_subtree_types', '_subtree_names', '_cow_source', '_cow_memo',
+                                  '_cow_clones', '_frozen', '_intern_key', '_shared_parents'])
+
+    """
+    Whether the rendered output of this element may be cached. Disable
+    this in subclasses whose output depends on state outside of their
+    own subtree.
+    """
+    CACHE_RENDER = True
+
+    """
+    Whether identical elements of this class may be replaced by a
+    single shared, frozen element, see `sdfbuilder.interning`. Disable
+    this in subclasses that are meant to be changed after they have
+    been added to a tree.
+    """
+    INTERNABLE = True
+
+    # Weak reference to the parent element and cached render output
+    # as a tuple of number format generation and rendered string,
+    # class level defaults.
+    _parent = None
+    _render_cache = None
+
+    # Weak set of the other elements this element was added to, such
+    # as the visual that shares its geometry with a collision. These
+    # are invalidated along with the parent.
+    _shared_parents = None
+
+    # Whether this element is a shared element that cannot be
+    # changed, and its content key, see `sdfbuilder.interning`.
+    _frozen = False
+    _intern_key = None
+
+    # Lazily built lookup tables for the child elements, see
+    # `get_elements_of_type` and `get_elements_by_name`.
+    _type_index = None
+    _name_index = None
+    _subtree_types = None
+    _subtree_names = None
+
     def __init__(self, **kwargs):
         """
         Create a new Element with the given attributes.
@@ -33,6 +350,300 @@ class Element(object):
         self.body = kwargs.get("body", "")
         self.elements = kwargs.get("elements", [])
 
+    def __setattr__(self, key, value):
+        """
+        Invalidates this element's cached render whenever one of its
+        attributes is set, and adopts newly assigned child elements.
+        :param key:
+        :param value:
+        :return:
+        """
+        if key in self.CACHE_ATTRIBUTES:
+            super(Element, self).__setattr__(key, value)
+            return
+
+        self._before_change()
+        old = self.__dict__.get(key)
+        if key == 'elements' and value is not old:
+            value = ElementList(self, value)
+            super(Element, self).__setattr__(key, value)
+            self._elements_changed(value, old or ())
+            return
+
+        super(Element, self).__setattr__(key, value)
+
+        if key in self.CHILD_ATTRIBUTES:
+            self._adopt(value)
+        elif key == 'name' and value != old:
+            parent = self.get_parent()
+            if parent is not None:
+                parent.invalidate_index()
+
+        self.invalidate()
+
+    def __getstate__(self):
+        """
+        Parent references and caches are not copied / pickled.
+        :return:
+        """
+        self._materialize()
+        state = self.__dict__.copy()
+        for key in self.CACHE_ATTRIBUTES:
+            state.pop(key, None)
+
+        state['elements'] = list(state['elements'])
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restores state and adopts the restored child elements.
+        :param state:
+        :return:
+        """
+        self.__dict__.update(state)
+        self.__dict__['elements'] = ElementList(self, state['elements'])
+
+        for element in self.elements:
+            self._adopt(element)
+
+        for key in self.CHILD_ATTRIBUTES:
+            self._adopt(self.__dict__.get(key))
+
+    def __getattr__(self, item):
+        """
+        Only called for attributes that are not found; materializes
+        copy-on-write clones on first access.
+        :param item:
+        :return:
+        """
+        if '_cow_source' not in self.__dict__:
+            raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, item))
+
+        self._materialize()
+        return getattr(self, item)
+
+    def _lazy_clone(self, memo):
+        """
+        Creates a copy-on-write clone of this element, which shares
+        all its state with this element until it is first accessed.
+        :param memo: Dictionary of clones by id of their source element,
+                     shared by all clones of a single copy.
+        :return:
+        """
+        clone = object.__new__(self.__class__)
+        clone.__dict__.update(_cow_source=self, _cow_memo=memo)
+        memo[id(self)] = clone
+
+        clones = self.__dict__.get('_cow_clones')
+        if clones is None:
+            clones = self.__dict__['_cow_clones'] = weakref.WeakSet()
+
+        clones.add(clone)
+        _pending_clones.add(clone)
+        return clone
+
+    def _materialize(self):
+        """
+        Gives a copy-on-write clone its own copy of the state of its source
+        element. Child elements become lazy clones themselves, so only
+        one level of the tree is copied at a time.
+        :return:
+        """
+        state = self.__dict__
+        source = state.pop('_cow_source', None)
+        if source is None:
+            return
+
+        memo = state.pop('_cow_memo')
+        _pending_clones.discard(self)
+        source._materialize()
+        source.__dict__['_cow_clones'].discard(self)
+
+        state['_render_cache'] = source.__dict__.get('_render_cache')
+        skip = source.CACHE_ATTRIBUTES
+        for key, value in source.__dict__.items():
+            if key not in skip:
+                state[key] = _clone_value(value, memo, source, self)
+
+        state['elements'] = ElementList(self, state['elements'])
+
+    def _before_change(self):
+        """
+        Called before this element changes. Materializes pending copy-on-write
+        clones of this element and its ancestors, so that they keep the
+        state from before the change. Frozen elements cannot be changed.
+        :return:
+        """
+        if self._frozen:
+            raise AttributeError("Cannot change a frozen (interned) '%s' element, "
+                                 "change a copy instead." % self.get_tag_name())
+
+        if not _pending_clones:
+            return
+
+        self._materialize()
+        path = []
+        element = self
+        while element is not None:
+            path.append(element)
+            element = element.get_parent()
+
+        # Materializing an ancestor's clones registers clones on its
+        # children, so this needs to go top down.
+        for element in reversed(path):
+            clones = element.__dict__.get('_cow_clones')
+            if clones:
+                for clone in list(clones):
+                    clone._materialize()
+
+    def _adopt(self, element):
+        """
+        Makes this element the parent of the given element, if
+        it is an element that does not have a parent yet. Otherwise
+        this element becomes one of its shared parents.
+        :param element:
+        :return:
+        """
+        if not isinstance(element, Element):
+            return
+
+        parent = element.get_parent()
+        if parent is None:
+            element._parent = weakref.ref(self)
+        elif parent is not self:
+            element._add_shared_parent(self)
+
+    def _add_shared_parent(self, parent):
+        """
+        :param parent:
+        :return:
+        """
+        shared = self.__dict__.get('_shared_parents')
+        if shared is None:
+            shared = self.__dict__['_shared_parents'] = weakref.WeakSet()
+
+        shared.add(parent)
+
+    def _release(self, element):
+        """
+        Removes this element from the parents of the given element. If
+        this was its parent, one of its shared parents takes over.
+        :param element:
+        :return:
+        """
+        if not isinstance(element, Element):
+            return
+
+        shared = element._shared_parents
+        if element.get_parent() is self:
+            element._parent = weakref.ref(shared.pop()) if shared else None
+        elif shared:
+            shared.discard(self)
+
+    def _get_parents(self):
+        """
+        :return: The parent and the shared parents of this element
+        :rtype: list
+        """
+        parent = self.get_parent()
+        parents = [] if parent is None else [parent]
+        if self._shared_parents:
+            parents.extend(self._shared_parents)
+
+        return parents
+
+    def get_parent(self):
+        """
+        Returns the element this element was added to, if any. Elements
+        are adopted by the first element they are added to, and released
+        again when they are removed through `remove_elements`. Elements
+        that are added to more than one element, like a geometry shared
+        by a collision and a visual, invalidate all of them on change.
+        :return:
+        :rtype: Element
+        """
+        ref = self._parent
+        return ref() if ref is not None else None
+
+    def invalidate(self):
+        """
+        Clears the cached render of this element and all its ancestors.
+        This happens automatically when attributes are set or elements are
+        added / removed, but you need to call this yourself after changing
+        data in place, e.g. a vector component or the `attributes` dictionary.
+        :return:
+        """
+        global _tree_version
+        _tree_version += 1
+
+        self.__dict__['_render_cache'] = None
+        if self._shared_parents:
+            for parent in self._get_parents():
+                parent.invalidate()
+        else:
+            parent = self.get_parent()
+            if parent is not None:
+                parent.invalidate()
+
+    def get_parent_frame_transform(self):
+        """
+        Returns the transform from the frame this element is expressed
+        in to the world frame, i.e. the frame of the root element.
+        :return:
+        :rtype: Transform
+        """
+        parent = self.get_parent()
+        return _IDENTITY if parent is None else parent.get_frame_transform(self)
+
+    def get_frame_transform(self, child):
+        """
+        Returns the transform from the frame the pose of the given
+        child element is expressed in to the world frame. Elements
+        without a pose do not introduce a new frame.
+        :param child:
+        :type child: Element
+        :return:
+        :rtype: Transform
+        """
+        return self.get_parent_frame_transform()
+
+    def invalidate_index(self):
+        """
+        Clears the child lookup tables of this element, and the
+        recursive lookup tables of all its ancestors.
+        :return:
+        """
+        self._type_index = self._name_index = None
+        element = self
+        while element is not None:
+            element._subtree_types = element._subtree_names = None
+            if element._shared_parents:
+                for parent in element._shared_parents:
+                    parent.invalidate_index()
+
+            element = element.get_parent()
+
+    def _elements_changed(self, added, removed):
+        """
+        Called after the list of child elements has changed. Adopts the
+        added elements, releases the removed ones that are not added back
+        and invalidates this element and its lookup tables.
+        :param added:
+        :param removed:
+        :return:
+        """
+        if removed:
+            kept = set(id(element) for element in added)
+            for element in removed:
+                if id(element) not in kept:
+                    self._release(element)
+
+        for element in added:
+            self._adopt(element)
+
+        self.invalidate_index()
+        self.invalidate()
+
     def add_element(self, element):
         """
         Adds a child element.
@@ -47,7 +658,7 @@ class Element(object):
         :param elements:
         :return:
         """
-        self.elements += elements
+        self.elements.extend(elements)
 
     def has_element(self, class_type):
         """
@@ -66,48 +677,190 @@ class Element(object):
         :return:
         :rtype: list
         """
-        elements = []
+        return list(self.iter_elements(func, recursive=recursive))
 
-        for el in self.elements:
-            if func(el):
-                elements.append(el)
-
-            if recursive and hasattr(el, 'filter_elements') and callable(el.filter_elements):
-                elements += el.filter_elements(func, recursive=recursive)
+    def iter_elements(self, func=None, recursive=False):
+        """
+        Generator version of `filter_elements`, lazily yields the
+        matching elements in the same (depth first) order.
+        :param func: Selector function, all elements are yielded if omitted
+        :param recursive: Search recursively
+        :return:
+        """
+        stack = [iter(self.elements)]
+        while stack:
+            for el in stack[-1]:
+                if func is None or func(el):
+                    yield el
 
-        return elements
+                if recursive and isinstance(el, Element) and el.elements:
+                    stack.append(iter(el.elements))
+                    break
+            else:
+                stack.pop()
 
     def get_elements_of_type(self, obj, recursive=False):
         """
         Returns all direct child elements of the
-        given class type.
+        given class type. Lookups use indexes that are cleared
+        whenever the `elements` of an element change.
         :param obj:
         :param recursive: Search recursively
         :return: Elements matching the given type
         """
-        func = lambda element: isinstance(element, obj)
-        return self.filter_elements(func, recursive=recursive)
+        if isinstance(obj, tuple):
+            if len(obj) != 1:
+                func = lambda element: isinstance(element, obj)
+                return self.filter_elements(func, recursive=recursive)
+
+            obj = obj[0]
+
+        if recursive:
+            return list(self._get_subtree_of_type(obj))
+
+        return list(self._get_type_index().get(obj, ()))
+
+    def get_elements_by_name(self, name, recursive=False):
+        """
+        Returns all child elements with the given name.
+        :param name:
+        :type name: str
+        :param recursive: Search recursively
+        :return:
+        :rtype: list
+        """
+        index = self._get_subtree_names() if recursive else self._get_name_index()
+        return list(index.get(name, ()))
+
+    def get_element_by_name(self, name, recursive=False):
+        """
+        Returns the first child element with the given name.
+        :param name:
+        :type name: str
+        :param recursive: Search recursively
+        :return: The element, or `None` if there is no such element
+        """
+        index = self._get_subtree_names() if recursive else self._get_name_index()
+        found = index.get(name)
+        return found[0] if found else None
+
+    def _get_type_index(self):
+        """
+        Returns a dictionary from each class to the direct child elements
+        that are an instance of it, built on first use.
+        :return:
+        :rtype: dict
+        """
+        index = self._type_index
+        if index is None:
+            index = self._type_index = {}
+            for el in self.elements:
+                for cls in type(el).__mro__:
+                    index.setdefault(cls, []).append(el)
+
+        return index
+
+    def _get_name_index(self):
+        """
+        Returns a dictionary from name to the direct child
+        elements with that name, built on first use.
+        :return:
+        :rtype: dict
+        """
+        index = self._name_index
+        if index is None:
+            index = self._name_index = {}
+            for el in self.elements:
+                name = getattr(el, 'name', None)
+                if name is not None:
+                    index.setdefault(name, []).append(el)
+
+        return index
+
+    def _get_subtree_of_type(self, cls):
+        """
+        Returns the list of all elements in this element's subtree that
+        are instances of `cls`, cached until the subtree structure changes.
+        :param cls:
+        :return:
+        :rtype: list
+        """
+        cache = self._subtree_types
+        if cache is None:
+            cache = self._subtree_types = {}
+        elif cls in cache:
+            return cache[cls]
+
+        found = []
+        for el in self.elements:
+            if isinstance(el, cls):
+                found.append(el)
+
+            if isinstance(el, Element) and el.elements:
+                found += el._get_subtree_of_type(cls)
+
+        cache[cls] = found
+        return found
+
+    def _get_subtree_names(self):
+        """
+        Returns a dictionary from name to all elements in this element's
+        subtree with that name, cached until the subtree structure changes.
+        :return:
+        :rtype: dict
+        """
+        if self._subtree_names is None:
+            by_name = {}
+            for el in self.iter_elements(recursive=True):
+                name = getattr(el, 'name', None)
+                if name is not None:
+                    by_name.setdefault(name, []).append(el)
+
+            self._subtree_names = by_name
+
+        return self._subtree_names
 
     def remove_elements(self, func, recursive=False):
         """
-        Removes all elements that match the given filter function.
-        :param func: Selector function or class instance
+        Removes all elements that match the given filter function. Each
+        element list is filtered in a single pass, and recursion uses an
+        explicit stack, so this is linear in the number of visited elements.
+        :param func: Selector function, or a collection of the elements to
+                     remove (matched by identity).
         :param recursive: Remove recursively from child elements
-        :return: List of all removed elements
+        :return: List of all removed elements, in depth first order
         :rtype: list
         """
-        to_remove = self.filter_elements(func)
-        for el in to_remove:
-            self.elements.remove(el)
+        if not callable(func):
+            ids = set(id(el) for el in func)
+            func = lambda element: id(element) in ids
 
-        if not recursive:
-            return to_remove
+        removed = []
+        stack = [self]
+        while stack:
+            element = stack.pop()
+            removed += element._remove_matching(func)
 
+            if recursive:
+                stack.extend(el for el in reversed(element.elements) if isinstance(el, Element))
+
+        return removed
+
+    def _remove_matching(self, func):
+        """
+        Removes the direct child elements matching `func`.
+        :param func:
+        :return: The removed elements
+        :rtype: list
+        """
+        kept, removed = [], []
         for el in self.elements:
-            if hasattr(el, 'remove_elements') and callable(el.remove_elements):
-                to_remove += el.remove_elements(func, recursive)
+            (removed if func(el) else kept).append(el)
+
+        if removed:
+            self.elements[:] = kept
 
-        return to_remove
+        return removed
 
     def remove_elements_of_type(self, obj, recursive=False):
         """
@@ -151,23 +904,129 @@ class Element(object):
 
     def render(self):
         """
-        Renders this element according to its properties.
+        Renders this element according to its properties. The
+        result is cached until the element is invalidated.
         :return:
         """
-        all_attrs = self.render_attributes()
+        cached = self._get_cached_render()
+        if cached is not None:
+            return cached
+
+        _run_render_passes(self)
+        try:
+            all_attrs = self.render_attributes()
+            body = self.render_body()
+        finally:
+            _end_render()
 
-        body = self.render_body()
         tag_name = self.get_tag_name()
 
         if not tag_name:
-            return body
+            rendered = body
+        else:
+            tag_open = self._render_tag_open(tag_name, all_attrs)
+            rendered = "<%s />" % tag_open if len(body) == 0 else "<%s>%s</%s>" % (tag_open, body, tag_name)
+
+        if self.CACHE_RENDER:
+            self._render_cache = (get_format_generation(), rendered)
+
+        return rendered
+
+    def _get_cached_render(self):
+        """
+        :return: The cached render of this element, or `None` if there
+                 is none or it was rendered with another number format.
+        :rtype: str
+        """
+        cached = self._render_cache
+        if cached is None:
+            # Unchanged copy-on-write clones use the render of their source
+            source = self.__dict__.get('_cow_source')
+            cached = None if source is None else source._render_cache
+
+        if cached is None or cached[0] != get_format_generation():
+            return None
+
+        return cached[1]
+
+    def write_body(self, stream):
+        """
+        Streaming counterpart of `render_body`, writes the body of this
+        element to the given stream. If a subclass overrides `render_body`
+        without overriding this method, its rendered body is written
+        as a whole.
+        :param stream: File-like object with a `write` method
+        :return:
+        """
+        if not _streamable(self, 'render_body', 'write_body'):
+            stream.write(self.render_body())
+            return
+
+        first = True
+        for element in self.render_elements():
+            if not first:
+                stream.write("\n")
+
+            first = False
+            if isinstance(element, Element) and _streamable(element, '__str__', 'write'):
+                element.write(stream)
+            else:
+                stream.write(str(element))
+
+        stream.write(self.body)
+
+    def write(self, stream):
+        """
+        Writes this element to the given stream, walking the element tree
+        once without building intermediate strings for its subtrees. The
+        written output is identical to `str(element)`.
+        :param stream: File-like object with a `write` method
+        :return:
+        """
+        if not _streamable(self, 'render', 'write'):
+            stream.write(self.render())
+            return
+
+        cached = self._get_cached_render()
+        if cached is not None:
+            stream.write(cached)
+            return
+
+        _run_render_passes(self)
+        try:
+            all_attrs = self.render_attributes()
+            tag_name = self.get_tag_name()
+
+            if not tag_name:
+                self.write_body(stream)
+                return
+
+            tag_open = self._render_tag_open(tag_name, all_attrs)
+            writer = _TagWriter(stream, "<%s>" % tag_open)
+            self.write_body(writer)
+        finally:
+            _end_render()
+
+        if writer.opened:
+            stream.write("</%s>" % tag_name)
         else:
-            attrs = " ".join([a+"="+quoteattr(
-                # Use number format if a number is detected
-                nf(all_attrs[a]) if isinstance(all_attrs[a], float) else str(all_attrs[a])
-            ) for a in all_attrs])
-            tag_open = tag_name + " " + attrs if len(attrs) else tag_name
-            return "<%s />" % tag_open if len(body) == 0 else "<%s>%s</%s>" % (tag_open, body, tag_name)
+            stream.write("<%s />" % tag_open)
+
+    @staticmethod
+    def _render_tag_open(tag_name, all_attrs):
+        """
+        Returns the contents of the opening tag, i.e. the tag
+        name followed by the attributes.
+        :param tag_name:
+        :param all_attrs:
+        :return:
+        :rtype: str
+        """
+        attrs = " ".join([a+"="+quoteattr(
+            # Use number format if a number is detected
+            nf(all_attrs[a]) if isinstance(all_attrs[a], float) else str(all_attrs[a])
+        ) for a in all_attrs])
+        return tag_name + " " + attrs if len(attrs) else tag_name
 
     def get_tag_name(self):
         """
@@ -176,11 +1035,22 @@ class Element(object):
         """
         return self.TAG_NAME if self.tag_name is None else self.tag_name
 
-    def copy(self, deep=True):
+    def copy(self, deep=True, copy_on_write=False):
         """
         Wrapper over __copy__()
+        :param deep:
+        :param copy_on_write: Create a deep copy that shares its state
+                              with this element, until either of them is changed.
+                              Elements of the copy are copied lazily, on
+                              first access. Only changes made through attribute
+                              assignment, the element methods and `elements`
+                              are detected, so do not change vectors or other
+                              lists in place while the copy exists.
         :return:
         """
+        if copy_on_write:
+            return self._lazy_clone({})
+
         return copy.deepcopy(self) if deep else copy.copy(self)
 
     def __str__(self):
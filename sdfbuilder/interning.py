@@ -0,0 +1,203 @@
+"""
+Hash-consing of identical elements. Structurally identical elements
+(same class and state, with identical children) are replaced by a single
+shared element, which is frozen so that it cannot be changed through
+any of its parents. Since a shared element is rendered only once, this
+saves both memory and formatting time in trees that repeat the same
+materials, friction blocks, inertials, etc. many times.
+
+Only elements of classes with `INTERNABLE` set are shared, which excludes
+posables and poses; their position depends on their parent. Frozen
+elements keep the parent they were first added to. Copies of frozen
+elements are regular elements that can be changed.
+"""
+from __future__ import absolute_import
+import weakref
+from .element import Element
+
+# Shared elements by content key
+_interned = weakref.WeakValueDictionary()
+
+
+class _NotInternable(Exception):
+    """
+    Raised when an element cannot be interned.
+    """
+    pass
+
+
+def _value_key(value):
+    """
+    :param value: An attribute value of an element
+    :return: Hashable key that is equal for equal values
+    """
+    if isinstance(value, float):
+        # repr distinguishes negative zero, which is rendered differently
+        return type(value), repr(value)
+    elif isinstance(value, dict):
+        return (dict,) + tuple(sorted((k, _value_key(v)) for k, v in value.items()))
+    elif isinstance(value, Element):
+        # Elements are only allowed as children
+        raise _NotInternable()
+    elif hasattr(value, '__iter__'):
+        # Lists, tuples, vectors and the like
+        return (type(value),) + tuple(_value_key(v) for v in value)
+
+    try:
+        hash(value)
+    except TypeError:
+        raise _NotInternable()
+
+    return type(value), value
+
+
+def _content_key(element):
+    """
+    Returns the content key of an element, which is cached on
+    frozen elements.
+    :param element:
+    :type element: Element
+    :return:
+    """
+    key = element._intern_key
+    if key is not None:
+        return key
+
+    if not element.INTERNABLE or not element.CACHE_RENDER:
+        raise _NotInternable()
+
+    element._materialize()
+    state = element.__dict__
+    children = frozenset(element.CHILD_ATTRIBUTES) | frozenset(['elements'])
+
+    items = []
+    for name in sorted(state):
+        if name in element.CACHE_ATTRIBUTES:
+            continue
+
+        value = state[name]
+        if name == 'elements':
+            value = tuple(_content_key(el) if isinstance(el, Element) else _value_key(el) for el in value)
+        elif name in children and isinstance(value, Element):
+            value = _content_key(value)
+        else:
+            value = _value_key(value)
+
+        items.append((name, value))
+
+    return (element.__class__,) + tuple(items)
+
+
+def intern_element(element):
+    """
+    Returns the shared, frozen element that is identical to the given
+    element. If there is none yet, the given element and its children
+    are interned and frozen themselves.
+    :param element:
+    :type element: Element
+    :return: The shared element, or the given element if its class or
+             any of its children cannot be interned.
+    :rtype: Element
+    """
+    if element._frozen:
+        return element
+
+    try:
+        key = _content_key(element)
+    except _NotInternable:
+        return element
+
+    shared = _interned.get(key)
+    if shared is not None:
+        return shared
+
+    # Share the children first, which does not change the key or the render
+    _share_children(element)
+    element._intern_key = key
+    element._frozen = True
+    _interned[key] = element
+    return element
+
+
+def intern_tree(root):
+    """
+    Replaces all elements in a tree by their shared, frozen counterparts,
+    where possible. The root element itself is not replaced.
+    :param root:
+    :type root: Element
+    :return: The number of elements that were replaced by a shared element
+    :rtype: int
+    """
+    replaced = 0
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        if not element._frozen:
+            replaced += _share_children(element)
+            stack.extend(reversed(_children(element)))
+
+    return replaced
+
+
+def _children(element):
+    """
+    :param element:
+    :return: The child elements of an element
+    :rtype: list
+    """
+    state = element.__dict__
+    children = [el for el in element.elements if isinstance(el, Element)]
+    children += [state[name] for name in element.CHILD_ATTRIBUTES if isinstance(state.get(name), Element)]
+    return children
+
+
+def _share_children(element):
+    """
+    Replaces the children of an element by their shared elements. This
+    does not change the render of the element, so its cache is kept.
+    :param element:
+    :type element: Element
+    :return: The number of replaced children
+    :rtype: int
+    """
+    element._before_change()
+    element._materialize()
+    state = element.__dict__
+    replaced = []
+
+    elements = element.elements
+    for i, child in enumerate(elements):
+        if isinstance(child, Element):
+            shared = intern_element(child)
+            if shared is not child:
+                # Bypasses the invalidation of the list
+                list.__setitem__(elements, i, shared)
+                replaced.append(child)
+
+    for name in element.CHILD_ATTRIBUTES:
+        child = state.get(name)
+        if isinstance(child, Element):
+            shared = intern_element(child)
+            if shared is not child:
+                state[name] = shared
+                replaced.append(child)
+
+    if replaced:
+        for child in replaced:
+            element._release(child)
+
+        for child in _children(element):
+            element._adopt(child)
+
+        element.invalidate_index()
+
+    return len(replaced)
+
+
+def clear_interned():
+    """
+    Forgets all shared elements, so new elements are no longer
+    replaced by them. Elements that are already shared stay frozen.
+    :return:
+    """
+    _interned.clear()
@@ -2,7 +2,7 @@ from ..link import Link
 from ..posable import Posable
 from ..element import Element
 from ..math import Vector3
-from ..util import number_format as nf
+from ..util import number_format as nf, number_format_join as nfj
 
 
 class Joint(Posable):
@@ -16,6 +16,12 @@ class Joint(Posable):
     # Joint has a pose, but it is not in the parent frame
     PARENT_FRAME = False
 
+    CHILD_ATTRIBUTES = Posable.CHILD_ATTRIBUTES + ('axis', 'axis2')
+
+    # The rendered joint contains the names of its parent
+    # and child links, which are not part of its subtree.
+    CACHE_RENDER = False
+
     def __init__(self, joint_type, parent, child, pose=None, axis=None, axis2=None, name=None, **kwargs):
         """
         :param axis:
@@ -48,6 +54,26 @@ class Joint(Posable):
         self.axis = Axis() if axis is None else axis
         self.axis2 = axis2
 
+    def get_parent_frame_transform(self):
+        """
+        The joint pose is expressed in the child link frame.
+        :return:
+        """
+        return self.child.get_world_transform()
+
+    def __setattr__(self, key, value):
+        """
+        Gives the second axis its tag name when it is assigned, so
+        this does not change the axis while rendering.
+        :param key:
+        :param value:
+        :return:
+        """
+        if key == 'axis2' and value is not None and value.tag_name != 'axis2':
+            value.tag_name = 'axis2'
+
+        super(Joint, self).__setattr__(key, value)
+
     def render_elements(self):
         """
         Adds joint elements to be rendered
@@ -57,7 +83,6 @@ class Joint(Posable):
                     self.axis]
 
         if self.axis2 is not None:
-            self.axis2.tag_name = 'axis2'
             elements.append(self.axis2)
 
         return super(Joint, self).render_elements() + elements
@@ -79,6 +104,11 @@ class Axis(Element):
     # an axis2, just override the property in init.
     TAG_NAME = "axis"
 
+    # The joint sets the tag name of its second axis
+    INTERNABLE = False
+
+    CHILD_ATTRIBUTES = ('limit',)
+
     def __init__(self, axis=None, limit=None, use_parent_model_frame=False, **kwargs):
         """
         :param axis:
@@ -103,8 +133,7 @@ class Axis(Element):
         """
         elements = super(Axis, self).render_elements()
 
-        x, y, z = self.axis.x, self.axis.y, self.axis.z
-        xyz = "<xyz>%s %s %s</xyz>" % (nf(x), nf(y), nf(z))
+        xyz = "<xyz>%s</xyz>" % nfj(self.axis)
         elements += [xyz, "<use_parent_model_frame>%d</use_parent_model_frame>" % self.use_parent_model_frame]
 
         if self.limit:
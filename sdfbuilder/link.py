@@ -1,7 +1,7 @@
 from __future__ import print_function
 import sys
 
-from physics.inertial import transform_inertia_tensor
+from physics.inertial import combine_inertia_tensors
 from .math import Vector3
 from .posable import Posable
 from .element import Element
@@ -17,6 +17,8 @@ class Link(Posable):
     """
     TAG_NAME = 'link'
 
+    CHILD_ATTRIBUTES = Posable.CHILD_ATTRIBUTES + ('inertial',)
+
     def __init__(self, name, **kwargs):
         """
 
@@ -143,22 +145,16 @@ class Link(Posable):
             print("WARNING: calculating inertial for link with nonzero center of mass.", file=sys.stderr)
 
         collisions = self.get_elements_of_type(Collision, recursive=True)
-        i_final = np.zeros((3, 3))
-        total_mass = 0.0
-        for col in collisions:
-            rotation = col.get_rotation()
-            position = col.get_position()
-            geometry = col.geometry
-            mass = geometry.get_mass()
-            total_mass += mass
-            i_final += transform_inertia_tensor(
-                mass,
-                geometry.get_inertial().get_matrix(),
-                position,
-                rotation
-            )
-
-        self.inertial = Inertial.from_mass_matrix(total_mass, i_final)
+        masses = [col.geometry.get_mass() for col in collisions]
+        i_final = combine_inertia_tensors(
+            masses,
+            [col.geometry.get_inertial().get_matrix() for col in collisions],
+            # Geometry inertials are taken around their center of mass
+            [tuple(col.to_parent_frame(col.geometry.get_center_of_mass())) for col in collisions],
+            [tuple(col.get_rotation()) for col in collisions]
+        )
+
+        self.inertial = Inertial.from_mass_matrix(float(sum(masses)), i_final)
 
     def get_center_of_mass(self):
         """
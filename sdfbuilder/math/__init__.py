@@ -2,4 +2,7 @@
 Vector, Quaternion and RotationMatrix classes written as
 wrappers over `transformations.py` (see that file for license/origin).
 """
-from .classes import Vector3, Quaternion, RotationMatrix
\ No newline at end of file
+from .classes import Vector3, Quaternion, RotationMatrix
+from .arrays import Vector3Array, QuaternionArray
+from .transform import Transform
+from .aabb import AABB
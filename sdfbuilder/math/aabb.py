@@ -0,0 +1,147 @@
+"""
+Axis aligned bounding boxes
+"""
+from __future__ import division
+import numpy as np
+from .classes import Vector3
+from .arrays import quaternion_matrix_batch
+
+
+def shape_bounds_batch(positions, quaternions, centers, half_extents, radii, disc_radii):
+    """
+    Calculates the exact axis aligned bounds of N posed shapes at once. Each
+    shape is the Minkowski sum of a box with the given center and half extents,
+    a sphere and a disc in the xy plane, which covers boxes, spheres and
+    cylinders.
+    :param positions: (N, 3) array of shape positions
+    :param quaternions: (N, 4) array of shape rotations
+    :param centers: (N, 3) array of box centers in the shape frames
+    :param half_extents: (N, 3) array of box half extents
+    :param radii: Array of N sphere radii
+    :param disc_radii: Array of N disc radii
+    :return: (N, 3) arrays with the lower and upper bounds of each shape
+    :rtype: tuple
+    """
+    r = quaternion_matrix_batch(quaternions)
+    centers = np.einsum('nij,nj->ni', r, np.asarray(centers, dtype=np.float_).reshape(-1, 3))
+    centers += np.asarray(positions, dtype=np.float_).reshape(-1, 3)
+
+    # The extent of a disc with normal `n` along axis `i` is `radius * sqrt(1 - n_i^2)`
+    disc = np.sqrt(np.maximum(0.0, 1.0 - r[:, :, 2] ** 2))
+    half = np.einsum('nij,nj->ni', np.abs(r), np.asarray(half_extents, dtype=np.float_).reshape(-1, 3))
+    half += np.asarray(radii, dtype=np.float_).reshape(-1, 1)
+    half += np.asarray(disc_radii, dtype=np.float_).reshape(-1, 1) * disc
+    return centers - half, centers + half
+
+
+class AABB(object):
+    """
+    Axis aligned bounding box, given by its lower and upper corners.
+    """
+
+    def __init__(self, lower, upper):
+        """
+        :param lower:
+        :type lower: Vector3
+        :param upper:
+        :type upper: Vector3
+        :return:
+        """
+        self.lower = Vector3(lower)
+        self.upper = Vector3(upper)
+
+    @staticmethod
+    def from_bounds(lower, upper):
+        """
+        Creates the bounding box of a set of bounds.
+        :param lower: (N, 3) array of lower bounds
+        :type lower: ndarray
+        :param upper: (N, 3) array of upper bounds
+        :type upper: ndarray
+        :return: The bounding box, or `None` if there are no bounds.
+        :rtype: AABB
+        """
+        if not len(lower):
+            return None
+
+        return AABB(np.min(lower, axis=0), np.max(upper, axis=0))
+
+    @staticmethod
+    def from_points(points):
+        """
+        :param points: List or (N, 3) array of points
+        :return: The bounding box of the points, or `None` if there are none.
+        :rtype: AABB
+        """
+        points = np.array([tuple(p) for p in points], dtype=np.float_).reshape(-1, 3)
+        return AABB.from_bounds(points, points)
+
+    def __repr__(self):
+        """
+        :return:
+        """
+        return 'AABB(lower=%r, upper=%r)' % (self.lower, self.upper)
+
+    def get_center(self):
+        """
+        :return:
+        :rtype: Vector3
+        """
+        return 0.5 * (self.lower + self.upper)
+
+    def get_size(self):
+        """
+        :return: Size of the box along each axis
+        :rtype: Vector3
+        """
+        return self.upper - self.lower
+
+    def get_corners(self):
+        """
+        :return: The eight corners of this box
+        :rtype: list[Vector3]
+        """
+        lower, upper = self.lower, self.upper
+        return [Vector3(x, y, z) for x in (lower.x, upper.x)
+                for y in (lower.y, upper.y) for z in (lower.z, upper.z)]
+
+    def contains(self, point):
+        """
+        :param point:
+        :type point: Vector3
+        :return: Whether the point lies inside or on this box.
+        :rtype: bool
+        """
+        return all(lo <= p <= hi for lo, p, hi in zip(self.lower, point, self.upper))
+
+    def intersects(self, other):
+        """
+        :param other:
+        :type other: AABB
+        :return: Whether this box overlaps or touches another box.
+        :rtype: bool
+        """
+        return all(lo1 <= hi2 and lo2 <= hi1 for lo1, hi1, lo2, hi2 in
+                   zip(self.lower, self.upper, other.lower, other.upper))
+
+    def union(self, other):
+        """
+        :param other:
+        :type other: AABB
+        :return: The bounding box of this box and another box
+        :rtype: AABB
+        """
+        return AABB(np.minimum(tuple(self.lower), tuple(other.lower)),
+                    np.maximum(tuple(self.upper), tuple(other.upper)))
+
+    def transformed(self, transform):
+        """
+        :param transform:
+        :type transform: Transform
+        :return: The bounding box of this box after applying a transform
+        :rtype: AABB
+        """
+        lower, upper = shape_bounds_batch(
+            tuple(transform.position), tuple(transform.rotation),
+            tuple(self.get_center()), tuple(0.5 * self.get_size()), 0, 0)
+        return AABB(lower[0], upper[0])
@@ -0,0 +1,428 @@
+"""
+Batch versions of `Vector3` and `Quaternion`, backed by (N, 3) and
+(N, 4) numpy arrays, for doing the same operation on many vectors /
+quaternions at once.
+"""
+from __future__ import division
+import numbers
+import numpy as np
+from .classes import Vector3, Quaternion
+from .transformations import _EPS
+
+
+class ArrayBase(object):
+    """
+    Shared functionality for the array types; a thin wrapper over an
+    (N, WIDTH) numpy array in `data`.
+    """
+
+    WIDTH = 0
+    """ Width of a single item """
+
+    ITEM_CLASS = None
+    """ Class of a single item """
+
+    def __init__(self, data=None):
+        """
+        :param data: Anything that can be converted to an (N, WIDTH) float array,
+                     or a list of `ITEM_CLASS` objects.
+        :return:
+        """
+        if data is None:
+            data = np.zeros((0, self.WIDTH))
+
+        self.data = np.array(data, dtype=np.float_, copy=True).reshape(-1, self.WIDTH)
+
+    @classmethod
+    def _wrap(cls, data):
+        """
+        Wraps an array of the correct shape without copying it.
+        :param data:
+        :type data: ndarray
+        :return:
+        """
+        arr = cls.__new__(cls)
+        arr.data = data
+        return arr
+
+    @classmethod
+    def from_list(cls, items):
+        """
+        Creates an array from a list of items
+        :param items:
+        :type items: list
+        :return:
+        """
+        items = list(items)
+        if not items:
+            return cls()
+
+        return cls._wrap(np.array([tuple(item) for item in items], dtype=np.float_))
+
+    def to_list(self):
+        """
+        :return: List of `ITEM_CLASS` items
+        :rtype: list
+        """
+        new = self.ITEM_CLASS._new
+        return [new(*row) for row in self.data.tolist()]
+
+    def __copy__(self):
+        """
+        :return:
+        """
+        return self._wrap(self.data.copy())
+
+    copy = __copy__
+
+    def __len__(self):
+        """
+        :return:
+        """
+        return len(self.data)
+
+    def __iter__(self):
+        """
+        Iterates over the items as `ITEM_CLASS` objects
+        """
+        return iter(self.to_list())
+
+    def __getitem__(self, item):
+        """
+        :param item: Integer index, returns an `ITEM_CLASS` object, or slice /
+                     index array, returns an array of this type.
+        :return:
+        """
+        if isinstance(item, numbers.Integral):
+            return self.ITEM_CLASS._new(*self.data[item].tolist())
+
+        return self._wrap(self.data[item])
+
+    def __setitem__(self, key, value):
+        """
+        :param key:
+        :param value:
+        :return:
+        """
+        self.data[key] = value.data if isinstance(value, ArrayBase) else value
+
+    def __array__(self, dtype=None):
+        """
+        :param dtype:
+        :return:
+        """
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    def __repr__(self):
+        """
+        :return:
+        """
+        return '%s(%s)' % (self.__class__.__name__, repr(self.data))
+
+    def norms(self):
+        """
+        :return: Array with the norm of each item
+        :rtype: ndarray
+        """
+        return np.sqrt(np.einsum('ij,ij->i', self.data, self.data))
+
+    def normalize(self):
+        """
+        Normalizes all items in place
+        :return:
+        """
+        self.data /= self.norms()[:, np.newaxis]
+
+    def normalized(self):
+        """
+        :return: Array with normalized items
+        """
+        return self._wrap(self.data / self.norms()[:, np.newaxis])
+
+
+def _as_rows(other, width):
+    """
+    Returns the data of an array, vector or sequence as an array
+    of rows that broadcasts against (N, width).
+    :param other:
+    :param width:
+    :return:
+    :rtype: ndarray
+    """
+    if isinstance(other, ArrayBase):
+        return other.data
+
+    return np.asarray(tuple(other) if hasattr(other, 'ATTRS') else other,
+                      dtype=np.float_).reshape(-1, width)
+
+
+class Vector3Array(ArrayBase):
+    """
+    Array of N 3-vectors
+    """
+    WIDTH = 3
+    ITEM_CLASS = Vector3
+
+    def __add__(self, other):
+        """
+        :param other: Vector3Array or Vector3
+        :return:
+        """
+        return Vector3Array._wrap(self.data + _as_rows(other, 3))
+
+    def __sub__(self, other):
+        """
+        :param other: Vector3Array or Vector3
+        :return:
+        """
+        return Vector3Array._wrap(self.data - _as_rows(other, 3))
+
+    def __neg__(self):
+        """
+        :return:
+        """
+        return Vector3Array._wrap(-self.data)
+
+    def __mul__(self, number):
+        """
+        :param number: Scalar or array of N scalars
+        :return:
+        """
+        return Vector3Array._wrap(self.data * np.reshape(number, (-1, 1)))
+
+    def __rmul__(self, other):
+        """
+        Left multiplication with a scalar, or rotation by a `Quaternion`.
+        :param other:
+        :return:
+        """
+        if isinstance(other, Quaternion):
+            return Vector3Array._wrap(quaternion_rotate_batch(_as_rows(other, 4), self.data))
+
+        return self.__mul__(other)
+
+    __radd__ = __add__
+
+    def dot(self, other):
+        """
+        :param other: Vector3Array or Vector3
+        :return: Array with the dot products
+        :rtype: ndarray
+        """
+        return np.einsum('ij,ij->i', *np.broadcast_arrays(self.data, _as_rows(other, 3)))
+
+    def cross(self, other):
+        """
+        :param other: Vector3Array or Vector3
+        :return:
+        :rtype: Vector3Array
+        """
+        return Vector3Array._wrap(np.cross(self.data, _as_rows(other, 3)))
+
+
+def quaternion_multiply_batch(q1, q0):
+    """
+    Vectorized `quaternion_multiply`, multiplies broadcastable
+    (N, 4) quaternion arrays.
+    :param q1:
+    :type q1: ndarray
+    :param q0:
+    :type q0: ndarray
+    :return:
+    :rtype: ndarray
+    """
+    w1, x1, y1, z1 = q1[..., 0], q1[..., 1], q1[..., 2], q1[..., 3]
+    w0, x0, y0, z0 = q0[..., 0], q0[..., 1], q0[..., 2], q0[..., 3]
+    return np.stack([-x1*x0 - y1*y0 - z1*z0 + w1*w0,
+                     x1*w0 + y1*z0 - z1*y0 + w1*x0,
+                     -x1*z0 + y1*w0 + z1*x0 + w1*y0,
+                     x1*y0 - y1*x0 + z1*w0 + w1*z0], axis=-1)
+
+
+def quaternion_rotate_batch(quaternions, vectors):
+    """
+    Vectorized `Quaternion.rotate`, rotates broadcastable (N, 3) vectors
+    by (N, 4) quaternions without building rotation matrices.
+    :param quaternions:
+    :type quaternions: ndarray
+    :param vectors:
+    :type vectors: ndarray
+    :return:
+    :rtype: ndarray
+    """
+    n = np.einsum('...i,...i->...', quaternions, quaternions)[..., np.newaxis]
+    valid = n >= _EPS
+    q = quaternions * np.where(valid, 1.0 / np.sqrt(np.where(valid, n, 1.0)), 0.0)
+    w, u = q[..., :1], q[..., 1:]
+    t = 2.0 * np.cross(u, vectors)
+    return vectors + w * t + np.cross(u, t)
+
+
+def quaternion_matrix_batch(quaternions):
+    """
+    Vectorized `quaternion_matrix`, returns an (N, 3, 3) array of
+    rotation matrices for an (N, 4) array of quaternions. Quaternions
+    are normalized first, (near) zero quaternions give the identity.
+    :param quaternions:
+    :type quaternions: ndarray
+    :return:
+    :rtype: ndarray
+    """
+    q = np.array(quaternions, dtype=np.float_, copy=True).reshape(-1, 4)
+
+    # Elementwise, so the result for a quaternion does not depend
+    # on the other quaternions in the array.
+    n = q[:, 0]*q[:, 0] + q[:, 1]*q[:, 1] + q[:, 2]*q[:, 2] + q[:, 3]*q[:, 3]
+    valid = n >= _EPS
+    if valid.all():
+        q *= np.sqrt(2.0 / n)[:, np.newaxis]
+    else:
+        q[valid] *= np.sqrt(2.0 / n[valid])[:, np.newaxis]
+        q[~valid] = 0
+
+    o = q[:, :, np.newaxis] * q[:, np.newaxis, :]
+    m = np.empty((len(q), 3, 3))
+    m[:, 0, 0] = 1.0-o[:, 2, 2]-o[:, 3, 3]
+    m[:, 0, 1] = o[:, 1, 2]-o[:, 3, 0]
+    m[:, 0, 2] = o[:, 1, 3]+o[:, 2, 0]
+    m[:, 1, 0] = o[:, 1, 2]+o[:, 3, 0]
+    m[:, 1, 1] = 1.0-o[:, 1, 1]-o[:, 3, 3]
+    m[:, 1, 2] = o[:, 2, 3]-o[:, 1, 0]
+    m[:, 2, 0] = o[:, 1, 3]-o[:, 2, 0]
+    m[:, 2, 1] = o[:, 2, 3]+o[:, 1, 0]
+    m[:, 2, 2] = 1.0-o[:, 1, 1]-o[:, 2, 2]
+    return m
+
+
+def euler_from_matrix_batch(matrices):
+    """
+    Vectorized `euler_from_matrix` for the static 'sxyz' axes
+    (i.e. Gazebo's roll / pitch / yaw).
+    :param matrices: (N, 3, 3) array of rotation matrices
+    :type matrices: ndarray
+    :return: (N, 3) array of roll, pitch, yaw
+    :rtype: ndarray
+    """
+    m = matrices
+    cy = np.sqrt(m[:, 0, 0]*m[:, 0, 0] + m[:, 1, 0]*m[:, 1, 0])
+    regular = cy > _EPS
+
+    rpy = np.empty((len(m), 3))
+    rpy[:, 0] = np.where(regular, np.arctan2(m[:, 2, 1], m[:, 2, 2]),
+                         np.arctan2(-m[:, 1, 2], m[:, 1, 1]))
+    rpy[:, 1] = np.arctan2(-m[:, 2, 0], cy)
+    rpy[:, 2] = np.where(regular, np.arctan2(m[:, 1, 0], m[:, 0, 0]), 0.0)
+    return rpy
+
+
+class QuaternionArray(ArrayBase):
+    """
+    Array of N quaternions
+    """
+    WIDTH = 4
+    ITEM_CLASS = Quaternion
+
+    def __mul__(self, other):
+        """
+        :param other: QuaternionArray / Quaternion to compose with, or
+                      Vector3Array / Vector3 to rotate.
+        :return:
+        """
+        if isinstance(other, (QuaternionArray, Quaternion)):
+            return QuaternionArray._wrap(quaternion_multiply_batch(self.data, _as_rows(other, 4)))
+        elif isinstance(other, (Vector3Array, Vector3)):
+            return self.rotate(other)
+        else:
+            raise ValueError("Unknown multiplication between `QuaternionArray` and `%s`" % other.__class__)
+
+    def __rmul__(self, other):
+        """
+        Left multiplication with a single Quaternion
+        :param other:
+        :return:
+        """
+        if isinstance(other, Quaternion):
+            return QuaternionArray._wrap(quaternion_multiply_batch(_as_rows(other, 4), self.data))
+
+        return NotImplemented
+
+    def conjugated(self):
+        """
+        :return:
+        :rtype: QuaternionArray
+        """
+        data = self.data.copy()
+        data[:, 1:] *= -1
+        return QuaternionArray._wrap(data)
+
+    def inversed(self):
+        """
+        :return:
+        :rtype: QuaternionArray
+        """
+        conj = self.conjugated()
+        conj.data /= np.einsum('ij,ij->i', self.data, self.data)[:, np.newaxis]
+        return conj
+
+    def get_matrices(self):
+        """
+        :return: (N, 3, 3) array of rotation matrices
+        :rtype: ndarray
+        """
+        return quaternion_matrix_batch(self.data)
+
+    def rotate(self, vectors):
+        """
+        Rotates vectors by the quaternions in this array. Either the
+        number of vectors or the number of quaternions can be one.
+        :param vectors:
+        :type vectors: Vector3Array|Vector3
+        :return:
+        :rtype: Vector3Array
+        """
+        return Vector3Array._wrap(quaternion_rotate_batch(self.data, _as_rows(vectors, 3)))
+
+    def get_rpy(self):
+        """
+        :return: (N, 3) array with the roll, pitch and yaw of each quaternion
+        :rtype: ndarray
+        """
+        return euler_from_matrix_batch(self.get_matrices())
+
+    @staticmethod
+    def from_rpy(rpy):
+        """
+        Vectorized `Quaternion.from_rpy`
+        :param rpy: (N, 3) array of roll, pitch, yaw values
+        :return:
+        :rtype: QuaternionArray
+        """
+        rpy = np.asarray(rpy, dtype=np.float_).reshape(-1, 3) / 2.0
+        ci, cj, ck = np.cos(rpy).T
+        si, sj, sk = np.sin(rpy).T
+        cc, cs = ci*ck, ci*sk
+        sc, ss = si*ck, si*sk
+
+        return QuaternionArray._wrap(np.stack([cj*cc + sj*ss,
+                                               cj*sc - sj*cs,
+                                               cj*ss + sj*cc,
+                                               cj*cs - sj*sc], axis=-1))
+
+    @staticmethod
+    def from_angle_axis(angles, axes):
+        """
+        Vectorized `Quaternion.from_angle_axis`
+        :param angles: Array of N angles
+        :param axes: Vector3Array / (N, 3) array of axes
+        :return:
+        :rtype: QuaternionArray
+        """
+        angles = np.asarray(angles, dtype=np.float_).reshape(-1)
+        axes = _as_rows(axes, 3)
+        lengths = np.sqrt(np.einsum('ij,ij->i', axes, axes))
+        factors = np.where(lengths > _EPS, np.sin(angles / 2.0) / np.where(lengths > _EPS, lengths, 1), 1)
+
+        data = np.empty((max(len(angles), len(axes)), 4))
+        data[:, 0] = np.cos(angles / 2.0)
+        data[:, 1:] = axes * factors[:, np.newaxis]
+        return QuaternionArray._wrap(data)
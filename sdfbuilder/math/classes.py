@@ -1,8 +1,8 @@
 from __future__ import division
+import math
 import numpy as np
-from .transformations import quaternion_multiply, quaternion_matrix, quaternion_from_matrix, euler_from_quaternion, \
-    quaternion_about_axis, quaternion_conjugate, quaternion_inverse, quaternion_from_euler
-import itertools
+from .transformations import quaternion_matrix, quaternion_from_matrix, euler_from_quaternion, \
+    quaternion_from_euler, _EPS
 
 # Epsilon value used for zero comparisons
 EPSILON = 1e-5
@@ -13,13 +13,17 @@ NOT_PARALLEL = 0
 
 class VectorBase(object):
     """
-    Base class with shared functionality for Quaternion / Vector3
+    Base class with shared functionality for Quaternion / Vector3. The
+    components are stored as plain floats in slots named after `ATTRS`,
+    which keeps these small objects cheap to create and access.
     """
+    __slots__ = ()
+
     LENGTH = 0
     """ Required length of the vector """
 
     ATTRS = ''
-    """ Indexed attributes to be retrieved by __getattr__ """
+    """ Names of the indexed attributes / slots """
 
     def __init__(self, *args):
         """
@@ -27,94 +31,118 @@ class VectorBase(object):
         :param args:
         :return:
         """
-        if len(args) == 1 and hasattr(args[0], '__iter__'):
-            self.data = np.array(args[0], dtype=np.float_, copy=True)
-        else:
-            self.data = np.array(args, dtype=np.float_, copy=True)
+        values = args[0] if len(args) == 1 and hasattr(args[0], '__iter__') else args
+        self.data = values
+
+    @classmethod
+    def _new(cls, *values):
+        """
+        Creates a new vector from exactly `LENGTH` float values
+        without any conversion or validation.
+        :param values:
+        :return:
+        """
+        vec = object.__new__(cls)
+        for attr, value in zip(cls.ATTRS, values):
+            object.__setattr__(vec, attr, value)
+
+        return vec
+
+    def _get_data(self):
+        """
+        :return: A numpy array with the components of this vector
+        :rtype: ndarray
+        """
+        return np.array(tuple(self), dtype=np.float_)
+
+    def _set_data(self, values):
+        """
+        Sets all components of this vector at once.
+        :param values: Iterable of length `LENGTH`
+        """
+        values = [float(value) for value in values]
+        assert len(values) == self.LENGTH, \
+            "Invalid data size %d, expecting %d" % (len(values), self.LENGTH)
+
+        for attr, value in zip(self.ATTRS, values):
+            object.__setattr__(self, attr, value)
 
-        assert len(self.data) == self.LENGTH, \
-            "Invalid data size %d, expecting %d" % (len(self.data), self.LENGTH)
+    data = property(_get_data, _set_data, doc="Components of this vector as a numpy array. Note that "
+                                              "this is a copy, changing it does not affect the vector.")
 
     def __copy__(self):
         """
         Creates a copy of the vector class
         :return:
         """
-        return self.__class__(self.data)
+        return self._new(*self)
 
     copy = __copy__
 
-    def __getitem__(self, item):
+    def __reduce__(self):
         """
-        :param item:
+        Support for pickling / deep copying slotted vectors.
         :return:
         """
-        return self.data[item]
+        return self.__class__, tuple(self)
 
-    def __setitem__(self, key, value):
+    def __array__(self, dtype=None):
         """
-        :param key:
-        :type key: int
-        :param value:
-        :type value: float
+        Allows numpy to convert vectors to arrays directly.
+        :param dtype:
         :return:
         """
-        self.data[key] = value
+        return np.array(tuple(self), dtype=dtype)
 
-    def __getattr__(self, item):
+    def __getitem__(self, item):
         """
-
         :param item:
         :return:
         """
-        try:
-            idx = self.ATTRS.index(item)
-        except:
-            raise AttributeError("Unknown attribute `%s`" % item)
+        return tuple(self)[item]
 
-        return self.data[idx]
-
-    def __setattr__(self, key, value):
+    def __setitem__(self, key, value):
         """
-
         :param key:
+        :type key: int|slice
         :param value:
+        :type value: float|iterable
         :return:
         """
-        try:
-            idx = self.ATTRS.index(key)
-            self.data[idx] = value
-            return value
-        except ValueError:
-            # Ignore error, just pass on to parent
-            pass
-        return super(VectorBase, self).__setattr__(key, value)
+        attrs = self.ATTRS[key]
+        if isinstance(key, slice):
+            values = [float(v) for v in value]
+            assert len(values) == len(attrs), "Cannot change the length of a vector."
+            for attr, v in zip(attrs, values):
+                object.__setattr__(self, attr, v)
+        else:
+            object.__setattr__(self, attrs, float(value))
 
     def __iter__(self):
         """
         """
-        return iter(self.data)
+        return (getattr(self, attr) for attr in self.ATTRS)
 
     def __len__(self):
         """
         :return: The length of this vector type
         :rtype: int
         """
-        return len(self.data)
+        return self.LENGTH
 
     def __abs__(self):
         """
         :return: Norm of this vector
         :rtype: float
         """
-        return np.linalg.norm(self.data)
+        return math.sqrt(sum(v * v for v in self))
 
     def __neg__(self):
         """
         Return negative vector.
         :return:
         """
-        return Vector3(-self.data)
+        return self._new(*(-v for v in self))
 
     norm = __abs__
     magnitude = __abs__
@@ -123,20 +151,22 @@ class VectorBase(object):
         """
         Normalizes this object
         """
-        self.data /= self.norm()
+        self.data = self.normalized()
 
     def normalized(self):
         """
         :return: Normalized version of this vector
         """
-        return Vector3(self.data / self.norm())
+        norm = self.norm()
+        return self._new(*(v / norm for v in self))
 
 
 class Vector3(VectorBase):
     """
-    Defines an abstract vector data type as a wrapper
-    over a numpy array.
+    Defines an abstract 3-vector data type.
     """
+    __slots__ = ('x', 'y', 'z')
+
     LENGTH = 3
     ATTRS = 'xyz'
 
@@ -153,7 +183,53 @@ class Vector3(VectorBase):
         if hasattr(x, '__iter__'):
             super(Vector3, self).__init__(x)
         else:
-            super(Vector3, self).__init__(x, y, z)
+            self.x, self.y, self.z = float(x), float(y), float(z)
+
+    @classmethod
+    def _new(cls, x, y, z):
+        """
+        Fast path constructor from three floats.
+        """
+        vec = object.__new__(cls)
+        vec.x, vec.y, vec.z = x, y, z
+        return vec
+
+    def __iter__(self):
+        """
+        """
+        return iter((self.x, self.y, self.z))
+
+    def __getitem__(self, item):
+        """
+        :param item:
+        :return:
+        """
+        return (self.x, self.y, self.z)[item]
+
+    def __abs__(self):
+        """
+        :return: Norm of this vector
+        :rtype: float
+        """
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    norm = __abs__
+    magnitude = __abs__
+
+    def __neg__(self):
+        """
+        Return negative vector.
+        :return:
+        """
+        return Vector3._new(-self.x, -self.y, -self.z)
+
+    def normalized(self):
+        """
+        :return: Normalized version of this vector
+        :rtype: Vector3
+        """
+        norm = self.norm()
+        return Vector3._new(self.x / norm, self.y / norm, self.z / norm)
 
     def __repr__(self):
         """
@@ -167,27 +243,40 @@ class Vector3(VectorBase):
         :param other:
         :return:
         """
+        if isinstance(other, Vector3):
+            return Vector3._new(self.x + other.x, self.y + other.y, self.z + other.z)
+
         assert len(self) == len(other), "Cannot add different length vectors."
-        return Vector3([x + y for x, y in itertools.izip(self, other)])
+        return Vector3(self.x + other[0], self.y + other[1], self.z + other[2])
 
     def __sub__(self, other):
         """
         :param other:
         :return:
         """
-        return Vector3([x - y for x, y in itertools.izip(self, other)])
+        if isinstance(other, Vector3):
+            return Vector3._new(self.x - other.x, self.y - other.y, self.z - other.z)
+
+        assert len(self) == len(other), "Cannot subtract different length vectors."
+        return Vector3(self.x - other[0], self.y - other[1], self.z - other[2])
+
+    def __rsub__(self, other):
+        """
+        :param other:
+        :return:
+        """
+        return -self.__sub__(other)
 
     __radd__ = __add__
-    __rsub__ = __sub__
 
     def __iadd__(self, other):
         """
         :param other:
         """
         assert len(self) == len(other), "Cannot add different length vectors."
-        self[0] += other[0]
-        self[1] += other[1]
-        self[2] += other[2]
+        self.x += other[0]
+        self.y += other[1]
+        self.z += other[2]
         return self
 
     def __isub__(self, other):
@@ -195,9 +284,10 @@ class Vector3(VectorBase):
         :param other:
         """
         assert len(self) == len(other), "Cannot add different length vectors."
-        self[0] -= other[0]
-        self[1] -= other[1]
-        self[2] -= other[2]
+        self.x -= other[0]
+        self.y -= other[1]
+        self.z -= other[2]
+        return self
 
     def __mul__(self, number):
         """
@@ -205,7 +295,7 @@ class Vector3(VectorBase):
         :type number: float
         :return:
         """
-        return Vector3(self[0] * number, self[1] * number, self[2] * number)
+        return Vector3._new(self.x * number, self.y * number, self.z * number)
 
     def __imul__(self, number):
         """
@@ -213,9 +303,9 @@ class Vector3(VectorBase):
         :type number: float
         :return:
         """
-        self[0] *= number
-        self[1] *= number
-        self[2] *= number
+        self.x *= number
+        self.y *= number
+        self.z *= number
         return self
 
     def __div__(self, number):
@@ -236,6 +326,7 @@ class Vector3(VectorBase):
 
     __rmul__ = __mul__
     __truediv__ = __div__
+    __itruediv__ = __idiv__
 
     def cross(self, v1):
         """
@@ -246,7 +337,9 @@ class Vector3(VectorBase):
         :return:
         :rtype: Vector3
         """
-        return Vector3(np.cross(self.data, v1.data))
+        x0, y0, z0 = self.x, self.y, self.z
+        x1, y1, z1 = v1.x, v1.y, v1.z
+        return Vector3._new(y0 * z1 - z0 * y1, z0 * x1 - x0 * z1, x0 * y1 - y0 * x1)
 
     def dot(self, v1):
         """
@@ -254,7 +347,7 @@ class Vector3(VectorBase):
         :type v1: Vector3
         :return:
         """
-        return np.dot(self.data, v1.data)
+        return self.x * v1.x + self.y * v1.y + self.z * v1.z
 
     def parallellism(self, other):
         """
@@ -303,6 +396,8 @@ class Quaternion(VectorBase):
     """
     Quaternion convenience class
     """
+    __slots__ = ('w', 'x', 'y', 'z')
+
     LENGTH = 4
     ATTRS = 'wxyz'
 
@@ -317,7 +412,28 @@ class Quaternion(VectorBase):
         if hasattr(w, '__iter__'):
             super(Quaternion, self).__init__(w)
         else:
-            super(Quaternion, self).__init__(w, x, y, z)
+            self.w, self.x, self.y, self.z = float(w), float(x), float(y), float(z)
+
+    @classmethod
+    def _new(cls, w, x, y, z):
+        """
+        Fast path constructor from four floats.
+        """
+        quat = object.__new__(cls)
+        quat.w, quat.x, quat.y, quat.z = w, x, y, z
+        return quat
+
+    def __iter__(self):
+        """
+        """
+        return iter((self.w, self.x, self.y, self.z))
+
+    def __getitem__(self, item):
+        """
+        :param item:
+        :return:
+        """
+        return (self.w, self.x, self.y, self.z)[item]
 
     def __repr__(self):
         """
@@ -332,11 +448,17 @@ class Quaternion(VectorBase):
         :return:
         """
         if isinstance(other, Quaternion):
-            return Quaternion(quaternion_multiply(self, other))
+            # Same as `quaternion_multiply(self, other)`
+            w1, x1, y1, z1 = self.w, self.x, self.y, self.z
+            w0, x0, y0, z0 = other.w, other.x, other.y, other.z
+            return Quaternion._new(-x1*x0 - y1*y0 - z1*z0 + w1*w0,
+                                   x1*w0 + y1*z0 - z1*y0 + w1*x0,
+                                   -x1*z0 + y1*w0 + z1*x0 + w1*y0,
+                                   x1*y0 - y1*x0 + z1*w0 + w1*z0)
         elif isinstance(other, Vector3):
-            # Get homogeneous rotation matrix and turn vector into
-            # homogeneous vector.
-            return self.get_matrix() * other
+            return self.rotate(other)
+
+        return NotImplemented
 
     def __imul__(self, other):
         """
@@ -345,7 +467,37 @@ class Quaternion(VectorBase):
         :return:
         """
         assert isinstance(other, Quaternion)
-        self.data[:] = quaternion_multiply(self, other)
+        self.data = self * other
+        return self
+
+    def rotate(self, vector):
+        """
+        Rotates the given vector by this quaternion, using the
+        expanded form of the Hamilton product q * v * q^-1, i.e.
+        `v + w * t + u x t` with `t = 2 * u x v`, where `w` and `u` are the
+        real and imaginary parts of the normalized quaternion. Like
+        `get_matrix`, a (near) zero quaternion is treated as the identity.
+        :param vector:
+        :type vector: Vector3
+        :return:
+        :rtype: Vector3
+        """
+        w, x, y, z = self.w, self.x, self.y, self.z
+        vx, vy, vz = vector.x, vector.y, vector.z
+        n = w*w + x*x + y*y + z*z
+        if n < _EPS:
+            return Vector3._new(vx, vy, vz)
+
+        if n != 1.0:
+            s = 1.0 / math.sqrt(n)
+            w, x, y, z = w * s, x * s, y * s, z * s
+
+        tx = 2.0 * (y * vz - z * vy)
+        ty = 2.0 * (z * vx - x * vz)
+        tz = 2.0 * (x * vy - y * vx)
+        return Vector3._new(vx + w * tx + (y * tz - z * ty),
+                            vy + w * ty + (z * tx - x * tz),
+                            vz + w * tz + (x * ty - y * tx))
 
     def get_matrix(self):
         """
@@ -353,27 +505,29 @@ class Quaternion(VectorBase):
         :return:
         :rtype: RotationMatrix
         """
-        return RotationMatrix(quaternion_matrix(self))
+        return RotationMatrix(quaternion_matrix(tuple(self)))
 
     def get_rpy(self):
         """
         Returns roll / pitch / yaw corresponding to this Quaternion
         """
-        return euler_from_quaternion(self.data[:], 'sxyz')
+        return euler_from_quaternion(tuple(self), 'sxyz')
 
     def conjugated(self):
         """
         :return:
         :rtype: Quaternion
         """
-        return Quaternion(quaternion_conjugate(self))
+        return Quaternion._new(self.w, -self.x, -self.y, -self.z)
 
     def inversed(self):
         """
         :return:
         :rtype: Quaternion
         """
-        return Quaternion(quaternion_inverse(self))
+        w, x, y, z = self.w, self.x, self.y, self.z
+        sq = w*w + x*x + y*y + z*z
+        return Quaternion._new(w / sq, -x / sq, -y / sq, -z / sq)
 
     @staticmethod
     def from_angle_axis(angle, axis):
@@ -385,7 +539,14 @@ class Quaternion(VectorBase):
         :return:
         :rtype: Quaternion
         """
-        return Quaternion(quaternion_about_axis(angle, axis))
+        # Same as `quaternion_about_axis(angle, axis)`
+        x, y, z = float(axis[0]), float(axis[1]), float(axis[2])
+        length = math.sqrt(x*x + y*y + z*z)
+        if length > _EPS:
+            factor = math.sin(angle / 2.0) / length
+            x, y, z = x * factor, y * factor, z * factor
+
+        return Quaternion._new(math.cos(angle / 2.0), x, y, z)
 
     @staticmethod
     def from_rpy(roll, pitch, yaw):
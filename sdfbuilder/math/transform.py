@@ -0,0 +1,131 @@
+"""
+Rigid transformation (rotation followed by translation) class.
+"""
+from __future__ import division
+import numpy as np
+from .classes import Vector3, Quaternion
+
+
+class Transform(object):
+    """
+    Rigid transform, which maps a point `p` to `rotation * p + position`.
+    This is the transform from a posable's frame to its parent frame.
+
+    Transforms are treated as immutable values: the inverse and the last
+    relative transform are cached on the object, so do not change
+    `position` or `rotation` in place.
+    """
+
+    def __init__(self, position=None, rotation=None):
+        """
+        :param position: Translation, zero if not specified
+        :type position: Vector3
+        :param rotation: Rotation, identity if not specified
+        :type rotation: Quaternion
+        :return:
+        """
+        self.position = Vector3() if position is None else position.copy()
+        self.rotation = Quaternion() if rotation is None else rotation.copy()
+        self._inverse = None
+        self._relative = None
+
+    @classmethod
+    def _new(cls, position, rotation):
+        """
+        Creates a transform from the given position and rotation
+        without copying them.
+        :param position:
+        :type position: Vector3
+        :param rotation:
+        :type rotation: Quaternion
+        :return:
+        :rtype: Transform
+        """
+        transform = cls.__new__(cls)
+        transform.position = position
+        transform.rotation = rotation
+        transform._inverse = None
+        transform._relative = None
+        return transform
+
+    def __repr__(self):
+        """
+        :return:
+        """
+        return 'Transform(position=%r, rotation=%r)' % (self.position, self.rotation)
+
+    def __mul__(self, other):
+        """
+        Composes this transform with another transform, such that
+        `(a * b) * p == a * (b * p)`, or applies this transform to
+        a point / array of points.
+        :param other:
+        :type other: Transform|Vector3|Vector3Array
+        :return:
+        """
+        if isinstance(other, Transform):
+            return Transform._new(self.rotation * other.position + self.position,
+                                  self.rotation * other.rotation)
+
+        return self.apply(other)
+
+    def apply(self, point):
+        """
+        Applies this transform to a point.
+        :param point:
+        :type point: Vector3|Vector3Array
+        :return:
+        :rtype: Vector3|Vector3Array
+        """
+        return self.rotation * point + self.position
+
+    def apply_direction(self, vec):
+        """
+        Applies only the rotation of this transform to a
+        direction vector / orientation quaternion.
+        :param vec:
+        :type vec: Vector3|Vector3Array|Quaternion
+        :return:
+        :rtype: Vector3|Vector3Array|Quaternion
+        """
+        return self.rotation * vec
+
+    def inversed(self):
+        """
+        :return: The inverse transform, such that `t.inversed() * (t * p) == p`.
+        :rtype: Transform
+        """
+        if self._inverse is None:
+            rotation = self.rotation.conjugated()
+            self._inverse = Transform._new(-(rotation * self.position), rotation)
+            self._inverse._inverse = self
+
+        return self._inverse
+
+    def relative_to(self, other):
+        """
+        Returns the transform from this transform's frame to the frame
+        of `other`, where both transforms share a parent frame. The
+        result for the most recent `other` is cached.
+        :param other:
+        :type other: Transform
+        :return:
+        :rtype: Transform
+        """
+        cached = self._relative
+        if cached is not None and cached[0] is other:
+            return cached[1]
+
+        relative = other.inversed() * self
+        self._relative = (other, relative)
+        return relative
+
+    def get_matrix(self):
+        """
+        :return: The homogeneous 4x4 matrix of this transform
+        :rtype: ndarray
+        """
+        matrix = np.identity(4)
+        matrix[:3, :3] = self.rotation.get_matrix()[:3, :3]
+        matrix[:3, 3] = tuple(self.position)
+        return matrix
@@ -0,0 +1,145 @@
+"""
+Renders many independent element trees in parallel with a pool of
+worker processes, since rendering itself is bound to a single core.
+
+Where processes are forked, the workers inherit the trees (or the
+recipes to build them) from the parent, so only indices and rendered
+output travel between processes and large trees are never pickled.
+Elsewhere the tasks are pickled and sent to the workers.
+"""
+from __future__ import absolute_import
+import os
+import sys
+import multiprocessing
+from .element import Element
+
+# Whether workers are forked from the current process
+_FORK = sys.platform != 'win32'
+
+# Tasks inherited by forked workers
+_tasks = None
+
+
+def _build(task):
+    """
+    :param task: An element, or a `(callable, args[, kwargs])` recipe
+                 that returns one.
+    :return:
+    :rtype: Element
+    """
+    if isinstance(task, Element):
+        return task
+
+    func = task[0]
+    args = task[1] if len(task) > 1 else ()
+    kwargs = task[2] if len(task) > 2 else {}
+    return func(*args, **kwargs)
+
+
+def _render_task(task, index, out_dir, name_format):
+    """
+    Renders a single task.
+    :param task:
+    :param index: Index of the task in the input
+    :param out_dir:
+    :param name_format:
+    :return: The rendered string, or the path of the written file
+    :rtype: str
+    """
+    element = _build(task)
+    if out_dir is None:
+        return str(element)
+
+    path = os.path.join(out_dir, name_format % index)
+    with open(path, 'w') as f:
+        element.write(f)
+
+    return path
+
+
+def _render_inherited(arguments):
+    """
+    Pool worker for forked processes, looks up the task
+    in the inherited task list.
+    :param arguments:
+    :return:
+    """
+    index, out_dir, name_format = arguments
+    return _render_task(_tasks[index], index, out_dir, name_format)
+
+
+def _render_pickled(arguments):
+    """
+    Pool worker for tasks that are sent to the worker.
+    :param arguments:
+    :return:
+    """
+    task, index, out_dir, name_format = arguments
+    return _render_task(task, index, out_dir, name_format)
+
+
+def render_many(tasks, workers=None, out_dir=None, name_format="%d.sdf", chunk_size=None):
+    """
+    Renders a list of independent element trees (typically `SDF` or `Model`
+    elements) in parallel.
+
+    Instead of an element, a task can be a `(callable, args[, kwargs])`
+    recipe that builds the element in the worker, which saves building
+    all trees in the parent process. Recipes should use module level
+    functions, so they can be pickled on platforms without `fork`.
+    :param tasks: Elements and / or recipes
+    :type tasks: list
+    :param workers: Number of worker processes, defaults to the number
+                    of CPUs. With a single worker everything is rendered
+                    in the current process.
+    :type workers: int
+    :param out_dir: If given, each result is written to a file in this
+                    directory instead of being returned as a string.
+    :type out_dir: str
+    :param name_format: File name format, applied to the index of the task
+    :type name_format: str
+    :param chunk_size: Number of tasks sent to a worker at a time, by default
+                       tasks are divided in a few chunks per worker.
+    :type chunk_size: int
+    :return: The rendered strings, or the paths of the written files,
+             in the order of `tasks`.
+    :rtype: list
+    """
+    global _tasks
+
+    tasks = list(tasks)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    workers = max(1, min(workers, len(tasks)))
+
+    if out_dir is not None and not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    if workers == 1:
+        return [_render_task(task, index, out_dir, name_format) for index, task in enumerate(tasks)]
+
+    if chunk_size is None:
+        chunk_size = max(1, len(tasks) // (4 * workers))
+
+    if _FORK:
+        # Tasks have to be in place before the pool forks
+        _tasks = tasks
+        func = _render_inherited
+        arguments = [(index, out_dir, name_format) for index in range(len(tasks))]
+    else:
+        func = _render_pickled
+        arguments = [(task, index, out_dir, name_format) for index, task in enumerate(tasks)]
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = pool.map(func, arguments, chunk_size)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        _tasks = None
+        pool.join()
+
+    return results
@@ -0,0 +1,283 @@
+"""
+Overlap detection between the collisions in a model or link. Candidate
+pairs are found with a sweep and prune over the bounding boxes of all
+collision geometries, after which the candidates are tested exactly
+with GJK (https://en.wikipedia.org/wiki/Gilbert-Johnson-Keerthi_distance_algorithm).
+
+Geometries are tested through their bounding shapes (see
+`BaseGeometry.get_bounding_shape`), which are exact for boxes, spheres
+and cylinders and the bounding box of the file for meshes. Meshes
+that are not on the local file system are skipped.
+"""
+from __future__ import division
+import numpy as np
+from ..math import Vector3Array, QuaternionArray
+from ..math.aabb import shape_bounds_batch
+from ..math.arrays import quaternion_matrix_batch
+from ..link import Link
+from ..structure import Collision
+
+# Maximum number of GJK iterations, pairs for which the
+# search does not finish are reported as separated.
+GJK_ITERATIONS = 64
+
+# Minimum progress of a GJK iteration relative to the
+# length of the search direction.
+GJK_TOLERANCE = 1e-9
+
+_EPS = 1e-12
+
+
+def sweep_and_prune(lower, upper):
+    """
+    Finds all pairs of overlapping axis aligned boxes, sorting the boxes
+    along the axis on which they are spread the most.
+    :param lower: (N, 3) array of lower bounds
+    :type lower: ndarray
+    :param upper: (N, 3) array of upper bounds
+    :type upper: ndarray
+    :return: List of index pairs `(i, j)` with `i < j`
+    :rtype: list
+    """
+    lower = np.asarray(lower, dtype=np.float_).reshape(-1, 3)
+    upper = np.asarray(upper, dtype=np.float_).reshape(-1, 3)
+    if len(lower) < 2:
+        return []
+
+    axis = np.argmax((lower + upper).var(axis=0))
+    order = np.argsort(lower[:, axis], kind='mergesort')
+    sorted_lower = lower[order, axis]
+
+    # For each box, the boxes that start before it ends
+    ends = np.searchsorted(sorted_lower, upper[order, axis], side='right')
+
+    pairs = []
+    for i in range(len(order) - 1):
+        candidates = order[i + 1:ends[i]]
+        if not len(candidates):
+            continue
+
+        a = order[i]
+        overlap = np.all((lower[candidates] <= upper[a]) & (lower[a] <= upper[candidates]), axis=1)
+        pairs.extend((min(a, b), max(a, b)) for b in candidates[overlap].tolist())
+
+    return pairs
+
+
+class _Shape(object):
+    """
+    A posed bounding shape with a support function for GJK.
+    """
+
+    def __init__(self, position, matrix, center, half_extents, radius, disc_radius):
+        self.position = position
+        self.matrix = matrix
+        self.center = center
+        self.half_extents = half_extents
+        self.radius = radius
+        self.disc_radius = disc_radius
+
+    def support(self, direction):
+        """
+        :param direction: Direction in the world frame
+        :return: The point of this shape furthest along the direction
+        """
+        d = self.matrix.T.dot(direction)
+        point = self.center + np.sign(d) * self.half_extents
+
+        norm = np.sqrt(d.dot(d))
+        if self.radius and norm > _EPS:
+            point += (self.radius / norm) * d
+
+        disc_norm = np.sqrt(d[0] * d[0] + d[1] * d[1])
+        if self.disc_radius and disc_norm > _EPS:
+            point[:2] += (self.disc_radius / disc_norm) * d[:2]
+
+        return self.matrix.dot(point) + self.position
+
+    def get_world_center(self):
+        """
+        :return:
+        """
+        return self.matrix.dot(self.center) + self.position
+
+
+def _line(simplex):
+    """
+    Line case of the GJK simplex update, `simplex` is `[b, a]` where
+    `a` is the newest point.
+    :return: New search direction
+    """
+    b, a = simplex
+    ab, ao = b - a, -a
+    if ab.dot(ao) > 0:
+        return np.cross(np.cross(ab, ao), ab)
+
+    simplex[:] = [a]
+    return ao
+
+
+def _triangle(simplex):
+    """
+    Triangle case of the GJK simplex update, `simplex` is `[c, b, a]`.
+    :return: New search direction
+    """
+    c, b, a = simplex
+    ab, ac, ao = b - a, c - a, -a
+    abc = np.cross(ab, ac)
+
+    if np.cross(abc, ac).dot(ao) > 0:
+        if ac.dot(ao) > 0:
+            simplex[:] = [c, a]
+            return np.cross(np.cross(ac, ao), ac)
+
+        simplex[:] = [b, a]
+        return _line(simplex)
+
+    if np.cross(ab, abc).dot(ao) > 0:
+        simplex[:] = [b, a]
+        return _line(simplex)
+
+    if abc.dot(ao) > 0:
+        return abc
+
+    simplex[:] = [b, c, a]
+    return -abc
+
+
+def _tetrahedron(simplex):
+    """
+    Tetrahedron case of the GJK simplex update, `simplex` is `[d, c, b, a]`.
+    :return: New search direction, or `None` if the tetrahedron
+             contains the origin.
+    """
+    d, c, b, a = simplex
+    ao = -a
+    for p, q, opposite in ((c, b, d), (d, c, b), (b, d, c)):
+        normal = np.cross(q - a, p - a)
+        if normal.dot(opposite - a) > 0:
+            normal = -normal
+
+        if normal.dot(ao) > 0:
+            simplex[:] = [p, q, a]
+            return _triangle(simplex)
+
+    return None
+
+
+def gjk_intersect(shape1, shape2):
+    """
+    :param shape1:
+    :type shape1: _Shape
+    :param shape2:
+    :type shape2: _Shape
+    :return: Whether two convex shapes overlap
+    :rtype: bool
+    """
+    def support(direction):
+        return shape1.support(direction) - shape2.support(-direction)
+
+    direction = shape2.get_world_center() - shape1.get_world_center()
+    if direction.dot(direction) < _EPS:
+        direction = np.array([1.0, 0.0, 0.0])
+
+    simplex = [support(direction)]
+    direction = -simplex[0]
+    updates = {2: _line, 3: _triangle, 4: _tetrahedron}
+
+    for _ in range(GJK_ITERATIONS):
+        if direction.dot(direction) < _EPS:
+            # Origin lies on the simplex
+            return True
+
+        point = support(direction)
+        projection = point.dot(direction)
+        if projection <= 0:
+            return False
+
+        # Without progress towards the origin the simplex holds the
+        # closest point of the difference, which is not the origin.
+        if projection - max(p.dot(direction) for p in simplex) < \
+                GJK_TOLERANCE * np.sqrt(direction.dot(direction)):
+            return False
+
+        simplex.append(point)
+        direction = updates[len(simplex)](simplex)
+        if direction is None:
+            return True
+
+    return False
+
+
+def _get_link(element):
+    """
+    :param element:
+    :return: The link an element belongs to, if any
+    """
+    while element is not None and not isinstance(element, Link):
+        element = element.get_parent()
+
+    return element
+
+
+def find_collisions(posable, tolerance=1e-6, same_link=False):
+    """
+    Finds all overlapping pairs of collision elements in a posable
+    (typically a `Model` or a `Link`).
+    :param posable:
+    :type posable: Posable
+    :param tolerance: Penetrations smaller than this are not reported, so
+                      touching surfaces (as after `align`) do not count
+                      as overlapping.
+    :type tolerance: float
+    :param same_link: Also report pairs of collisions in the same link
+    :type same_link: bool
+    :return: List of overlapping `(collision, collision)` pairs
+    :rtype: list
+    """
+    collisions = posable.get_elements_of_type(Collision, recursive=True)
+    owners = []
+    geometries = []
+    shapes = []
+    for index, collision in enumerate(collisions):
+        for geometry in collision.get_geometries():
+            # Geometries with unknown bounds cannot be tested
+            shape = geometry.get_bounding_shape()
+            if shape is not None:
+                owners.append(index)
+                geometries.append(geometry)
+                shapes.append(shape)
+
+    if len(geometries) < 2:
+        return []
+
+    transforms = [geometry.get_world_transform() for geometry in geometries]
+    positions = Vector3Array.from_list(t.position for t in transforms).data
+    rotations = QuaternionArray.from_list(t.rotation for t in transforms).data
+
+    # Shrink all shapes by half the tolerance
+    margin = 0.5 * tolerance
+    centers = np.array([shape[0] for shape in shapes], dtype=np.float_).reshape(-1, 3)
+    half_extents = np.maximum(0, np.array([shape[1] for shape in shapes], dtype=np.float_) - margin)
+    radii = np.maximum(0, np.array([shape[2] for shape in shapes], dtype=np.float_) - margin)
+    disc_radii = np.maximum(0, np.array([shape[3] for shape in shapes], dtype=np.float_) - margin)
+
+    lower, upper = shape_bounds_batch(positions, rotations, centers, half_extents, radii, disc_radii)
+    matrices = quaternion_matrix_batch(rotations)
+
+    links = [_get_link(collision) for collision in collisions]
+    found = set()
+    for i, j in sweep_and_prune(lower, upper):
+        a, b = owners[i], owners[j]
+        if a == b or (a, b) in found:
+            continue
+
+        if not same_link and links[a] is not None and links[a] is links[b]:
+            continue
+
+        shape1 = _Shape(positions[i], matrices[i], centers[i], half_extents[i], radii[i], disc_radii[i])
+        shape2 = _Shape(positions[j], matrices[j], centers[j], half_extents[j], radii[j], disc_radii[j])
+        if gjk_intersect(shape1, shape2):
+            found.add((a, b))
+
+    return [(collisions[a], collisions[b]) for a, b in sorted(found)]
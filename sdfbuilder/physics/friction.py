@@ -1,5 +1,5 @@
 from ..element import Element
-from ..util import number_format as nf
+from ..util import number_format as nf, number_format_join as nfj
 from ..math import Vector3
 
 
@@ -61,8 +61,7 @@ class Friction(Element):
             bullet.add_element("<friction2>%s</friction2>" % f2)
 
         if self.fdir1 is not None:
-            x, y, z = self.fdir1
-            fdir = "%s %s %s" % (nf(x), nf(y), nf(z))
+            fdir = nfj(self.fdir1)
             ode.add_element("<fdir1>%s</fdir1>" % fdir)
             bullet.add_element("<fdir1>%s</fdir1>" % fdir)
 
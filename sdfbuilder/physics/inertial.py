@@ -1,5 +1,6 @@
 from ..element import Element
-from ..util import number_format as nf
+from ..util import number_format as nf, number_format_list as nfl
+from ..math.arrays import quaternion_matrix_batch
 import numpy as np
 
 
@@ -37,6 +38,41 @@ def transform_inertia_tensor(mass, tensor, displacement, rotation):
     return it + mass * (t1.dot(t1) * np.eye(3) - np.outer(t1.data, t1.data))
 
 
+def combine_inertia_tensors(masses, tensors, displacements, rotations):
+    """
+    Vectorized `transform_inertia_tensor`, which transforms N inertia
+    tensors at once and returns their sum, i.e. the inertia tensor of
+    the combined body.
+    :param masses: Array of N masses
+    :type masses: ndarray
+    :param tensors: (N, 3, 3) array of inertia tensors
+    :type tensors: ndarray
+    :param displacements: (N, 3) array of displacement vectors `d`,
+                          as in `transform_inertia_tensor`.
+    :type displacements: ndarray
+    :param rotations: (N, 4) array of rotation quaternions, as
+                      in `transform_inertia_tensor`.
+    :type rotations: ndarray
+    :return: The combined 3x3 inertia tensor
+    :rtype: ndarray
+    """
+    masses = np.asarray(masses, dtype=np.float_).reshape(-1)
+    if not len(masses):
+        return np.zeros((3, 3))
+
+    tensors = np.asarray(tensors, dtype=np.float_).reshape(-1, 3, 3)
+    d = np.asarray(displacements, dtype=np.float_).reshape(-1, 3)
+    r = quaternion_matrix_batch(rotations)
+
+    # Sum of the rotated tensors R I R^T
+    total = np.einsum('nij,njk,nlk->il', r, tensors, r)
+
+    # Sum of the parallel axis terms m (|d|^2 E - d d^T)
+    total += np.eye(3) * np.einsum('n,ni,ni->', masses, d, d)
+    total -= np.einsum('n,ni,nj->ij', masses, d, d)
+    return total
+
+
 class Inertial(Element):
     """
     Convenience class for inertial elements
@@ -75,8 +111,8 @@ class Inertial(Element):
                  "<iyy>%s</iyy>"
                  "<iyz>%s</iyz>"
                  "<izz>%s</izz>"
-                 "</inertia>" % (nf(self.ixx), nf(self.ixy), nf(self.ixz),
-                                 nf(self.iyy), nf(self.iyz), nf(self.izz)))
+                 "</inertia>" % tuple(nfl((self.ixx, self.ixy, self.ixz,
+                                           self.iyy, self.iyz, self.izz))))
         return body
 
     @staticmethod
@@ -0,0 +1,344 @@
+"""
+Mass properties (volume, center of mass and inertia tensor) of closed
+triangle meshes, read from STL (ASCII or binary) and OBJ files.
+Binary STL files are memory mapped and reduced in chunks, so large files
+are never fully converted in memory.
+
+The properties are calculated by summing the signed tetrahedra formed
+by each triangle and the origin, see e.g.
+http://number-none.com/blow/inertia/deriving_i.html
+"""
+from __future__ import division
+import os
+import struct
+import numpy as np
+
+# Record of a binary STL triangle
+STL_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attribute', '<u2')
+])
+
+# Number of triangles converted to floats at a time in reductions
+CHUNK_SIZE = 1 << 16
+
+# Parsed triangles by absolute path, mass properties and
+# bounds by (path, scale).
+_triangle_cache = {}
+_properties_cache = {}
+_bounds_cache = {}
+
+
+class MeshProperties(object):
+    """
+    Mass properties of a mesh for unit density, i.e. the mass equals the volume.
+    """
+
+    def __init__(self, volume, center_of_mass, covariance):
+        """
+        :param volume:
+        :type volume: float
+        :param center_of_mass: Center of mass as an array of length 3
+        :type center_of_mass: ndarray
+        :param covariance: The 3x3 second moment of volume about the origin
+        :type covariance: ndarray
+        :return:
+        """
+        self.volume = volume
+        self.center_of_mass = center_of_mass
+        self.covariance = covariance
+
+    def get_inertia_tensor(self, mass=None):
+        """
+        Returns the inertia tensor relative to the center of mass.
+        :param mass: The total mass, uses unit density if not given.
+        :type mass: float
+        :return:
+        :rtype: ndarray
+        """
+        com = self.center_of_mass
+        covariance = self.covariance - self.volume * np.outer(com, com)
+        tensor = np.trace(covariance) * np.eye(3) - covariance
+
+        if mass is not None:
+            tensor *= mass / self.volume
+
+        return tensor
+
+    def scaled(self, scale):
+        """
+        Returns the properties of this mesh scaled along its axes.
+        :param scale: A single scale factor or a scale factor for each axis
+        :type scale: float|tuple
+        :return:
+        :rtype: MeshProperties
+        """
+        factors = np.empty(3)
+        factors[:] = scale
+        det = factors.prod()
+        covariance = abs(det) * self.covariance * np.outer(factors, factors)
+        return MeshProperties(abs(det) * self.volume, factors * self.center_of_mass, covariance)
+
+
+def _chunks(triangles, chunk_size):
+    """
+    Yields float copies of consecutive chunks of a triangle array.
+    :param triangles:
+    :param chunk_size:
+    :return:
+    """
+    for start in range(0, len(triangles), chunk_size):
+        yield np.asarray(triangles[start:start + chunk_size], dtype=np.float_).reshape(-1, 3, 3)
+
+
+def calculate_properties(triangles, chunk_size=CHUNK_SIZE):
+    """
+    Calculates the mass properties of a closed mesh.
+    :param triangles: (N, 3, 3) array of triangles, where `triangles[i, j]`
+                      is vertex `j` of triangle `i`.
+    :type triangles: ndarray
+    :param chunk_size: Number of triangles to process at a time
+    :type chunk_size: int
+    :return:
+    :rtype: MeshProperties
+    """
+    if not len(triangles):
+        raise ValueError("Cannot calculate the mass properties of an empty mesh.")
+
+    volume = 0.0
+    first_moment = np.zeros(3)
+    covariance = np.zeros((3, 3))
+    for t in _chunks(triangles, chunk_size):
+        # Six times the signed volume of each tetrahedron
+        det = np.einsum('ni,ni->n', t[:, 0], np.cross(t[:, 1], t[:, 2]))
+        vertex_sum = t.sum(axis=1)
+        volume += det.sum() / 6.0
+        first_moment += det.dot(vertex_sum) / 24.0
+
+        # The covariance of a tetrahedron (0, a, b, c) is `det * A C A^T`, where A has
+        # columns a, b, c and C is the covariance of the canonical tetrahedron
+        # (0, e1, e2, e3), which is (I + ones) / 120.
+        weighted = det[:, np.newaxis] * vertex_sum
+        covariance += (np.einsum('nki,nkj->ij', det[:, np.newaxis, np.newaxis] * t, t) +
+                       weighted.T.dot(vertex_sum)) / 120.0
+
+    if volume < 0:
+        # Inward facing triangles
+        volume, first_moment, covariance = -volume, -first_moment, -covariance
+
+    if volume == 0:
+        raise ValueError("Mesh has no volume, it is probably not closed.")
+
+    return MeshProperties(volume, first_moment / volume, covariance)
+
+
+def calculate_bounds(triangles, chunk_size=CHUNK_SIZE):
+    """
+    Calculates the axis aligned bounds of a mesh.
+    :param triangles: (N, 3, 3) array of triangles
+    :type triangles: ndarray
+    :param chunk_size: Number of triangles to process at a time
+    :type chunk_size: int
+    :return: Arrays with the lower and upper bounds
+    :rtype: tuple
+    """
+    if not len(triangles):
+        raise ValueError("Cannot calculate the bounds of an empty mesh.")
+
+    lower = np.empty(3)
+    lower.fill(np.inf)
+    upper = -lower
+    for t in _chunks(triangles, chunk_size):
+        lower = np.minimum(lower, t.min(axis=(0, 1)))
+        upper = np.maximum(upper, t.max(axis=(0, 1)))
+
+    return lower, upper
+
+
+def map_binary_stl(path):
+    """
+    Memory maps a binary STL file.
+    :param path:
+    :type path: str
+    :return: The (N, 3, 3) array of triangle vertices as a float32 view
+             on the mapped file, or `None` if this is not a binary STL file.
+    :rtype: ndarray
+    """
+    size = os.path.getsize(path)
+    if size < 84:
+        return None
+
+    with open(path, 'rb') as f:
+        f.seek(80)
+        count, = struct.unpack('<I', f.read(4))
+
+    if size != 84 + count * STL_DTYPE.itemsize:
+        return None
+
+    if not count:
+        return np.zeros((0, 3, 3), dtype=np.float32)
+
+    records = np.memmap(path, dtype=STL_DTYPE, mode='r', offset=84, shape=(count,))
+    return records['vertices']
+
+
+def read_stl(data):
+    """
+    Reads the triangles from the contents of an ASCII or binary STL file.
+    :param data:
+    :type data: str
+    :return: (N, 3, 3) array of triangles, which is a float32
+             view on `data` for binary files.
+    :rtype: ndarray
+    """
+    if len(data) >= 84:
+        count, = struct.unpack('<I', data[80:84])
+        if len(data) == 84 + count * STL_DTYPE.itemsize:
+            records = np.frombuffer(data, dtype=STL_DTYPE, count=count, offset=84)
+            return records['vertices']
+
+    if not data.lstrip().startswith(b'solid'):
+        raise ValueError("Invalid STL file.")
+
+    values = [line.split()[1:4] for line in data.splitlines()
+              if line.lstrip().startswith(b'vertex')]
+    return np.array(values, dtype=np.float_).reshape(-1, 3, 3)
+
+
+def read_obj(data):
+    """
+    Reads the triangles from the contents of an OBJ file. Polygon
+    faces are split into triangle fans.
+    :param data:
+    :type data: str
+    :return: (N, 3, 3) array of triangles
+    :rtype: ndarray
+    """
+    vertices = []
+    faces = []
+    for line in data.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+
+        if parts[0] == b'v':
+            vertices.append(parts[1:4])
+        elif parts[0] == b'f':
+            # Indices are one based, negative indices are relative
+            # to the end of the current vertex list.
+            indices = [int(part.split(b'/')[0]) for part in parts[1:]]
+            indices = [i - 1 if i > 0 else len(vertices) + i for i in indices]
+            faces.extend((indices[0], indices[i], indices[i + 1])
+                         for i in range(1, len(indices) - 1))
+
+    vertices = np.array(vertices, dtype=np.float_).reshape(-1, 3)
+    return vertices[np.array(faces, dtype=np.int_).reshape(-1, 3)]
+
+
+def load_triangles(path):
+    """
+    Loads the triangles of an STL or OBJ file, caching the result.
+    :param path:
+    :type path: str
+    :return: (N, 3, 3) array of triangles, do not modify it. This is
+             a memory mapped float32 array for binary STL files.
+    :rtype: ndarray
+    """
+    path = os.path.abspath(path)
+    triangles = _triangle_cache.get(path)
+    if triangles is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.stl':
+            triangles = map_binary_stl(path)
+            reader = read_stl
+        elif extension == '.obj':
+            reader = read_obj
+        else:
+            raise ValueError("Unsupported mesh format '%s'." % extension)
+
+        if triangles is None:
+            with open(path, 'rb') as f:
+                triangles = reader(f.read())
+
+        _triangle_cache[path] = triangles
+
+    return triangles
+
+
+def _scale_key(path, scale):
+    """
+    :param path:
+    :param scale:
+    :return: Cache key for a path and scale
+    """
+    return path, None if scale is None else tuple(np.broadcast_to(scale, 3))
+
+
+def get_mesh_properties(path, scale=None):
+    """
+    Returns the unit density mass properties of a mesh file. Results are
+    cached by path and scale, so a file is only parsed once.
+    :param path:
+    :type path: str
+    :param scale: A single scale factor or a scale factor for each axis
+    :type scale: float|tuple
+    :return:
+    :rtype: MeshProperties
+    """
+    path = os.path.abspath(path)
+    key = _scale_key(path, scale)
+    properties = _properties_cache.get(key)
+    if properties is None:
+        properties = _properties_cache.get((path, None))
+        if properties is None:
+            properties = calculate_properties(load_triangles(path))
+            _properties_cache[(path, None)] = properties
+
+        if scale is not None:
+            properties = properties.scaled(scale)
+
+        _properties_cache[key] = properties
+
+    return properties
+
+
+def get_mesh_bounds(path, scale=None):
+    """
+    Returns the axis aligned bounds of a mesh file, cached
+    by path and scale.
+    :param path:
+    :type path: str
+    :param scale: A single scale factor or a scale factor for each axis
+    :type scale: float|tuple
+    :return: Arrays with the lower and upper bounds, do not modify them.
+    :rtype: tuple
+    """
+    path = os.path.abspath(path)
+    key = _scale_key(path, scale)
+    bounds = _bounds_cache.get(key)
+    if bounds is None:
+        bounds = _bounds_cache.get((path, None))
+        if bounds is None:
+            bounds = _bounds_cache[(path, None)] = calculate_bounds(load_triangles(path))
+
+        if scale is not None:
+            # Negative scales swap the bounds
+            factors = np.array(key[1])
+            lower, upper = factors * bounds[0], factors * bounds[1]
+            bounds = np.minimum(lower, upper), np.maximum(lower, upper)
+
+        _bounds_cache[key] = bounds
+
+    return bounds
+
+
+def clear_mesh_cache():
+    """
+    Clears the cached triangles and mass properties, i.e. when
+    mesh files have changed.
+    :return:
+    """
+    _triangle_cache.clear()
+    _properties_cache.clear()
+    _bounds_cache.clear()
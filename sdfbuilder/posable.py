@@ -1,9 +1,10 @@
 from __future__ import print_function
 from __future__ import absolute_import
 import sys
-from .element import Element
-from .math import Vector3, Quaternion, RotationMatrix
-from .util import number_format as nf
+from .element import Element, add_render_pass
+from .math import Vector3, Quaternion, RotationMatrix, Transform, Vector3Array, QuaternionArray, AABB
+from .math.aabb import shape_bounds_batch
+from .util import number_format_join as nfj
 
 
 class Pose(Element):
@@ -14,6 +15,15 @@ class Pose(Element):
 
     TAG_NAME = 'pose'
 
+    CACHE_ATTRIBUTES = Element.CACHE_ATTRIBUTES | frozenset(['_transform', '_rpy'])
+
+    # Poses are changed through their posables
+    INTERNABLE = False
+
+    # Cached `Transform` and roll / pitch / yaw tuple for this pose
+    _transform = None
+    _rpy = None
+
     def __init__(self, position=None, rotation=None, **kwargs):
         """
         """
@@ -23,20 +33,99 @@ class Pose(Element):
         self.position = Vector3() if position is None else position
         self.rotation = Quaternion() if rotation is None else rotation
 
+    def invalidate(self):
+        """
+        Also clears the cached transform
+        :return:
+        """
+        self._transform = None
+        self._rpy = None
+        super(Pose, self).invalidate()
+
+    def get_rpy(self):
+        """
+        :return: The (cached) roll, pitch and yaw of this pose's rotation
+        :rtype: tuple
+        """
+        if self._rpy is None:
+            self._rpy = _get_rpy([self.rotation])[0]
+
+        return self._rpy
+
+    def get_transform(self):
+        """
+        Returns the transform from the frame described by this pose
+        to its parent frame. The transform is cached until the pose
+        changes; treat it as read-only.
+        :return:
+        :rtype: Transform
+        """
+        if self._transform is None:
+            self._transform = Transform(self.position, self.rotation)
+
+        return self._transform
+
     def render_body(self):
         """
         :return:
         """
         body = super(Pose, self).render_body()
-        roll, pitch, yaw = self.rotation.get_rpy()
-        x, y, z = self.position.x, self.position.y, self.position.z
-
-        body += "%s %s %s %s %s %s" % (nf(x), nf(y), nf(z),
-                                       nf(roll), nf(pitch), nf(yaw))
+        position = self.position
+        body += nfj((position.x, position.y, position.z) + self.get_rpy())
 
         return body
 
 
+def _get_rpy(rotations):
+    """
+    Converts rotations to roll / pitch / yaw for rendering. Poses
+    are converted through this function both on their own and in
+    the render pass, so a pose renders the same either way.
+    :param rotations:
+    :type rotations: list[Quaternion]
+    :return: List of `(roll, pitch, yaw)` tuples
+    :rtype: list
+    """
+    return [tuple(values) for values in QuaternionArray.from_list(rotations).get_rpy().tolist()]
+
+
+def _prepare_poses(root):
+    """
+    Render pass that converts the rotations of all poses in the
+    tree that need rendering to roll / pitch / yaw in one go.
+    Subtrees with a cached render are skipped.
+    :param root:
+    :type root: Element
+    :return:
+    """
+    poses = []
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        if element._get_cached_render() is not None:
+            continue
+
+        if isinstance(element, Pose):
+            if element._rpy is None:
+                poses.append(element)
+
+            continue
+
+        state = element.__dict__
+        stack.extend(el for el in state.get('elements', ()) if isinstance(el, Element))
+        for name in element.CHILD_ATTRIBUTES:
+            child = state.get(name)
+            if isinstance(child, Element):
+                stack.append(child)
+
+    if len(poses) > 1:
+        for pose, rpy in zip(poses, _get_rpy([pose.rotation for pose in poses])):
+            pose._rpy = rpy
+
+
+add_render_pass(_prepare_poses)
+
+
 class Posable(Element):
     """
     Posable is a base class for elements with a name
@@ -55,6 +144,22 @@ class Posable(Element):
     # In this case, set this to false in subclasses.
     RENDER_POSE = True
 
+    # Posables are placed relative to their parent, so
+    # they cannot be shared between parents.
+    INTERNABLE = False
+
+    # The pose is rendered as a child element
+    CHILD_ATTRIBUTES = ('_pose',)
+
+    CACHE_ATTRIBUTES = Element.CACHE_ATTRIBUTES | frozenset(['_world_transform', '_aabb_cache'])
+
+    # Tuple of the parent frame transform and own transform the
+    # cached world transform was calculated from, and the result.
+    _world_transform = None
+
+    # Cached bounding boxes by frame
+    _aabb_cache = None
+
     def __init__(self, name, pose=None, **kwargs):
         """
         :param name:
@@ -88,6 +193,7 @@ class Posable(Element):
         :return:
 
         """
+        self.apply_parent_transform()
         self._pose.rotation = rotation.copy()
 
     def get_rotation(self):
@@ -96,6 +202,7 @@ class Posable(Element):
         :return:
         :rtype: Quaternion
         """
+        self.apply_parent_transform()
         return self._pose.rotation.copy()
 
     def set_position(self, position):
@@ -104,6 +211,7 @@ class Posable(Element):
         :param position:
         :return:
         """
+        self.apply_parent_transform()
         self._pose.position = position.copy()
 
     def get_position(self):
@@ -112,6 +220,7 @@ class Posable(Element):
         :return:
         :rtype: Vector3
         """
+        self.apply_parent_transform()
         return self._pose.position.copy()
 
     def get_pose(self):
@@ -119,8 +228,152 @@ class Posable(Element):
         :return: Pose object. Warning: this is not a copy.
         :rtype: Pose
         """
+        self.apply_parent_transform()
         return self._pose
 
+    def apply_parent_transform(self):
+        """
+        Brings this posable's pose up to date if any of its ancestors
+        is a lazy `PosableGroup` with a pending transform. This includes
+        groups further up than the direct parent, such as the group
+        around the link or structure a geometry belongs to.
+        :return:
+        """
+        groups = []
+        parent = self.get_parent()
+        while parent is not None:
+            if isinstance(parent, PosableGroup):
+                groups.append(parent)
+
+            parent = parent.get_parent()
+
+        # The pending transform of an outer group moves the groups
+        # inside it, which may make their own transforms pending.
+        for group in reversed(groups):
+            if group._pending_transform is not None:
+                group.apply_pending_transform()
+
+    def get_transform(self):
+        """
+        Returns the transform from this posable's frame to its parent
+        frame. This is cached until the pose changes.
+        :return:
+        :rtype: Transform
+        """
+        return self.get_pose().get_transform()
+
+    def get_world_transform(self):
+        """
+        Returns the transform from this posable's frame to the world
+        frame, following the parents of this posable. The result is cached
+        until the pose of this posable or of one of its ancestors changes,
+        or the posable is moved to another parent. Since pose transforms
+        are cached until the pose changes, and world transforms until
+        their inputs change, this compares the inputs by identity.
+        :return:
+        :rtype: Transform
+        """
+        frame = self.get_parent_frame_transform()
+        local = self.get_transform()
+        cached = self._world_transform
+        if cached is not None and cached[0] is frame and cached[1] is local:
+            return cached[2]
+
+        transform = frame * local
+        self._world_transform = (frame, local, transform)
+        return transform
+
+    def get_world_pose(self):
+        """
+        :return: A new pose with the position and rotation of this
+                 posable in the world frame.
+        :rtype: Pose
+        """
+        transform = self.get_world_transform()
+        return Pose(transform.position.copy(), transform.rotation.copy())
+
+    def get_frame_transform(self, child):
+        """
+        Children of a posable are expressed in its frame.
+        :param child:
+        :return:
+        :rtype: Transform
+        """
+        return self.get_world_transform()
+
+    def invalidate(self):
+        """
+        Also clears the cached bounding boxes
+        :return:
+        """
+        self.__dict__['_aabb_cache'] = None
+        super(Posable, self).invalidate()
+
+    def get_geometries(self):
+        """
+        Returns the simple geometries inside this posable, i.e. the geometries
+        of all structures in it with compound geometries expanded.
+        :return:
+        :rtype: list
+        """
+        geometries = []
+        for element in self.elements:
+            if isinstance(element, Posable):
+                geometries += element.get_geometries()
+
+        return geometries
+
+    def get_aabb(self, parent_frame=False):
+        """
+        Returns the axis aligned bounding box of the geometries in this
+        posable. Geometries with unknown bounds, such as meshes that are
+        not on the local file system, are left out. The box is cached
+        until this posable changes, treat it as read-only.
+        :param parent_frame: Return the box in the parent frame rather than
+                             in this posable's own frame.
+        :type parent_frame: bool
+        :return: The bounding box, or `None` if there are no geometries
+                 with known bounds.
+        :rtype: AABB
+        """
+        cache = self._aabb_cache
+        if cache is None:
+            cache = self.__dict__['_aabb_cache'] = {}
+
+        parent_frame = bool(parent_frame)
+        if parent_frame not in cache:
+            cache[parent_frame] = self._calculate_aabb(parent_frame)
+
+        return cache[parent_frame]
+
+    def _calculate_aabb(self, parent_frame):
+        """
+        :param parent_frame:
+        :return:
+        :rtype: AABB
+        """
+        # Geometries can be shared between structures
+        geometries = []
+        shapes = []
+        for geometry in dict((id(g), g) for g in self.get_geometries()).values():
+            shape = geometry.get_bounding_shape()
+            if shape is not None:
+                geometries.append(geometry)
+                shapes.append(shape)
+
+        if not geometries:
+            return None
+
+        # Poses of all geometries relative to the requested frame
+        frame = self.get_parent_frame_transform() if parent_frame else self.get_world_transform()
+        inverse = frame.inversed()
+        transforms = [geometry.get_world_transform() for geometry in geometries]
+        positions = inverse * Vector3Array.from_list(t.position for t in transforms)
+        rotations = inverse.rotation * QuaternionArray.from_list(t.rotation for t in transforms)
+        lower, upper = shape_bounds_batch(positions.data, rotations.data,
+                                          *[[shape[i] for shape in shapes] for i in range(4)])
+        return AABB.from_bounds(lower, upper)
+
     def translate(self, translation):
         """
         :type translation: Vector3
@@ -183,73 +436,66 @@ class Posable(Element):
         """
         Returns the given direction vector / rotation quaternion relative to the parent frame.
         :param vec: Vector or quaternion in the local frame
-        :type vec: Vector3|Quaternion
+        :type vec: Vector3|Vector3Array|Quaternion
         :return:
-        :rtype: Vector3|Quaternion
+        :rtype: Vector3|Vector3Array|Quaternion
         """
-        return self.get_rotation() * vec
+        return self.get_transform().apply_direction(vec)
 
     def to_local_direction(self, vec):
         """
         Returns the given direction vector / rotation quaternion relative to the local frame
         :param vec: Direction vector or orientation in the parent frame
-        :type vec: Vector3|Quaternion
+        :type vec: Vector3|Vector3Array|Quaternion
         :return:
-        :rtype: Vector3|Quaternion
+        :rtype: Vector3|Vector3Array|Quaternion
         """
-        return self.get_rotation().conjugated() * vec
+        return self.get_transform().inversed().apply_direction(vec)
 
     def to_parent_frame(self, point):
         """
         Returns the given point relative to the parent frame
         :param point: Point in the local frame
-        :type point: Vector3
+        :type point: Vector3|Vector3Array
         :return:
-        :rtype: Vector3
+        :rtype: Vector3|Vector3Array
         """
-        pos = self.get_position()
-        return self.to_parent_direction(point) + pos
+        return self.get_transform().apply(point)
 
     def to_local_frame(self, point):
         """
         Returns the given point relative to the local frame
         :param point: Point in the parent frame
-        :type point: Vector3
+        :type point: Vector3|Vector3Array
         :return:
-        :rtype: Vector3
+        :rtype: Vector3|Vector3Array
         """
-        rot = self.get_rotation().conjugated()
-        pos = self.get_position()
-        return rot * (point - pos)
+        return self.get_transform().inversed().apply(point)
 
     def to_sibling_frame(self, point, sibling):
         """
         Takes a point and converts it to the frame of a sibling
         :param point:
-        :type point: Vector3
+        :type point: Vector3|Vector3Array
         :param sibling:
         :type sibling: Posable
         :return: The point in the sibling's frame
-        :rtype: Vector3
+        :rtype: Vector3|Vector3Array
         """
-        # Do this the easy way: convert to parent, then
-        # back to sibling
-        in_parent = self.to_parent_frame(point)
-        return sibling.to_local_frame(in_parent)
+        return self.get_transform().relative_to(sibling.get_transform()).apply(point)
 
     def to_sibling_direction(self, vec, sibling):
         """
         Returns the given direction vector / orientation quaternion
         relative to the frame of a sibling
         :param vec: Direction vector / orientation quaternion in the child frame
-        :type vec: Vector3|Quaternion
+        :type vec: Vector3|Vector3Array|Quaternion
         :param sibling: The sibling posable
         :type sibling: Posable
         :return:
-        :rtype: Vector3|Quaternion
+        :rtype: Vector3|Vector3Array|Quaternion
         """
-        in_parent = self.to_parent_direction(vec)
-        return sibling.to_local_direction(in_parent)
+        return self.get_transform().relative_to(sibling.get_transform()).apply_direction(vec)
 
     def align(self, my, my_normal, my_tangent, at,
               at_normal, at_tangent, of, relative_to_child=True):
@@ -369,6 +615,10 @@ class PosableGroup(Posable):
     them inside a link or a model). This lets you conveniently move
     the items within the group together, whilst their position remains
     relative to the groups parent.
+
+    In lazy mode, moving the group only collects the movement in a pending
+    transform, which is applied to the child poses when one of them is read,
+    when they are rendered or when the group's elements change.
     """
 
     # We don't want to render outer posable group
@@ -377,7 +627,11 @@ class PosableGroup(Posable):
     # Do not render the `Pose` element
     RENDER_POSE = False
 
-    def __init__(self, name=None, pose=None, **kwargs):
+    # Transform that still has to be applied to the affected
+    # posables in lazy mode.
+    _pending_transform = None
+
+    def __init__(self, name=None, pose=None, lazy=False, **kwargs):
         """
         Overrides init to make name optional, it is not useful
         for posable groups.
@@ -385,10 +639,24 @@ class PosableGroup(Posable):
         :type name: str
         :param pose:
         :type pose: Pose
+        :param lazy: Defer moving the posables in this group
+                     until their poses are needed.
+        :type lazy: bool
         :param kwargs:
         :return:
         """
         super(PosableGroup, self).__init__(name=name, pose=pose, **kwargs)
+        self.lazy = lazy
+
+    def get_frame_transform(self, child):
+        """
+        Posable groups do not introduce a new frame, their children
+        share the frame of the group itself.
+        :param child:
+        :return:
+        :rtype: Transform
+        """
+        return self.get_parent_frame_transform()
 
     def set_position(self, position):
         """
@@ -400,13 +668,7 @@ class PosableGroup(Posable):
         :return:
         """
         translation = position - self.get_position()
-
-        # Get posables from the element list. It is good practice
-        # to only have posables here, but we can easily make sure.
-        posables = self.get_affected_posables()
-
-        for posable in posables:
-            posable.translate(translation)
+        self.transform_posables(Transform._new(translation, Quaternion()))
 
         # Store root position
         super(PosableGroup, self).set_position(position)
@@ -429,30 +691,85 @@ class PosableGroup(Posable):
         :type rotation: Quaternion
         :return:
         """
+        # The position and rotation of a child relative to this posable's
+        # root (i.e. as if the posable was in [0, 0] with no rotation)
+        # follow from the group's inverse rotation. Rotating these
+        # according to the new rotation gives the new poses.
         root_position = self.get_position()
-        inv_rotation = self.get_rotation().conjugated()
+        relative = rotation * self.get_rotation().conjugated()
+        self.transform_posables(Transform._new(root_position - relative * root_position, relative))
 
-        posables = self.get_affected_posables()
-        for posable in posables:
-            # Get the position and rotation of the child relative
-            # to this posable's root (i.e. as if the posable was in [0, 0]
-            # with no rotation)
-            orig_position = inv_rotation * (posable.get_position() - root_position)
+        # We should still store our own root rotation
+        super(PosableGroup, self).set_rotation(rotation)
 
-            # The original rotation follows from multiplying the child's rotation
-            # with this group's inverse rotation
-            orig_rotation = inv_rotation * posable.get_rotation()
+    def transform_posables(self, transform):
+        """
+        Applies a transform to the poses of all affected posables, or
+        adds it to the pending transform in lazy mode.
+        :param transform:
+        :type transform: Transform
+        :return:
+        """
+        if not self.lazy:
+            self._transform_posables(transform)
+            return
 
-            # New position means rotating the original point according to the new
-            # rotation, and adding the current position
-            new_position = (rotation * orig_position) + root_position
+        pending = self._pending_transform
+        if pending is None:
+            # The cached state of the posables no longer matches
+            # the pose they will have.
+            for posable in self.get_affected_posables():
+                posable.invalidate()
 
-            # New rotation is acquired by multiplying the new rotation
-            # with the existing rotation
-            new_rotation = rotation * orig_rotation
+            self.__dict__['_pending_transform'] = transform
+        else:
+            self.__dict__['_pending_transform'] = transform * pending
 
-            posable.set_position(new_position)
-            posable.set_rotation(new_rotation)
+    def apply_pending_transform(self):
+        """
+        Brings the poses of the affected posables up to date in lazy mode.
+        This happens automatically when they are accessed.
+        :return:
+        """
+        pending = self._pending_transform
+        if pending is not None:
+            self.__dict__['_pending_transform'] = None
+            self._transform_posables(pending)
 
-        # We should still store our own root rotation
-        super(PosableGroup, self).set_rotation(rotation)
\ No newline at end of file
+    def _transform_posables(self, transform):
+        """
+        Gathers the poses of all affected posables into arrays, transforms
+        them at once and sets the results.
+        :param transform:
+        :type transform: Transform
+        :return:
+        """
+        # Get posables from the element list. It is good practice
+        # to only have posables here, but we can easily make sure.
+        posables = self.get_affected_posables()
+        if not posables:
+            return
+
+        poses = [posable.get_pose() for posable in posables]
+        positions = transform * Vector3Array.from_list(pose.position for pose in poses)
+        rotations = transform.rotation * QuaternionArray.from_list(pose.rotation for pose in poses)
+
+        for posable, new_position, new_rotation in zip(posables, positions.to_list(),
+                                                       rotations.to_list()):
+            if isinstance(posable, PosableGroup):
+                # A nested group moves its posables by the same transform; setting
+                # its position and rotation separately would move them twice.
+                posable.transform_posables(transform)
+                Posable.set_position(posable, new_position)
+                Posable.set_rotation(posable, new_rotation)
+            else:
+                posable.set_position(new_position)
+                posable.set_rotation(new_rotation)
+
+    def _before_change(self):
+        """
+        Applies the pending transform before the elements change.
+        :return:
+        """
+        self.apply_pending_transform()
+        super(PosableGroup, self)._before_change()
@@ -0,0 +1,453 @@
+"""
+Reads SDF documents back into element trees, so existing files can be
+modified and written again. Known tags are read into their sdfbuilder
+classes (`SDF`, `Model`, `Link`, `Joint`, `Collision`, `Visual`,
+`Inertial`, `Pose`, the geometries, ...), everything else, as well as
+known tags whose contents cannot be represented by their class, is
+read into a plain `Element` with the same tag, attributes and body.
+Elements with text around their children (mixed content) are read into
+a plain `Element` with the children rendered into its body, so the
+text stays in place.
+
+Documents are read incrementally with `iterparse`, and the XML of each
+element is discarded as soon as it has been converted. With
+`iterparse_elements` only the requested elements (e.g. the models in
+a big world file) are built, one at a time.
+
+Note that known elements are rendered in the order of their class, and
+with values in the current number format, so the output of a read
+document is equivalent to, but not necessarily identical to its input.
+Documents rendered by sdfbuilder itself read and render identically.
+"""
+from __future__ import absolute_import
+from xml.sax.saxutils import escape, unescape
+from io import BytesIO
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+from .element import Element
+from .sdf import SDF
+from .model import Model
+from .link import Link
+from .posable import Pose
+from .math import Vector3, Quaternion
+from .joint import Joint, Axis, Limit
+from .physics import Inertial
+from .sensor.sensor import Sensor
+from .structure import Collision, Visual, Material
+from .structure.geometries import Geometry, Box, Cylinder, Sphere, Mesh
+
+
+def parse(source):
+    """
+    Reads a complete SDF / XML document.
+    :param source: File name or file object
+    :return: The root element of the document
+    :rtype: Element
+    """
+    for element in _read(source, None):
+        return element
+
+
+def parse_string(data):
+    """
+    Reads a complete SDF / XML document from a string.
+    :param data:
+    :type data: str
+    :return: The root element of the document
+    :rtype: Element
+    """
+    return parse(BytesIO(data))
+
+
+def iterparse_elements(source, tags=('model',)):
+    """
+    Reads the elements with the given tags from a document one at a time,
+    without building the rest of the document. Elements nested inside
+    another matching element are part of that element.
+    :param source: File name or file object
+    :param tags: Tag names of the elements to read
+    :type tags: iterable
+    :return: Generator of elements
+    """
+    return _read(source, frozenset(tags))
+
+
+def _read(source, tags):
+    """
+    Converts the elements of a document bottom up. Yields the outermost
+    elements matching `tags`, or only the root if `tags` is `None`.
+    :param source:
+    :param tags:
+    :return:
+    """
+    nodes = []
+    children = []
+
+    # Number of open elements that are being converted
+    depth = 0
+
+    for event, node in ElementTree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            matched = tags is None or node.tag in tags
+            if matched or depth:
+                depth += 1
+                children.append([])
+            else:
+                children.append(None)
+
+            nodes.append(node)
+            continue
+
+        nodes.pop()
+        node_children = children.pop()
+        if node_children is not None:
+            text = node.text or ""
+            elements = [element for element, _ in node_children]
+
+            # The text after a child is only known once its parent ends
+            tails = [child.tail or "" for _, child in node_children]
+            if elements and (text.strip() or any(tail.strip() for tail in tails)):
+                element = _convert_mixed(node.tag, dict(node.attrib), text, elements, tails)
+            else:
+                element = _convert(node.tag, dict(node.attrib), text.strip(), elements)
+
+            depth -= 1
+            if depth:
+                children[-1].append((element, node))
+            else:
+                yield element
+
+        # Drop the XML of elements that have been handled,
+        # which is the last child of its parent.
+        tail = node.tail
+        node.clear()
+        node.tail = tail
+        if nodes:
+            del nodes[-1][-1]
+
+
+def _convert(tag, attributes, text, children):
+    """
+    Converts a single XML element, of which the children have already
+    been converted, using the reader for its tag in `READERS`.
+    :param tag:
+    :type tag: str
+    :param attributes:
+    :type attributes: dict
+    :param text: Stripped text of the element
+    :type text: str
+    :param children: The converted child elements
+    :type children: list
+    :return:
+    :rtype: Element
+    """
+    reader = READERS.get(tag)
+    element = None
+    if reader is not None:
+        try:
+            element = reader(attributes.copy(), text, children)
+        except ValueError:
+            element = None
+
+    if element is None:
+        element = Element(tag_name=tag, attributes=attributes, body=escape(text), elements=children)
+
+    return element
+
+
+def _convert_mixed(tag, attributes, text, children, tails):
+    """
+    Converts an XML element with text around its child elements. Element
+    bodies are rendered after the child elements, so the children are
+    rendered into the body of a plain `Element` together with the text
+    to keep the document order.
+    :param tag:
+    :type tag: str
+    :param attributes:
+    :type attributes: dict
+    :param text: Text before the first child
+    :type text: str
+    :param children: The converted child elements
+    :type children: list
+    :param tails: Text after each of the children
+    :type tails: list
+    :return:
+    :rtype: Element
+    """
+    body = escape(text) + "".join(str(child) + escape(tail) for child, tail in zip(children, tails))
+    return Element(tag_name=tag, attributes=attributes, body=body)
+
+
+def _split(children, tags):
+    """
+    Separates the first child element of each of the given tags
+    from the other children.
+    :param children:
+    :param tags:
+    :return: Dictionary of elements by tag, and the other elements
+    :rtype: tuple
+    """
+    found = {}
+    rest = []
+    for child in children:
+        tag = child.get_tag_name()
+        if tag in tags and tag not in found:
+            found[tag] = child
+        else:
+            rest.append(child)
+
+    return found, rest
+
+
+def _value(element):
+    """
+    :param element:
+    :type element: Element
+    :return: The text of a plain value element
+    :rtype: str
+    """
+    if element.elements or element.attributes:
+        raise ValueError("Element '%s' is not a value." % element.get_tag_name())
+
+    return unescape(element.body)
+
+
+def _floats(element, count=None):
+    """
+    :param element:
+    :param count: Required number of values
+    :return: List of the space separated float values of an element
+    :rtype: list
+    """
+    values = [float(value) for value in _value(element).split()]
+    if count is not None and len(values) != count:
+        raise ValueError("Expected %d values in '%s'." % (count, element.get_tag_name()))
+
+    return values
+
+
+def _bool(element):
+    """
+    :param element:
+    :return:
+    :rtype: bool
+    """
+    value = _value(element).strip().lower()
+    if value not in ('0', '1', 'true', 'false'):
+        raise ValueError("Invalid boolean '%s'." % value)
+
+    return value in ('1', 'true')
+
+
+def _read_sdf(attributes, text, children):
+    version = attributes.pop('version', "1.5")
+    return SDF(version=version, attributes=attributes, body=escape(text), elements=children)
+
+
+def _read_pose(attributes, text, children):
+    if children:
+        return None
+
+    x, y, z, roll, pitch, yaw = [float(value) for value in text.split()]
+    pose = Pose(Vector3(x, y, z), Quaternion.from_rpy(roll, pitch, yaw), attributes=attributes)
+
+    # Converting back from the quaternion can give different angles for the
+    # same rotation, so unchanged poses render the angles they were read with.
+    pose._rpy = (roll, pitch, yaw)
+    return pose
+
+
+def _read_model(attributes, text, children):
+    name = attributes.pop('name', None)
+    if name is None:
+        return None
+
+    found, rest = _split(children, ('pose', 'static'))
+    static = _bool(found['static']) if 'static' in found else False
+    model = Model(name, static=static, pose=found.get('pose'), attributes=attributes,
+                  body=escape(text), elements=rest)
+
+    # Joints are read before the links they connect are known
+    links = dict((el.name, el) for el in rest if isinstance(el, Link))
+    for joint in rest:
+        if isinstance(joint, Joint):
+            joint.parent = links.get(joint.parent.name, joint.parent)
+            joint.child = links.get(joint.child.name, joint.child)
+
+    return model
+
+
+def _read_link(attributes, text, children):
+    name = attributes.pop('name', None)
+    if name is None:
+        return None
+
+    found, rest = _split(children, ('pose', 'inertial', 'self_collide'))
+    inertial = found.get('inertial')
+    if inertial is not None and not isinstance(inertial, Inertial):
+        rest.append(inertial)
+        inertial = None
+
+    self_collide = _value(found['self_collide']) if 'self_collide' in found else None
+    return Link(name, pose=found.get('pose'), inertial=inertial, self_collide=self_collide,
+                attributes=attributes, body=escape(text), elements=rest)
+
+
+def _read_inertial(attributes, text, children):
+    found, rest = _split(children, ('mass', 'inertia'))
+
+    # Defaults as in the SDF specification
+    mass = _floats(found['mass'], 1)[0] if 'mass' in found else 1.0
+    values = {'ixx': 1.0, 'iyy': 1.0, 'izz': 1.0, 'ixy': 0.0, 'ixz': 0.0, 'iyz': 0.0}
+    if 'inertia' in found:
+        inertia = found['inertia']
+        if inertia.attributes or inertia.body:
+            return None
+
+        for el in inertia.elements:
+            tag = el.get_tag_name()
+            if tag not in values:
+                return None
+
+            values[tag] = _floats(el, 1)[0]
+
+    return Inertial(mass, attributes=attributes, body=escape(text), elements=rest, **values)
+
+
+def _read_structure(cls):
+    """
+    :param cls: Collision or visual class
+    :return: Reader for the structure class
+    """
+    def reader(attributes, text, children):
+        name = attributes.pop('name', None)
+        found, rest = _split(children, ('pose', 'geometry'))
+        geometry = found.get('geometry')
+        pose = found.get('pose')
+        if name is None or not isinstance(geometry, Geometry) or (pose is not None and pose.attributes):
+            return None
+
+        # The pose of a structure is that of its geometry
+        if pose is not None:
+            geometry.set_pose(pose)
+
+        return cls(name, geometry, attributes=attributes, body=escape(text), elements=rest)
+
+    return reader
+
+
+def _read_geometry(attributes, text, children):
+    if len(children) != 1 or attributes or text:
+        return None
+
+    shape = children[0]
+    tag = shape.get_tag_name()
+    if shape.attributes or shape.body:
+        return None
+
+    values, rest = _split(shape.elements, ('size', 'radius', 'length', 'uri', 'scale'))
+    if rest:
+        return None
+
+    if tag == 'box' and set(values) == set(['size']):
+        return Box(*_floats(values['size'], 3))
+    elif tag == 'cylinder' and set(values) == set(['radius', 'length']):
+        return Cylinder(_floats(values['radius'], 1)[0], _floats(values['length'], 1)[0])
+    elif tag == 'sphere' and set(values) == set(['radius']):
+        return Sphere(_floats(values['radius'], 1)[0])
+    elif tag == 'mesh' and 'uri' in values and set(values) <= set(['uri', 'scale']):
+        scale = tuple(_floats(values['scale'], 3)) if 'scale' in values else None
+        return Mesh(_value(values['uri']), scale=scale)
+
+    return None
+
+
+def _read_joint(attributes, text, children):
+    name = attributes.pop('name', None)
+    joint_type = attributes.pop('type', None)
+    found, rest = _split(children, ('pose', 'parent', 'child', 'axis', 'axis2'))
+    axis, axis2 = found.get('axis'), found.get('axis2')
+
+    # Joints always render an axis, so joints without
+    # one are kept as they are.
+    if name is None or joint_type is None or not isinstance(axis, Axis) or \
+            not (axis2 is None or isinstance(axis2, Axis)) or \
+            'parent' not in found or 'child' not in found:
+        return None
+
+    # Placeholders, replaced by the actual links when the model is read
+    parent = Link(_value(found['parent']))
+    child = Link(_value(found['child']))
+    return Joint(joint_type, parent, child, pose=found.get('pose'), axis=axis, axis2=axis2,
+                 name=name, attributes=attributes, body=escape(text), elements=rest)
+
+
+def _read_axis(tag):
+    """
+    :param tag: Tag name of the axis
+    :return: Reader for an axis
+    """
+    def reader(attributes, text, children):
+        found, rest = _split(children, ('xyz', 'limit', 'use_parent_model_frame'))
+        limit = found.get('limit')
+        if 'xyz' not in found or (limit is not None and not isinstance(limit, Limit)):
+            return None
+
+        use_parent = _bool(found['use_parent_model_frame']) if 'use_parent_model_frame' in found else False
+        return Axis(Vector3(*_floats(found['xyz'], 3)), limit=limit, use_parent_model_frame=use_parent,
+                    tag_name=None if tag == Axis.TAG_NAME else tag, attributes=attributes,
+                    body=escape(text), elements=rest)
+
+    return reader
+
+
+def _read_limit(attributes, text, children):
+    names = ('lower', 'upper', 'effort', 'velocity', 'stiffness', 'dissipation')
+    found, rest = _split(children, names)
+    values = dict((name, _floats(el, 1)[0]) for name, el in found.items())
+    return Limit(attributes=attributes, body=escape(text), elements=rest, **values)
+
+
+def _read_sensor(attributes, text, children):
+    name = attributes.pop('name', None)
+    sensor_type = attributes.pop('type', None)
+    if name is None or sensor_type is None:
+        return None
+
+    found, rest = _split(children, ('pose', 'update_rate', 'always_on'))
+    update_rate = _floats(found['update_rate'], 1)[0] if 'update_rate' in found else None
+    always_on = _bool(found['always_on']) if 'always_on' in found else None
+    return Sensor(name, sensor_type, pose=found.get('pose'), update_rate=update_rate, always_on=always_on,
+                  attributes=attributes, body=escape(text), elements=rest)
+
+
+def _read_material(attributes, text, children):
+    return Material(attributes=attributes, body=escape(text), elements=children)
+
+
+"""
+Readers by tag name. A reader is called with the attributes, stripped
+text and converted children of an XML element, and returns the element
+or `None` if the element should be read as a plain `Element`. Add
+readers to this dictionary to read custom elements.
+"""
+READERS = {
+    'sdf': _read_sdf,
+    'pose': _read_pose,
+    'model': _read_model,
+    'link': _read_link,
+    'inertial': _read_inertial,
+    'collision': _read_structure(Collision),
+    'visual': _read_structure(Visual),
+    'geometry': _read_geometry,
+    'joint': _read_joint,
+    'axis': _read_axis('axis'),
+    'axis2': _read_axis('axis2'),
+    'limit': _read_limit,
+    'sensor': _read_sensor,
+    'material': _read_material
+}
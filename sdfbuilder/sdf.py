@@ -33,5 +33,31 @@ class SDF(Element):
         :return:
         """
         body = super(SDF, self).render()
+        return self.get_xml_header()+body
+
+    def write(self, stream):
+        """
+        Adds XML header to the streamed output
+        :param stream:
+        :return:
+        """
+        stream.write(self.get_xml_header())
+        super(SDF, self).write(stream)
+
+    def write_to(self, path):
+        """
+        Streams this SDF document to the file at the given path.
+        :param path:
+        :type path: str
+        :return:
+        """
+        with open(path, 'w') as f:
+            self.write(f)
+
+    def get_xml_header(self):
+        """
+        :return: The XML declaration preceding the document
+        :rtype: str
+        """
         enc = (' encoding="%s"' % self.encoding) if self.encoding else ""
-        return ("<?xml version=\"1.0\"%s?>\n" % enc)+body
\ No newline at end of file
+        return "<?xml version=\"1.0\"%s?>\n" % enc
@@ -2,13 +2,74 @@
 Simple geometries such as box, cylinder and sphere.
 """
 from __future__ import division
+import copy
+import functools
 from ..math import Vector3
 from ..posable import Posable, PosableGroup
-from ..util import number_format as nf
-from ..physics.inertial import Inertial, transform_inertia_tensor
+from ..util import number_format as nf, number_format_join as nfj
+from ..physics.inertial import Inertial, combine_inertia_tensors
+from ..physics.mesh import get_mesh_properties, get_mesh_bounds
 import numpy as np
 
 
+def _to_plain(value):
+    """
+    :param value: Result of a mass property method
+    :return: Plain version of the value to cache
+    """
+    if isinstance(value, Inertial):
+        return Inertial, value.__getstate__()
+    elif isinstance(value, Vector3):
+        return Vector3, tuple(value)
+
+    return None, value
+
+
+def _from_plain(plain):
+    """
+    Counterpart of `_to_plain`, creates a new object every time.
+    :param plain:
+    :return:
+    """
+    cls, value = plain
+    if cls is Inertial:
+        # Restoring the state is a lot faster than creating an inertial
+        # through its constructor, which sets its attributes one by one.
+        state = dict(value, attributes=dict(value['attributes']),
+                     elements=copy.deepcopy(value['elements']))
+        inertial = object.__new__(Inertial)
+        inertial.__setstate__(state)
+        return inertial
+
+    return value if cls is None else cls(*value)
+
+
+def _mass_property(method):
+    """
+    Decorator for the mass property methods of geometries, which
+    caches their result until the geometry is invalidated, i.e. until
+    it or one of its descendants changes. Only plain values are cached,
+    every call returns a new inertial / vector that can be changed or
+    added to a link.
+    :param method:
+    :return:
+    """
+    @functools.wraps(method)
+    def wrapper(self):
+        cache = self.__dict__.get('_mass_cache')
+        if cache is None:
+            cache = self.__dict__['_mass_cache'] = {}
+
+        try:
+            plain = cache[method]
+        except KeyError:
+            plain = cache[method] = _to_plain(method(self))
+
+        return _from_plain(plain)
+
+    return wrapper
+
+
 class BaseGeometry(object):
     """
     Defines an interface for geometries.
@@ -42,6 +103,18 @@ class BaseGeometry(object):
         """
         raise NotImplementedError("`get_mass` is not implemented.")
 
+    def get_bounding_shape(self):
+        """
+        Returns a shape that tightly contains this geometry, used for
+        bounding boxes. The shape is the Minkowski sum of a box, a sphere
+        and a disc in the xy plane, returned as the tuple
+        `(box_center, box_half_extents, sphere_radius, disc_radius)`.
+        :return: The shape, or `None` if the bounds of the geometry
+                 are not known.
+        :rtype: tuple
+        """
+        raise NotImplementedError("`get_bounding_shape` is not implemented.")
+
 
 class Geometry(Posable, BaseGeometry):
     """
@@ -50,6 +123,7 @@ class Geometry(Posable, BaseGeometry):
     """
     TAG_NAME = 'geometry'
     RENDER_POSE = False
+    CACHE_ATTRIBUTES = Posable.CACHE_ATTRIBUTES | frozenset(['_mass_cache'])
 
     def __init__(self, mass=None, pose=None, **kwargs):
         """
@@ -75,12 +149,29 @@ class Geometry(Posable, BaseGeometry):
         """
         return Vector3(0, 0, 0)
 
+    def get_geometries(self):
+        """
+        :return:
+        :rtype: list
+        """
+        return [self]
+
+    def invalidate(self):
+        """
+        Also clears the cached mass properties
+        :return:
+        """
+        self.__dict__.pop('_mass_cache', None)
+        super(Geometry, self).invalidate()
+
 
 class CompoundGeometry(PosableGroup, BaseGeometry):
     """
     A helper class for combining multiple geometries
     """
+    CACHE_ATTRIBUTES = PosableGroup.CACHE_ATTRIBUTES | frozenset(['_mass_cache'])
 
+    @_mass_property
     def get_mass(self):
         """
         Returns the total mass of all geometries.
@@ -88,6 +179,7 @@ class CompoundGeometry(PosableGroup, BaseGeometry):
         """
         return sum(geometry.get_mass() for geometry in self.geometries)
 
+    @_mass_property
     def get_center_of_mass(self):
         """
         :return:
@@ -124,8 +216,31 @@ class CompoundGeometry(PosableGroup, BaseGeometry):
         :param geometry:
         :type geometry: Geometry|CompoundGeometry
         """
+        self._before_change()
         self.geometries.append(geometry)
+        self._adopt(geometry)
+        self.invalidate()
 
+    def invalidate(self):
+        """
+        Also clears the cached mass properties
+        :return:
+        """
+        self.__dict__.pop('_mass_cache', None)
+        super(CompoundGeometry, self).invalidate()
+
+    def get_geometries(self):
+        """
+        :return: The simple geometries in this compound
+        :rtype: list
+        """
+        geometries = []
+        for geometry in self.geometries:
+            geometries += geometry.get_geometries()
+
+        return geometries
+
+    @_mass_property
     def get_inertial(self):
         """
         Returns the inertia tensor for all the combined positioned
@@ -134,38 +249,32 @@ class CompoundGeometry(PosableGroup, BaseGeometry):
         Uses the first part of this question:
         http://physics.stackexchange.com/questions/17336/how-do-you-combine-two-rigid-bodies-into-one
         """
-        # Calculate the center of mass
-        center_mass = self.get_center_of_mass()
-
-        # The final inertia matrix
-        i_final = np.zeros((3, 3))
-        for geometry in self.geometries:
-            # We need the center of mass again
-            geom_center = geometry.to_sibling_frame(
-                geometry.get_center_of_mass(),
-                self
-            )
-
-            # We have the inertia tensor in the object's frame,
-            # i.e. as if it isn't rotated. We want to return it
-            # in this object's frame, i.e. as if the compound isn't
-            # rotated. The rotation for that is the total rotation
-            # of the object, with the rotation of the compound cancelled
-            # out. Conceptually, we now start with the inertia tensor
-            # as if the object has zero rotation, and calculate the tensor
-            # resulting from rotating the object around its actual rotation.
-            rotation = self.get_rotation().conjugated() * geometry.get_rotation()
-            j1 = transform_inertia_tensor(
-                geometry.get_mass(),
-                geometry.get_inertial().get_matrix(),
-                center_mass - geom_center,
-                rotation
-            )
-            i_final += j1
-
-        total_mass = self.get_mass()
-        inertial = Inertial.from_mass_matrix(total_mass, i_final)
-        return inertial
+        geometries = self.geometries
+        masses = np.array([geometry.get_mass() for geometry in geometries], dtype=np.float_)
+        total_mass = float(masses.sum())
+
+        # Centers of mass of all geometries in the frame of this posable
+        centers = np.array([tuple(geometry.to_sibling_frame(geometry.get_center_of_mass(), self))
+                            for geometry in geometries]).reshape(-1, 3)
+        center_mass = masses.dot(centers) / total_mass
+
+        # We have the inertia tensor in the object's frame,
+        # i.e. as if it isn't rotated. We want to return it
+        # in this object's frame, i.e. as if the compound isn't
+        # rotated. The rotation for that is the total rotation
+        # of the object, with the rotation of the compound cancelled
+        # out. Conceptually, we now start with the inertia tensor
+        # as if the object has zero rotation, and calculate the tensor
+        # resulting from rotating the object around its actual rotation.
+        inverse = self.get_rotation().conjugated()
+        i_final = combine_inertia_tensors(
+            masses,
+            [geometry.get_inertial().get_matrix() for geometry in geometries],
+            center_mass - centers,
+            [tuple(inverse * geometry.get_rotation()) for geometry in geometries]
+        )
+
+        return Inertial.from_mass_matrix(total_mass, i_final)
 
 
 class Box(Geometry):
@@ -192,10 +301,17 @@ class Box(Geometry):
         """
         elements = super(Box, self).render_elements()
 
-        x, y, z = self.size
-        elements.append("<box><size>%s %s %s</size></box>" % (nf(x), nf(y), nf(z)))
+        elements.append("<box><size>%s</size></box>" % nfj(self.size))
         return elements
 
+    def get_bounding_shape(self):
+        """
+        :return:
+        """
+        x, y, z = self.size
+        return (0, 0, 0), (0.5 * x, 0.5 * y, 0.5 * z), 0, 0
+
+    @_mass_property
     def get_inertial(self):
         """
         Return solid box inertial
@@ -243,6 +359,13 @@ class Cylinder(Geometry):
                         % (nf(self.radius), nf(self.length)))
         return elements
 
+    def get_bounding_shape(self):
+        """
+        :return:
+        """
+        return (0, 0, 0), (0, 0, 0.5 * self.length), 0, self.radius
+
+    @_mass_property
     def get_inertial(self):
         """
         Return cylinder inertial. You can specify `tube=True` alongside
@@ -290,6 +413,13 @@ class Sphere(Geometry):
                         % nf(self.radius))
         return elements
 
+    def get_bounding_shape(self):
+        """
+        :return:
+        """
+        return (0, 0, 0), (0, 0, 0), self.radius, 0
+
+    @_mass_property
     def get_inertial(self):
         """
         Return cylinder inertial
@@ -302,16 +432,87 @@ class Sphere(Geometry):
 
 class Mesh(Geometry):
     """
-    Mesh geometry. Since we cannot determine the inertia
-    of meshes here, you need to extend this class with
-    the full geometry methods in order to use this for
-    anything else than a visual.
+    Mesh geometry. The mass properties are calculated from
+    the mesh file if it is a closed STL or OBJ mesh on the
+    local file system.
     """
 
-    def __init__(self, uri, scale=None, **kwargs):
+    def __init__(self, uri, scale=None, path=None, density=None, **kwargs):
+        """
+        :param uri: Mesh URI
+        :type uri: str
+        :param scale: A single scale factor or a scale factor for each axis
+        :type scale: float|tuple
+        :param path: Local path of the mesh file, used for calculating mass
+                     properties. Defaults to the URI if that is a file path.
+        :type path: str
+        :param density: Density of the mesh, used if no mass is given.
+        :type density: float
+        :param kwargs:
+        """
         super(Mesh, self).__init__(**kwargs)
         self.uri = uri
         self.scale = scale
+        self.density = density
+
+        if path is None:
+            if uri.startswith("file://"):
+                path = uri[len("file://"):]
+            elif "://" not in uri:
+                path = uri
+
+        self.path = path
+
+    def get_mesh_properties(self):
+        """
+        :return: The (cached) unit density mass properties of the mesh file.
+        :rtype: MeshProperties
+        """
+        if self.path is None:
+            raise AttributeError("Mesh mass properties require a local `path`.")
+
+        return get_mesh_properties(self.path, self.scale)
+
+    def get_bounding_shape(self):
+        """
+        :return: The bounds of the mesh file as a box, or `None` if
+                 the mesh has no local `path`.
+        """
+        if self.path is None:
+            return None
+
+        lower, upper = get_mesh_bounds(self.path, self.scale)
+        return 0.5 * (lower + upper), 0.5 * (upper - lower), 0, 0
+
+    @_mass_property
+    def get_mass(self):
+        """
+        Returns the mass, calculated from the density if no mass was given.
+        """
+        if self.mass is None and self.density is not None:
+            return self.density * self.get_mesh_properties().volume
+
+        return self.mass
+
+    @_mass_property
+    def get_center_of_mass(self):
+        """
+        :return: The center of mass of the mesh in the local frame.
+        :rtype: Vector3
+        """
+        return Vector3(*self.get_mesh_properties().center_of_mass)
+
+    @_mass_property
+    def get_inertial(self):
+        """
+        Returns the mesh inertial, relative to its center of mass.
+        """
+        mass = self.get_mass()
+        if mass is None:
+            raise AttributeError("Mesh inertia requires a `mass` or `density`.")
+
+        tensor = self.get_mesh_properties().get_inertia_tensor(mass)
+        return Inertial.from_mass_matrix(mass, tensor)
 
     def render_elements(self):
         """
@@ -326,7 +527,7 @@ class Mesh(Geometry):
             except TypeError:
                 x = y = z = self.scale
 
-            scale = "<scale>%s %s %s</scale>" % (nf(x), nf(y), nf(z))
+            scale = "<scale>%s</scale>" % nfj((x, y, z))
         else:
             scale = ""
 
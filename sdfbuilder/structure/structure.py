@@ -10,6 +10,8 @@ class Structure(Posable):
     """
     Base class for collision/visual elements
     """
+    CHILD_ATTRIBUTES = Posable.CHILD_ATTRIBUTES + ('geometry',)
+
     def __init__(self, name, geometry, **kwargs):
         """
 
@@ -27,20 +29,44 @@ class Structure(Posable):
 
     # Delegate all position and rotation calls to the geometry object
     def set_position(self, position):
+        self.apply_parent_transform()
         self.geometry.set_position(position)
 
     def set_rotation(self, rotation):
+        self.apply_parent_transform()
         self.geometry.set_rotation(rotation)
 
     def get_position(self):
+        self.apply_parent_transform()
         return self.geometry.get_position()
 
     def get_rotation(self):
+        self.apply_parent_transform()
         return self.geometry.get_rotation()
 
     def get_pose(self):
+        self.apply_parent_transform()
         return self.geometry.get_pose()
 
+    def get_geometries(self):
+        """
+        :return: The simple geometries of this structure
+        :rtype: list
+        """
+        return self.geometry.get_geometries()
+
+    def get_frame_transform(self, child):
+        """
+        The geometry's pose is this structure's pose, so it is
+        expressed in the same frame as this structure.
+        :param child:
+        :return:
+        """
+        if child is self.geometry:
+            return self.get_parent_frame_transform()
+
+        return super(Structure, self).get_frame_transform(child)
+
     def render_elements(self):
         """
         :return:
@@ -56,6 +82,28 @@ class Structure(Posable):
         if not isinstance(self.geometry, CompoundGeometry):
             return super(Structure, self).render()
 
+        return "".join(str(el) for el in self.get_compound_structures())
+
+    def write(self, stream):
+        """
+        Streaming counterpart of `render`, which also writes a list
+        of sub elements if the child is a compound.
+        :param stream:
+        :return:
+        """
+        if not isinstance(self.geometry, CompoundGeometry):
+            return super(Structure, self).write(stream)
+
+        for el in self.get_compound_structures():
+            el.write(stream)
+
+    def get_compound_structures(self):
+        """
+        Returns a list of structures of this type, one for each of the
+        geometries in this structure's compound geometry.
+        :return:
+        :rtype: list
+        """
         geometries = self.geometry.geometries
         """ :type : [Geometry] """
 
@@ -74,7 +122,7 @@ class Structure(Posable):
                 attributes=self.attributes
             ))
 
-        return "".join(str(el) for el in elements)
+        return elements
 
 
 class Collision(Structure):
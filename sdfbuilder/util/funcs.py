@@ -1,15 +1,146 @@
 """
 General utility functions
 """
+import math
 from ..math.classes import EPSILON
 
+__all__ = ['EPSILON', 'FORMAT_EXPONENT', 'FORMAT_GENERAL', 'FORMAT_REPR', 'set_number_format',
+           'get_number_format', 'get_format_generation', 'number_format', 'number_format_list',
+           'number_format_join']
+
+# Number format modes, see `set_number_format`
+FORMAT_EXPONENT = 'exponent'
+FORMAT_GENERAL = 'general'
+FORMAT_REPR = 'repr'
+
+_FORMAT_TEMPLATES = {
+    FORMAT_EXPONENT: "%%.%de",
+    FORMAT_GENERAL: "%%.%dg"
+}
+
+# Current number format, the template is `None` in repr mode
+_format = (FORMAT_EXPONENT, 6)
+_template = "%.6e"
+_constants = {0: "%.6e" % 0, 1: "%.6e" % 1}
+_batch_templates = {}
+
+# Incremented whenever the number format changes,
+# so cached renders can be discarded.
+_format_generation = 0
+
+
+def set_number_format(mode=FORMAT_EXPONENT, precision=6):
+    """
+    Sets the way numbers are displayed in rendered SDF.
+    :param mode: One of `FORMAT_EXPONENT` ("%e" style, the default),
+                 `FORMAT_GENERAL` ("%g" style, which drops trailing zeros)
+                 or `FORMAT_REPR` (the shortest string that reads back
+                 as the exact same float, ignores `precision`).
+    :type mode: str
+    :param precision: Digits after the decimal point in exponent mode,
+                      significant digits in general mode.
+    :type precision: int
+    :return:
+    """
+    global _format, _template, _constants, _format_generation
+
+    if mode == FORMAT_REPR:
+        _template = None
+    elif mode in _FORMAT_TEMPLATES:
+        _template = _FORMAT_TEMPLATES[mode] % precision
+    else:
+        raise ValueError("Unknown number format mode '%s'." % mode)
+
+    _format = (mode, precision)
+    _constants = {0: _format_one(0.0), 1: _format_one(1.0)}
+    _batch_templates.clear()
+    _format_generation += 1
+
+
+def get_number_format():
+    """
+    :return: The current `(mode, precision)` number format
+    :rtype: tuple
+    """
+    return _format
+
+
+def get_format_generation():
+    """
+    :return: A number that changes whenever the number format changes
+    :rtype: int
+    """
+    return _format_generation
+
+
+def _format_one(number):
+    """
+    Formats a single number without the fast path.
+    :param number:
+    :return:
+    """
+    return repr(float(number)) if _template is None else _template % number
+
 
 def number_format(number):
     """
     Number format utility. We include this so we can
     potentially alter the way / precision of displayed
-    numbers in a central place.
+    numbers in a central place, see `set_number_format`.
     :param number:
     :return: String representation of the number
     """
-    return "%e" % number
+    if number == 0 or number == 1:
+        # Fast path, negative zero is formatted as usual
+        if number or math.copysign(1.0, number) > 0:
+            return _constants[number]
+
+    return repr(float(number)) if _template is None else _template % number
+
+
+def number_format_list(numbers):
+    """
+    Formats a sequence of numbers at once, which is faster than
+    formatting them one by one.
+    :param numbers:
+    :type numbers: iterable
+    :return: List of string representations
+    :rtype: list
+    """
+    if _template is None:
+        return [repr(float(number)) for number in numbers]
+
+    numbers = tuple(numbers)
+    return (_get_batch_template(len(numbers), "\n") % numbers).split("\n")
+
+
+def number_format_join(numbers, separator=" "):
+    """
+    Formats a sequence of numbers at once and joins them, e.g.
+    for the six values of a pose.
+    :param numbers:
+    :type numbers: iterable
+    :param separator:
+    :type separator: str
+    :return:
+    :rtype: str
+    """
+    if _template is None:
+        return separator.join([repr(float(number)) for number in numbers])
+
+    numbers = tuple(numbers)
+    return _get_batch_template(len(numbers), separator) % numbers
+
+
+def _get_batch_template(count, separator):
+    """
+    :param count:
+    :param separator:
+    :return: Format template for `count` numbers
+    """
+    key = (count, separator)
+    template = _batch_templates.get(key)
+    if template is None:
+        template = _batch_templates[key] = separator.join([_template] * count)
+
+    return template
@@ -1,5 +1,19 @@
-from sdfbuilder import Element
+from sdfbuilder import Element, SDF, Model, Link, PosableGroup
+from sdfbuilder.joint import FixedJoint, Joint, Axis
+from sdfbuilder.element import get_tree_version
+from sdfbuilder.math import Vector3
+from sdfbuilder.structure import Box, Sphere, CompoundGeometry, Collision, Visual
+from sdfbuilder import render_many
+from sdfbuilder.interning import intern_tree, intern_element
+from sdfbuilder.cache import RenderCache, element_key, call_key, EVICT_TO
+import sdfbuilder.cache
+from sdfbuilder.util import set_number_format, FORMAT_GENERAL, FORMAT_EXPONENT
+import os
+import functools
+from StringIO import StringIO
 import unittest
+import shutil
+import tempfile
 
 
 class A(Element):
@@ -14,6 +28,47 @@ class C(B):
     pass
 
 
+def make_model(name, size):
+    """
+    Build recipe for `render_many`
+    """
+    link = Link("link")
+    link.make_box(1.0, size, size, size)
+    return Model(name, elements=[link])
+
+
+class BuildCalls(object):
+    """
+    Records the calls of `build_model`
+    """
+    names = []
+
+
+def build_model(name, size):
+    """
+    Build recipe for `RenderCache.build`
+    """
+    BuildCalls.names.append(name)
+    return make_model(name, size)
+
+
+def make_sized(size):
+    """
+    :return: A build recipe that closes over a size
+    """
+    def build(name):
+        return make_model(name, size)
+
+    return build
+
+
+def wrap_link(link):
+    """
+    Build recipe that uses an element argument
+    """
+    return Model("wrapped", elements=[link.copy()])
+
+
 class TestElement(unittest.TestCase):
     def test_filter(self):
         root = Element()
@@ -39,5 +94,404 @@ class TestElement(unittest.TestCase):
         check = root.get_elements_of_type(B, recursive=True)
         self.assertEquals([sub1b, sub1c, sub2, sub2ab, sub2b], check)
 
+        check = root.filter_elements(lambda el: isinstance(el, B), recursive=True)
+        self.assertEquals([sub1b, sub1c, sub2, sub2ab, sub2b], check)
+        self.assertEquals(check, list(root.iter_elements(lambda el: isinstance(el, B), recursive=True)))
+
+        # Indexes should follow structural changes
+        sub2ab2 = C()
+        sub2a.add_element(sub2ab2)
+        check = root.get_elements_of_type(B, recursive=True)
+        self.assertEquals([sub1b, sub1c, sub2, sub2ab, sub2ab2, sub2b], check)
+
+        sub1.remove_elements_of_type(C)
+        self.assertEquals([sub1b], sub1.get_elements_of_type(B))
+        self.assertEquals([sub2ab2], root.get_elements_of_type(C, recursive=True))
+        self.assertEquals([sub1, sub2], root.get_elements_of_type((Element,)))
+
+    def test_remove(self):
+        """
+        Tests removing elements by predicate and by identity.
+        """
+        root = Element()
+        sub1, sub2 = A(), B()
+        sub1a, sub1b, sub2a, sub2b = A(), B(), A(), C()
+        sub1.add_elements([sub1a, sub1b])
+        sub2.add_elements([sub2a, sub2b])
+        root.add_elements([sub1, sub2])
+
+        removed = root.remove_elements_of_type(A, recursive=True)
+        self.assertEquals([sub1, sub2a], removed)
+        self.assertEquals([sub2], root.elements)
+        self.assertEquals([sub2b], sub2.elements)
+        self.assertIsNone(sub1.get_parent())
+
+        removed = root.remove_elements({sub2b, sub1b}, recursive=True)
+        self.assertEquals([sub2b], removed)
+        self.assertEquals([], sub2.elements)
+        self.assertEquals([sub1a, sub1b], sub1.elements)
+
+    def test_name_lookup(self):
+        """
+        Tests looking up elements by name
+        """
+        link1, link2 = Link("link1"), Link("link2")
+        col = Collision("col", Box(1, 1, 1))
+        link2.add_element(col)
+        model = Model("model", elements=[link1, link2])
+
+        self.assertIs(link2, model.get_element_by_name("link2"))
+        self.assertIsNone(model.get_element_by_name("col"))
+        self.assertIs(col, model.get_element_by_name("col", recursive=True))
+
+        col.name = "renamed"
+        self.assertIsNone(model.get_element_by_name("col", recursive=True))
+        self.assertEquals([col], model.get_elements_by_name("renamed", recursive=True))
+
+    def test_element_list(self):
+        """
+        Changing the elements list in place should update lookups
+        and parents, and invalidate the cached render.
+        """
+        link1, link2, link3 = Link("link1"), Link("link2"), Link("link3")
+        model = Model("model", elements=[link1, link2])
+        sdf = SDF(elements=[model])
+        str(sdf)
+        self.assertEquals([link1, link2], model.get_elements_of_type(Link))
+
+        model.elements[0] = link3
+        self.assertIsNone(sdf._render_cache)
+        self.assertIsNone(link1.get_parent())
+        self.assertIs(model, link3.get_parent())
+        self.assertEquals([link3, link2], model.get_elements_of_type(Link))
+        self.assertIsNone(model.get_element_by_name("link1"))
+        self.assertIs(link3, model.get_element_by_name("link3", recursive=True))
+        self.assertEquals(str(SDF(elements=[Model("model", elements=[link3, link2])])), str(sdf))
+
+        model.elements.reverse()
+        self.assertEquals([link2, link3], model.get_elements_of_type(Link))
+        self.assertLess(str(sdf).index("link2"), str(sdf).index("link3"))
+
+        del model.elements[1:]
+        model.elements += [link1]
+        self.assertIsNone(link3.get_parent())
+        self.assertEquals([link2, link1], model.get_elements_of_type(Link))
+
+        model.elements = [link3]
+        self.assertIsNone(link1.get_parent())
+        self.assertIs(model, link3.get_parent())
+        self.assertEquals([link3], model.get_elements_of_type(Link))
+
+        # Copies and clones get their own lists
+        for copy in (model.copy(), model.copy(copy_on_write=True)):
+            copy.elements.append(Link("extra"))
+            self.assertEquals(["link3"], [link.name for link in model.get_elements_of_type(Link)])
+            self.assertEquals(["link3", "extra"], [link.name for link in copy.get_elements_of_type(Link)])
+
+    def test_write(self):
+        """
+        Streaming a tree should produce exactly the rendered string.
+        """
+        link1 = Link("link1")
+        link1.make_box(1.0, 0.1, 0.2, 0.3)
+        link1.make_color(0.5, 0.5, 0.5, 1.0)
+        link1.add_element(PosableGroup())
+        link1.add_element(Element(tag_name="empty"))
+        link1.add_element(Element(tag_name="text", body="body"))
+
+        compound = CompoundGeometry()
+        compound.add_geometry(Box(1, 1, 1, mass=1.0))
+        sphere = Sphere(0.5, mass=1.0)
+        sphere.translate(Vector3(0, 0, 1))
+        compound.add_geometry(sphere)
+
+        link2 = Link("link2", self_collide=True)
+        link2.add_element(Collision("compound", compound))
+        link2.add_element(Visual("compound", compound))
+        link2.calculate_inertial()
+
+        model = Model("model", elements=[link1, link2, FixedJoint(link1, link2)])
+        sdf = SDF(elements=[model], encoding="utf-8")
+
+        stream = StringIO()
+        sdf.write(stream)
+        self.assertEquals(str(sdf), stream.getvalue())
+
+        stream = StringIO()
+        model.write(stream)
+        self.assertEquals(str(model), stream.getvalue())
+
+    def test_render_cache(self):
+        """
+        Changing an element after rendering should only invalidate
+        the path from that element up to the root.
+        """
+        link1 = Link("link1")
+        link1.make_box(1.0, 0.1, 0.2, 0.3)
+        link2 = Link("link2")
+        link2.make_sphere(1.0, 0.5)
+        model = Model("model", elements=[link1, link2])
+        sdf = SDF(elements=[model])
+
+        rendered = str(sdf)
+        self.assertEquals(rendered, str(sdf.copy()))
+
+        link1.translate(Vector3(1, 2, 3))
+        self.assertIsNone(model._render_cache)
+        self.assertIsNotNone(link2._render_cache)
+
+        rendered = str(sdf)
+        self.assertEquals(rendered, str(sdf.copy()))
+        self.assertIn("1.000000e+00 2.000000e+00 3.000000e+00", rendered)
+
+        link2.name = "renamed"
+        link1.ensure_inertial()
+        model.remove_elements_of_type(Link)
+        self.assertIsNone(link1.get_parent())
+        self.assertEquals(str(sdf), str(sdf.copy()))
+
+    def test_shared_geometry_render_cache(self):
+        """
+        A geometry shared by a collision and a visual should
+        invalidate the cached renders of both.
+        """
+        link = Link("link")
+        col, vis = link.make_box(1.0, 0.1, 0.2, 0.3)
+        model = Model("model", elements=[link])
+        str(model)
+
+        col.translate(Vector3(1, 2, 3))
+        self.assertIsNone(vis._render_cache)
+        self.assertIn("<visual name=\"visual\"><pose>1.000000e+00 2.000000e+00 3.000000e+00", str(model))
+
+        for copied in (model.copy(), model.copy(copy_on_write=True)):
+            str(copied)
+            copied_col, copied_vis = copied.elements[0].elements
+            copied_col.translate(Vector3(1, 0, 0))
+            self.assertIn("<pose>2.000000e+00 2.000000e+00 3.000000e+00", str(copied_vis))
+            self.assertIn("<pose>1.000000e+00 2.000000e+00 3.000000e+00", str(vis))
+
+        # The collision keeps its geometry when it is removed
+        link.remove_elements([col])
+        vis.translate(Vector3(1, 0, 0))
+        self.assertIn("<pose>2.000000e+00 2.000000e+00 3.000000e+00", str(model))
+
+    def test_joint_axis2_render(self):
+        """
+        Rendering a joint with a second axis should not change the tree.
+        """
+        link1, link2 = Link("link1"), Link("link2")
+        joint = Joint("universal", link1, link2, axis=Vector3(1, 0, 0), axis2=Axis(Vector3(0, 1, 0)))
+        model = Model("model", elements=[link1, link2, joint])
+        self.assertEquals("axis2", joint.axis2.get_tag_name())
+
+        str(model)
+        version = get_tree_version()
+        self.assertIn("<axis2>", str(model))
+        self.assertEquals(version, get_tree_version())
+
+    def test_copy_on_write(self):
+        """
+        Copy-on-write clones should render like deep copies, and
+        changes to either the template or a clone should not leak.
+        """
+        link = Link("link")
+        link.make_box(1.0, 0.1, 0.2, 0.3)
+        template = Model("template", elements=[link, Link("other")])
+        original = str(template)
+
+        clone1 = template.copy(copy_on_write=True)
+        clone2 = template.copy(copy_on_write=True)
+        self.assertEquals(original, str(clone1))
+
+        expected = template.copy()
+        expected.get_element_by_name("link").translate(Vector3(1, 0, 0))
+        clone1.get_element_by_name("link").translate(Vector3(1, 0, 0))
+        self.assertEquals(str(expected), str(clone1))
+        self.assertEquals(original, str(template))
+
+        link.name = "renamed"
+        template.add_element(Link("extra"))
+        self.assertEquals(original, str(clone2))
+        self.assertIsNotNone(clone2.get_element_by_name("link"))
+        self.assertIsNone(clone2.get_element_by_name("extra"))
+        self.assertIs(clone2, clone2.get_element_by_name("link").get_parent())
+
+    def test_number_format(self):
+        """
+        Number format modes, and discarding cached renders
+        when the format changes.
+        """
+        from sdfbuilder.util import set_number_format, number_format, number_format_join, \
+            FORMAT_GENERAL, FORMAT_REPR
+
+        link = Link("link")
+        link.set_position(Vector3(0.1, 1, -0.0))
+        self.assertIn("1.000000e-01 1.000000e+00 -0.000000e+00", str(link))
+        self.assertEquals("1.000000e+00 2.500000e+00", number_format_join((1, 2.5)))
+
+        try:
+            set_number_format(FORMAT_GENERAL, 3)
+            self.assertEquals("0.123", number_format(0.12345))
+            self.assertIn("<pose>0.1 1 -0 0 -0 0</pose>", str(link))
+
+            set_number_format(FORMAT_REPR)
+            value = 1 / 3.0
+            self.assertEquals(value, float(number_format(value)))
+            self.assertEquals("0.0 1.0 0.1", number_format_join((0, 1, 0.1)))
+            self.assertRaises(ValueError, set_number_format, "unknown")
+        finally:
+            set_number_format()
+
+        self.assertIn("1.000000e-01", str(link))
+
+    def test_render_many(self):
+        """
+        Elements and recipes rendered in parallel should come back in
+        input order, and be written to disk if requested.
+        """
+        tasks = [make_model("m%d" % i, 0.1 * (i + 1)) for i in range(3)]
+        tasks += [(make_model, ("m%d" % i, 0.1 * (i + 1))) for i in range(3, 6)]
+        expected = [str(make_model("m%d" % i, 0.1 * (i + 1))) for i in range(6)]
+
+        self.assertEquals(expected, render_many(tasks, workers=2))
+        self.assertEquals(expected, render_many(tasks, workers=1))
+
+        out_dir = tempfile.mkdtemp()
+        try:
+            paths = render_many(tasks, workers=3, out_dir=out_dir, name_format="model_%d.sdf")
+            self.assertEquals(6, len(paths))
+            for path, xml in zip(paths, expected):
+                with open(path) as f:
+                    self.assertEquals(xml, f.read())
+        finally:
+            shutil.rmtree(out_dir)
+
+    def test_interning(self):
+        """
+        Identical elements should be replaced by a single frozen element,
+        without changing the render.
+        """
+        links = []
+        for i in range(3):
+            link = Link("link_%d" % i)
+            link.make_box(1.0, 0.1, 0.2, 0.3)
+            link.make_color(1, 0, 0, 1)
+            links.append(link)
+
+        model = Model("m", elements=links)
+        expected = str(model)
+        self.assertEquals(4, intern_tree(model))
+        self.assertEquals(expected, str(model))
+
+        materials = [link.elements[1].elements[0] for link in links]
+        self.assertIs(materials[0], materials[1])
+        self.assertIs(links[0].inertial, links[2].inertial)
+        self.assertIs(links[0], links[1].inertial.get_parent())
+
+        # Posables are never shared
+        self.assertIsNot(links[0].elements[0].geometry, links[1].elements[0].geometry)
+
+        with self.assertRaises(AttributeError):
+            links[1].inertial.mass = 2.0
+
+        with self.assertRaises(AttributeError):
+            materials[0].add_element(Element(tag_name="lighting", body="1"))
+
+        # Copies can be changed, and negative zero is not zero
+        positive, negative = links[1].inertial.copy(), links[1].inertial.copy()
+        positive.ixy, negative.ixy = 0.0, -0.0
+        positive, negative = intern_element(positive), intern_element(negative)
+        self.assertIsNot(positive, negative)
+        self.assertIn("<ixy>-0.000000e+00</ixy>", str(negative))
+        self.assertIs(negative, intern_element(negative.copy()))
+
+    def test_render_cache_directory(self):
+        """
+        Rendered documents should be stored by content, and the least
+        recently used ones removed when the cache grows too large.
+        """
+        calls = BuildCalls.names
+        build = build_model
+        del calls[:]
+
+        directory = tempfile.mkdtemp()
+        try:
+            cache = RenderCache(directory)
+            expected = str(make_model("m", 0.5))
+            self.assertEquals(expected, cache.build(build, "m", 0.5))
+            self.assertEquals(expected, cache.build(build, "m", size=0.5))
+            self.assertEquals(expected, RenderCache(directory).build(build, "m", size=0.5))
+            self.assertEquals(["m", "m"], calls)
+
+            self.assertEquals(element_key(make_model("m", 0.5)), element_key(make_model("m", 0.5)))
+            self.assertNotEqual(element_key(make_model("m", 0.5)), element_key(make_model("m", 0.25)))
+            self.assertEquals(expected, cache.render(make_model("m", 0.5)))
+            self.assertEquals(expected, cache.render(make_model("m", 0.5)))
+
+            # The number format is part of the key
+            set_number_format(FORMAT_GENERAL)
+            try:
+                self.assertEquals(str(make_model("m", 0.5)), cache.build(build, "m", size=0.5))
+            finally:
+                set_number_format(FORMAT_EXPONENT)
+
+            # So is the version of sdfbuilder
+            key = element_key(make_model("m", 0.5))
+            digest = sdfbuilder.cache._get_source_digest()
+            sdfbuilder.cache._source_digest = "other"
+            try:
+                self.assertNotEqual(key, element_key(make_model("m", 0.5)))
+            finally:
+                sdfbuilder.cache._source_digest = digest
+
+            entries = cache._entries()
+            self.assertEquals(4, len(entries))
+            self.assertFalse([name for _, _, names in os.walk(directory) for name in names
+                              if name.endswith('.tmp')])
+
+            # Entries get the permissions of the umask
+            umask = os.umask(0o022)
+            os.umask(umask)
+            for _, _, path in entries:
+                self.assertEquals(0o666 & ~umask, os.stat(path).st_mode & 0o777)
+
+            # Make the largest entry the least recently used, and the
+            # cache just too large to keep it.
+            entries.sort(key=lambda entry: -entry[1])
+            oldest = min(entries)[0] - 10
+            for _, _, path in entries:
+                os.utime(path, (oldest, oldest))
+                oldest += 1
+
+            cache.max_size = int((cache.get_size() - entries[0][1]) / EVICT_TO) + 1
+            self.assertEquals(1, cache.evict())
+            self.assertEquals(3, len(cache._entries()))
+
+            cache.clear()
+            self.assertEquals(0, cache.get_size())
+
+            # Element arguments are hashed by content, not by name
+            link_a, link_b = Link("body"), Link("body")
+            link_a.make_box(1.0, 1, 1, 1)
+            link_b.make_box(1.0, 2, 2, 2)
+            self.assertEquals(str(wrap_link(link_a)), cache.build(wrap_link, link_a))
+            self.assertEquals(str(wrap_link(link_b)), cache.build(wrap_link, link_b))
+
+            # Closures are part of the key
+            self.assertNotEqual(call_key(make_sized(1), ("x",)), call_key(make_sized(2), ("x",)))
+            self.assertEquals(call_key(make_sized(1), ("x",)), call_key(make_sized(1), ("x",)))
+            self.assertEquals(str(make_sized(2)("x")), cache.build(make_sized(2), "x"))
+
+            # Callables that cannot be hashed are not cached
+            del calls[:]
+            recipe = functools.partial(build_model, "m")
+            self.assertRaises(ValueError, call_key, recipe, (0.5,))
+            self.assertEquals(expected, cache.build(recipe, 0.5))
+            self.assertEquals(expected, cache.build(recipe, 0.5))
+            self.assertEquals(["m", "m"], calls)
+        finally:
+            shutil.rmtree(directory)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,10 @@
 from __future__ import absolute_import
 import math
-from sdfbuilder.math import Vector3
-from sdfbuilder import Link
+import numpy as np
+from sdfbuilder.math import Vector3, Quaternion
+from sdfbuilder import Link, Model
 import unittest
-from sdfbuilder.structure import Collision, Box
+from sdfbuilder.structure import Collision, Visual, Box, Sphere, Cylinder, CompoundGeometry, Mesh
 
 
 class TestLink(unittest.TestCase):
@@ -51,6 +52,125 @@ class TestLink(unittest.TestCase):
         link.calculate_inertial()
         self.assertEqualTensors(i1, link.inertial)
 
+    def test_aabb(self):
+        """
+        Bounding boxes of rotated primitives in local and parent frames
+        """
+        link = Link("link")
+        box = Collision("box", geometry=Box(2, 2, 4))
+        box.rotate_around(Vector3(0, 0, 1), 0.25 * math.pi)
+        link.add_element(box)
+
+        # Cylinder along the y-axis, inside a compound
+        compound = CompoundGeometry()
+        cylinder = Cylinder(1, 6)
+        cylinder.rotate_around(Vector3(1, 0, 0), 0.5 * math.pi)
+        compound.add_geometry(cylinder)
+        sphere = Sphere(0.5)
+        sphere.translate(Vector3(0, 0, 10))
+        compound.add_geometry(sphere)
+        link.add_element(Visual("visual", geometry=compound))
+
+        d = math.sqrt(2)
+        self.assertAABB(box.get_aabb(), (-1, -1, -2), (1, 1, 2))
+        self.assertAABB(box.get_aabb(parent_frame=True), (-d, -d, -2), (d, d, 2))
+        self.assertAABB(cylinder.get_aabb(parent_frame=True), (-1, -3, -1), (1, 3, 1))
+        self.assertAABB(link.get_aabb(), (-d, -3, -2), (d, 3, 10.5))
+
+        model = Model("model", elements=[link])
+        link.set_position(Vector3(1, 0, 0))
+        link.set_rotation(Quaternion.from_angle_axis(0.5 * math.pi, Vector3(0, 1, 0)))
+        self.assertAABB(link.get_aabb(), (-d, -3, -2), (d, 3, 10.5))
+        self.assertAABB(model.get_aabb(), (-1, -3, -d), (11.5, 3, d))
+        self.assertIs(model.get_aabb(), model.get_aabb())
+
+        sphere.translate(Vector3(0, 0, 1))
+        self.assertAABB(model.get_aabb(), (-1, -3, -d), (12.5, 3, d))
+
+    def test_aabb_skips_unknown_bounds(self):
+        """
+        Meshes without a local file should not be part of bounding
+        boxes, and changing a shared geometry should update them.
+        """
+        link = Link("link")
+        link.add_element(Visual("mesh", geometry=Mesh("model://robot/meshes/body.dae")))
+        self.assertIsNone(link.get_aabb())
+
+        collision, visual = link.make_box(1.0, 1, 2, 2)
+        self.assertAABB(visual.get_aabb(parent_frame=True), (-0.5, -1, -1), (0.5, 1, 1))
+        collision.translate(Vector3(1, 0, 0))
+        self.assertAABB(visual.get_aabb(parent_frame=True), (0.5, -1, -1), (1.5, 1, 1))
+        self.assertAABB(link.get_aabb(), (0.5, -1, -1), (1.5, 1, 1))
+
+    def test_find_collisions(self):
+        """
+        Overlap detection between collisions of different links
+        """
+        from sdfbuilder.physics.collision import find_collisions
+
+        def link(name, geometry, position):
+            link = Link(name)
+            link.add_element(Collision(name + "_collision", geometry=geometry))
+            link.set_position(position)
+            return link
+
+        # Touching boxes, a sphere close to a box corner and
+        # a rotated cylinder reaching into a box.
+        box1 = link("box1", Box(1, 1, 1), Vector3(0, 0, 0))
+        box2 = link("box2", Box(1, 1, 1), Vector3(1, 0, 0))
+        sphere = link("sphere", Sphere(0.5), Vector3(-0.9, 0.9, 0.9))
+        cylinder = link("cylinder", Cylinder(0.1, 2), Vector3(0, 0, 4))
+        box3 = link("box3", Box(1, 1, 1), Vector3(0, 0, 5.5))
+        model = Model("model", elements=[box1, box2, sphere, cylinder, box3])
+        self.assertEquals([], find_collisions(model))
+
+        cylinder.rotate_around(Vector3(1, 0, 0), 0.25 * math.pi)
+        self.assertEquals([], find_collisions(model))
+        cylinder.set_rotation(Quaternion())
+        cylinder.translate(Vector3(0, 0, 0.1))
+        self.assertEquals([(cylinder.elements[0], box3.elements[0])], find_collisions(model))
+
+        sphere.set_position(Vector3(-0.7, 0.7, 0.7))
+        self.assertEquals(2, len(find_collisions(model)))
+        self.assertEquals(0, len(find_collisions(model, tolerance=0.5)))
+
+        # Same link pairs are skipped unless requested
+        box1.add_element(Collision("extra", geometry=Box(1, 1, 1)))
+        self.assertEquals(3, len(find_collisions(model)))
+        self.assertEquals(4, len(find_collisions(model, same_link=True)))
+
+        # Meshes without a local file are skipped
+        box2.add_element(Collision("mesh", geometry=Mesh("model://robot/meshes/body.dae")))
+        self.assertEquals(3, len(find_collisions(model)))
+        self.assertEquals([], find_collisions(box2))
+
+    def test_gjk_near_miss(self):
+        """
+        Rotated boxes that are close but separated should not be
+        reported as overlapping when GJK stops making progress.
+        """
+        from sdfbuilder.physics.collision import _Shape, gjk_intersect
+        from sdfbuilder.math.arrays import quaternion_matrix_batch
+
+        matrices = quaternion_matrix_batch([
+            (0.4557507259110479, -0.18220315275286106, 0.2532710829128678, -0.8336348394342775),
+            (-0.49023521023505096, 0.7231616435824716, 0.44557374971533786, -0.19537325677151135)
+        ])
+        positions = [np.zeros(3), np.array([-1.2000263235844852, 0.6706575152113641, 1.4746860986603108])]
+        half_extents = [np.array([1.8187310157750338, 0.9222634759414463, 0.15455376521092196]),
+                        np.array([1.3626924383318642, 0.7571106762302624, 0.3387481875193275])]
+
+        # The boxes touch when they are about 3.5% larger
+        for scale, expected in ((1, False), (1.03, False), (1.04, True)):
+            box1, box2 = [_Shape(position, matrix, np.zeros(3), scale * extents, 0, 0)
+                          for position, matrix, extents in zip(positions, matrices, half_extents)]
+            self.assertEquals(expected, gjk_intersect(box1, box2))
+            self.assertEquals(expected, gjk_intersect(box2, box1))
+
+    def assertAABB(self, aabb, lower, upper):
+        for a, b in zip(tuple(aabb.lower) + tuple(aabb.upper), lower + upper):
+            self.assertAlmostEquals(a, b)
+
     def assertEqualTensors(self, i1, i2):
         self.assertAlmostEquals(i1.ixx, i2.ixx)
         self.assertAlmostEquals(i1.ixy, i2.ixy)
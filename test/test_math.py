@@ -2,7 +2,10 @@
 Math tests, this clearly needs more stuff.
 """
 import unittest
-from sdfbuilder.math import Quaternion
+import copy
+import pickle
+import numpy as np
+from sdfbuilder.math import Quaternion, Vector3, QuaternionArray, Vector3Array, Transform
 
 
 class TestMath(unittest.TestCase):
@@ -22,6 +25,92 @@ class TestMath(unittest.TestCase):
         self.assertAlmostEquals(-1.5707963267948968, pitch, msg="Invalid roll.")
         self.assertAlmostEquals(0, yaw, msg="Invalid yaw")
 
+    def test_vector_api(self):
+        """
+        Tests the basic vector interface of the slotted vector types.
+        """
+        v = Vector3(1, 2, 3)
+        self.assertEquals((1.0, 2.0, 3.0), tuple(v))
+        self.assertEquals(3.0, v[-1])
+        self.assertEquals((2.0, 3.0), v[1:])
+
+        v[0] = 4
+        v.y = 5
+        self.assertEquals([4.0, 5.0, 3.0], list(v.data))
+
+        w = v.copy()
+        w += Vector3(1, 1, 1)
+        w -= Vector3(0, 0, 2)
+        self.assertEquals((5.0, 6.0, 2.0), tuple(w))
+        self.assertEquals((4.0, 5.0, 3.0), tuple(v))
+        self.assertEquals((-1.0, -1.0, 1.0), tuple(v - w))
+        self.assertEquals((-1.0, -1.0, 1.0), tuple([4, 5, 3] - w))
+        self.assertTrue(np.allclose(np.array(v), [4, 5, 3]))
+
+        for clone in (copy.deepcopy(v), pickle.loads(pickle.dumps(v))):
+            self.assertIsInstance(clone, Vector3)
+            self.assertEquals(tuple(v), tuple(clone))
+
+        q = Quaternion.from_angle_axis(0.5, Vector3(1, 1, 0))
+        self.assertAlmostEquals(1.0, q.norm())
+        self.assertIsInstance(q.normalized(), Quaternion)
+        unit = q * q.inversed()
+        self.assertTrue(np.allclose(unit.data, [1, 0, 0, 0]))
+
+        q = Quaternion.from_angle_axis(0.5 * np.pi, Vector3(0, 0, 1))
+        self.assertTrue(np.allclose((q * Vector3(1, 0, 0)).data, [0, 1, 0]))
+
+    def test_batch_types(self):
+        """
+        Compares the batch operations with their single item counterparts.
+        """
+        rng = np.random.RandomState(42)
+        quats = QuaternionArray(rng.uniform(-1, 1, (20, 4)))
+        quats.normalize()
+        others = QuaternionArray(rng.uniform(-1, 1, (20, 4)))
+        vectors = Vector3Array(rng.uniform(-5, 5, (20, 3)))
+
+        q_list, o_list, v_list = quats.to_list(), others.to_list(), vectors.to_list()
+        self.assertEquals(20, len(q_list))
+        self.assertTrue(np.allclose(QuaternionArray.from_list(q_list).data, quats.data))
+
+        products = quats * others
+        rotated = quats * vectors
+        rpy = quats.get_rpy()
+        for i in range(20):
+            self.assertTrue(np.allclose(products[i].data, (q_list[i] * o_list[i]).data))
+            self.assertTrue(np.allclose(rotated[i].data, (q_list[i] * v_list[i]).data))
+            self.assertTrue(np.allclose(rpy[i], q_list[i].get_rpy()))
+            self.assertTrue(np.allclose(quats.conjugated()[i].data, q_list[i].conjugated().data))
+
+        # Round trip through roll / pitch / yaw and angle / axis
+        back = QuaternionArray.from_rpy(rpy)
+        self.assertTrue(np.allclose(back.rotate(vectors).data, rotated.data))
+
+        axis = Vector3(1, 2, 3)
+        single = QuaternionArray.from_angle_axis([0.3], axis)
+        self.assertTrue(np.allclose(single[0].data, Quaternion.from_angle_axis(0.3, axis).data))
+        self.assertTrue(np.allclose((vectors - axis).data, vectors.data - [1, 2, 3]))
+
+    def test_transform(self):
+        """
+        Tests transform composition and inversion.
+        """
+        a = Transform(Vector3(1, 2, 3), Quaternion.from_angle_axis(0.4, Vector3(0, 1, 1)))
+        b = Transform(Vector3(-1, 0, 2), Quaternion.from_rpy(0.1, 0.2, 0.3))
+        p = Vector3(0.5, -0.5, 1.5)
+
+        self.assertTrue(np.allclose(((a * b) * p).data, (a * (b * p)).data))
+        self.assertTrue(np.allclose((a.inversed() * (a * p)).data, p.data))
+        self.assertIs(a, a.inversed().inversed())
+
+        relative = b.relative_to(a)
+        self.assertIs(relative, b.relative_to(a))
+        self.assertTrue(np.allclose((a * (relative * p)).data, (b * p).data))
+
+        homogeneous = a.get_matrix().dot(list(p) + [1])
+        self.assertTrue(np.allclose(homogeneous[:3], (a * p).data))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,9 +3,12 @@ Tests a relatively complex align feature
 """
 from __future__ import absolute_import
 import unittest
-from sdfbuilder import Link
-from sdfbuilder.math import Vector3
+import itertools
+from sdfbuilder import Link, Model, PosableGroup
+from sdfbuilder.structure import Collision, Box, CompoundGeometry
+from sdfbuilder.math import Vector3, Vector3Array, Quaternion, Transform
 from math import pi, sqrt
+import numpy as np
 
 
 class TestPosable(unittest.TestCase):
@@ -38,6 +41,264 @@ class TestPosable(unittest.TestCase):
         self.assertAlmostEqual(y, -hs2)
         self.assertAlmostEqual(z, 0)
 
+    def test_batch_frame_conversion(self):
+        """
+        Converting a batch of points should be the same as converting
+        them one by one, and the rotation kernel should agree with
+        the rotation matrix.
+        """
+        link = Link("my_link")
+        link.rotate_around(Vector3(1, 2, 3), 0.7)
+        link.translate(Vector3(1, -1, 2))
+
+        points = Vector3Array(np.random.RandomState(1).uniform(-2, 2, (10, 3)))
+        in_parent = link.to_parent_frame(points)
+        back = link.to_local_frame(in_parent)
+        for i, point in enumerate(points):
+            self.assertTrue(np.allclose(in_parent[i].data, link.to_parent_frame(point).data))
+            self.assertTrue(np.allclose(back[i].data, point.data))
+
+        q = Quaternion(2, 1, -1, 0.5)
+        v = Vector3(0.3, 0.2, -4)
+        self.assertTrue(np.allclose(q.rotate(v).data, (q.get_matrix() * v).data))
+        self.assertTrue(np.allclose(Quaternion(0, 0, 0, 0).rotate(v).data, v.data))
+
+    def test_transform_cache(self):
+        """
+        The cached transform should follow pose changes.
+        """
+        link = Link("my_link")
+        transform = link.get_transform()
+        self.assertIs(transform, link.get_transform())
+
+        link.translate(Vector3(1, 0, 0))
+        self.assertIsNot(transform, link.get_transform())
+        x, y, z = link.to_parent_frame(Vector3(0, 0, 0))
+        self.assertAlmostEqual(1, x)
+
+    def test_world_pose(self):
+        """
+        World poses should compose the poses of all ancestors that
+        introduce a frame, and follow changes to those ancestors.
+        """
+        box = Box(1, 1, 1)
+        box.translate(Vector3(0, 0, 1))
+        compound = CompoundGeometry()
+        compound.add_geometry(box)
+        collision = Collision("col", Box(1, 1, 1))
+        collision.translate(Vector3(0, 1, 0))
+        compound_collision = Collision("compound", compound)
+
+        link = Link("link", elements=[collision, compound_collision])
+        link.rotate_around(Vector3(0, 0, 1), 0.5 * pi)
+        group = PosableGroup(elements=[link])
+        group.translate(Vector3(1, 0, 0))
+        model = Model("model", elements=[group])
+        model.translate(Vector3(0, 0, 5))
+
+        # Group translation was applied to the link, and does not add a frame
+        x, y, z = link.get_world_pose().position
+        self.assertTrue(np.allclose([x, y, z], [1, 0, 5]))
+
+        # Link frame is rotated by 90 degrees around z
+        x, y, z = collision.get_world_pose().position
+        self.assertTrue(np.allclose([x, y, z], [0, 0, 5]))
+        x, y, z = collision.geometry.get_world_pose().position
+        self.assertTrue(np.allclose([x, y, z], [0, 0, 5]))
+        x, y, z = box.get_world_pose().position
+        self.assertTrue(np.allclose([x, y, z], [1, 0, 6]))
+
+        model.translate(Vector3(0, 0, 1))
+        x, y, z = collision.get_world_pose().position
+        self.assertTrue(np.allclose([x, y, z], [0, 0, 6]))
+
+        # Changes other than to the poses of ancestors keep the cached transform
+        transform = collision.get_world_transform()
+        model.name = "renamed"
+        compound_collision.translate(Vector3(1, 0, 0))
+        Model("other").translate(Vector3(1, 0, 0))
+        self.assertIs(transform, collision.get_world_transform())
+
+        link.translate(Vector3(0, 0, 1))
+        self.assertIsNot(transform, collision.get_world_transform())
+        x, y, z = collision.get_world_pose().position
+        self.assertTrue(np.allclose([x, y, z], [0, 0, 7]))
+
+        # Moving to another parent
+        group.remove_elements([link])
+        Model("other", elements=[link])
+        x, y, z = collision.get_world_pose().position
+        self.assertTrue(np.allclose([x, y, z], [0, 0, 1]))
+
+    def test_lazy_group(self):
+        """
+        A lazy group should end up with the same child poses
+        as an eager group.
+        """
+        def make_group(lazy):
+            group = PosableGroup(lazy=lazy)
+            for i in range(5):
+                link = Link("link_%d" % i)
+                link.set_position(Vector3(i, 0, 1))
+                link.rotate_around(Vector3(0, 1, 0), 0.1 * i)
+                group.add_element(link)
+
+            group.add_element(Collision("col", geometry=Box(1, 1, 1)))
+            return group
+
+        eager, lazy = make_group(False), make_group(True)
+        eager_model, lazy_model = Model("m", elements=[eager]), Model("m", elements=[lazy])
+        str(lazy_model)
+        for group in (eager, lazy):
+            group.rotate_around(Vector3(1, 1, 0), 0.3 * pi)
+            group.translate(Vector3(0.5, -1, 2))
+            group.set_rotation(Quaternion.from_rpy(0.1, 0.2, 0.3))
+
+        self.assertIsNotNone(lazy._pending_transform)
+        self.assertEquals(str(eager_model), str(lazy_model))
+        self.assertIsNone(lazy._pending_transform)
+
+        for group in (eager, lazy):
+            group.translate(Vector3(1, 2, 3))
+
+        link = lazy.elements[1]
+        lazy.remove_elements([link])
+        self.assertIsNone(lazy._pending_transform)
+        self.assertTrue(np.allclose(tuple(eager.elements[1].get_position()), tuple(link.get_position())))
+        self.assertTrue(np.allclose(tuple(eager.elements[0].get_world_pose().position),
+                                    tuple(lazy.elements[0].get_world_pose().position)))
+
+    def test_nested_lazy_groups(self):
+        """
+        Posables in nested lazy groups should be moved by the
+        pending transforms of all their groups.
+        """
+        def make_groups(lazy):
+            outer = group = PosableGroup(lazy=lazy)
+            for i in range(3):
+                inner = PosableGroup(lazy=lazy)
+                group.add_element(inner)
+                group = inner
+
+            link = Link("link")
+            link.set_position(Vector3(1, 0, 0))
+            group.add_element(link)
+            return outer, link
+
+        (eager, eager_link), (lazy, lazy_link) = make_groups(False), make_groups(True)
+        for group in (eager, lazy):
+            group.rotate_around(Vector3(0, 0, 1), 0.5 * pi)
+            group.translate(Vector3(0, 0, 1))
+
+        self.assertTrue(np.allclose([0, 1, 1], tuple(eager_link.get_world_pose().position)))
+        self.assertTrue(np.allclose([0, 1, 1], tuple(lazy_link.get_world_pose().position)))
+        self.assertTrue(np.allclose([0, 1, 1], tuple(lazy_link.get_position())))
+
+        for group in (eager, lazy):
+            group.rotate_around(Vector3(0, 0, 1), 0.5)
+
+        self.assertTrue(np.allclose(tuple(eager.elements[-1].get_position()),
+                                    tuple(lazy.elements[-1].get_position())))
+
+    def test_lazy_group_geometries(self):
+        """
+        Geometries further down a lazy group should be moved by its
+        pending transform in bounding boxes and overlap tests.
+        """
+        from sdfbuilder.physics.collision import find_collisions
+
+        # A link in a group, and a collision directly in a group
+        model = Model("model")
+        link_group = PosableGroup(lazy=True)
+        moved = Link("moved")
+        moved.make_box(1.0, 1, 1, 1)
+        link_group.add_element(moved)
+        other = Link("other")
+        other.make_box(1.0, 1, 1, 1)
+        other.set_position(Vector3(5.5, 0, 0))
+        model.add_elements([link_group, other])
+
+        link = Link("link")
+        structure_group = PosableGroup(lazy=True)
+        collision = Collision("collision", Box(1, 1, 1))
+        structure_group.add_element(collision)
+        fixed = Collision("fixed", Box(1, 1, 1))
+        fixed.set_position(Vector3(5.5, 0, 0))
+        link.add_elements([structure_group, fixed])
+
+        geometries = [moved.get_elements_of_type(Collision)[0].geometry, collision.geometry]
+        for root, group, geometry in ((model, link_group, geometries[0]),
+                                      (link, structure_group, geometries[1])):
+            self.assertEqual([], find_collisions(root, same_link=True))
+            self.assertAlmostEqual(-0.5, root.get_aabb().lower.x)
+
+            group.translate(Vector3(5, 0, 0))
+            self.assertTrue(np.allclose([5, 0, 0], tuple(geometry.get_world_pose().position)))
+            self.assertAlmostEqual(4.5, root.get_aabb().lower.x)
+            self.assertEqual(1, len(find_collisions(root, same_link=True)))
+
+            group.translate(Vector3(-5, 0, 0))
+            self.assertEqual([], find_collisions(root, same_link=True))
+            self.assertAlmostEqual(-0.5, root.get_aabb().lower.x)
+            self.assertAlmostEqual(-0.5, group.get_aabb(parent_frame=True).lower.x)
+
+    def test_group_transform_batch(self):
+        """
+        Moving nested groups should transform every posable inside
+        them as if it was moved separately, for any mix of eager and
+        lazy groups.
+        """
+        for lazy in itertools.product([False, True], repeat=3):
+            outer, middle, inner = [PosableGroup(lazy=flag) for flag in lazy]
+            middle.add_element(inner)
+            outer.add_element(middle)
+            model = Model("model", elements=[outer])
+
+            groups = [outer, middle, inner]
+            links = []
+            for i in range(9):
+                link = Link("link_%d" % i)
+                link.set_position(Vector3(i, 0.5 * i, -i))
+                link.rotate_around(Vector3(1, 2, 3), 0.2 * i)
+                groups[i % 3].add_element(link)
+                links.append(link)
+
+            inner.set_position(Vector3(0.5, 0, 0))
+            middle.set_position(Vector3(0, 1, 0))
+            expected = [Transform(link.get_position(), link.get_rotation()) for link in links]
+
+            def move(transform, moved):
+                for index in moved:
+                    expected[index] = transform * expected[index]
+
+            # Move the outer group, every link is moved
+            position = Vector3(1, 2, 3)
+            move(Transform(position), range(9))
+            outer.set_position(position)
+
+            rotation = Quaternion.from_rpy(0.1, 0.2, 0.3)
+            move(Transform(position - rotation * position, rotation), range(9))
+            outer.set_rotation(rotation)
+
+            # Rotate the middle group around its (moved) root, which
+            # moves the links in the middle and inner groups.
+            root = middle.get_position()
+            relative = Quaternion.from_angle_axis(0.4, Vector3(0, 0, 1))
+            move(Transform(root - relative * root, relative), [i for i in range(9) if i % 3])
+            middle.set_rotation(relative * middle.get_rotation())
+
+            move(Transform(Vector3(0, 0, -1)), range(9))
+            outer.translate(Vector3(0, 0, -1))
+
+            for link, transform in zip(links, expected):
+                pose = link.get_world_pose()
+                self.assertTrue(np.allclose(tuple(transform.position), tuple(pose.position)), lazy)
+                self.assertTrue(np.allclose(tuple(transform.rotation), tuple(pose.rotation)) or
+                                np.allclose(tuple(transform.rotation), tuple(-pose.rotation)), lazy)
+
+            str(model)
+            self.assertTrue(np.allclose(tuple(expected[8].position), tuple(links[8].get_position())))
+
     def test_complex_align(self):
         """
         Create a structure with some complicated rotation /
@@ -80,5 +341,60 @@ class TestPosable(unittest.TestCase):
         self.assertAlmostEqual(pitch, 0.24650585550379217, msg="Incorrect pitch.")
         self.assertAlmostEqual(yaw, 1.2199169159226388, msg="Incorrect yaw.")
 
+    def test_pose_render_pass(self):
+        """
+        Rendering a tree should convert all pose rotations at once,
+        and changing a rotation should discard the converted values.
+        """
+        links = []
+        for i in range(4):
+            link = Link("link_%d" % i)
+            link.set_rotation(Quaternion.from_rpy(0.1 * i, -0.2, 0.3 + i))
+            links.append(link)
+
+        model = Model("m", elements=links)
+        str(model)
+        for link in links:
+            rpy = link._pose._rpy
+            self.assertIsNotNone(rpy)
+            self.assertTrue(np.allclose(rpy, link.get_rotation().get_rpy()))
+
+        links[0].set_rotation(Quaternion.from_rpy(0.5, 0, 0))
+        self.assertIsNone(links[0]._pose._rpy)
+        self.assertTrue(np.allclose(links[0]._pose.get_rpy(), (0.5, 0, 0)))
+
+    def test_pose_render_order(self):
+        """
+        Poses should render the same whether they are converted
+        on their own or together with the rest of the tree.
+        """
+        from sdfbuilder.util import set_number_format, FORMAT_EXPONENT, FORMAT_REPR
+
+        def make_model():
+            rng = np.random.RandomState(3)
+            links = []
+            for i in range(500):
+                link = Link("link_%d" % i)
+                link.set_rotation(Quaternion(*rng.randn(4)).normalized())
+                links.append(link)
+
+            # Nearly a half turn around z, for which `Quaternion.get_rpy`
+            # and the batch conversion give a different yaw.
+            links[0].set_rotation(Quaternion(-1.416206960165671, -0.18724228519551347,
+                                             -0.913623038725002, 0.12079369074568488))
+            return Model("model", elements=links)
+
+        try:
+            for mode in (FORMAT_EXPONENT, FORMAT_REPR):
+                set_number_format(mode)
+                together = str(make_model())
+                model = make_model()
+                for link in model.elements:
+                    str(link)
+
+                self.assertEquals(together, str(model))
+        finally:
+            set_number_format()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests reading SDF documents back into element trees
+"""
+from __future__ import absolute_import
+import unittest
+from io import BytesIO
+from math import pi
+from sdfbuilder import Element, SDF, Model, Link
+from sdfbuilder.joint import Joint
+from sdfbuilder.math import Vector3
+from sdfbuilder.structure import Collision, Visual, Box, Mesh
+from sdfbuilder.reader import parse, parse_string, iterparse_elements
+
+WORLD = """<?xml version="1.0"?>
+<sdf version="1.5">
+  <world name="default">
+    <light name="sun" type="directional"><cast_shadows>1</cast_shadows></light>
+    <model name="first">
+      <link name="link">
+        <collision name="col">
+          <geometry><plane><normal>0 0 1</normal></plane></geometry>
+        </collision>
+        <visual name="vis">
+          <pose>0 0 1 0 0 0</pose>
+          <geometry><mesh><uri>model://first/a.stl</uri><scale>1 2 3</scale></mesh></geometry>
+        </visual>
+      </link>
+      <plugin name="p" filename="libp.so"><topic>a &amp; b</topic></plugin>
+    </model>
+    <model name="second"><static>true</static></model>
+  </world>
+</sdf>"""
+
+
+class TestReader(unittest.TestCase):
+    def test_round_trip(self):
+        """
+        A document rendered by sdfbuilder should render identically
+        after reading it, and be read into the right classes.
+        """
+        link1 = Link("link1")
+        link1.make_box(1.0, 0.1, 0.2, 0.3)
+        link2 = Link("link2")
+        link2.make_box(1.0, 0.1, 0.2, 0.3)
+        link2.set_position(Vector3(0, 0, 0.3))
+        link2.rotate_around(Vector3(0, 1, 0), 0.5 * pi)
+        joint = Joint("revolute", link1, link2, axis=Vector3(0, 1, 0))
+        sdf = SDF(elements=[Model("robot", elements=[link1, link2, joint])])
+        xml = str(sdf)
+
+        read = parse_string(xml)
+        self.assertIsInstance(read, SDF)
+        self.assertEquals(xml, str(read))
+
+        model = read.elements[0]
+        self.assertIsInstance(model, Model)
+        read_link1, read_link2 = model.get_elements_of_type(Link)
+        self.assertIsInstance(read_link1.inertial.mass, float)
+        self.assertIsInstance(read_link1.get_elements_by_name("collision")[0].geometry, Box)
+
+        read_joint = model.get_joints()[0]
+        self.assertIs(read_link1, read_joint.parent)
+        self.assertIs(read_link2, read_joint.child)
+
+        # Changed poses are rendered from their rotation
+        read_link2.set_position(Vector3(0, 0, 1))
+        self.assertIn("<pose>0.000000e+00 0.000000e+00 1.000000e+00", str(read))
+
+    def test_generic_elements(self):
+        """
+        Unknown tags, and known tags that their class cannot represent,
+        should be read as plain elements.
+        """
+        sdf = parse(BytesIO(WORLD))
+        world = sdf.elements[0]
+        self.assertIs(Element, type(world))
+        self.assertEquals("world", world.get_tag_name())
+
+        first, second = world.get_elements_of_type(Model)
+        self.assertTrue(second.static)
+        self.assertIn("<topic>a &amp; b</topic></plugin>", str(first))
+
+        link = first.elements[0]
+        self.assertIs(Element, type(link.elements[0]))
+        visual = link.elements[1]
+        self.assertIsInstance(visual, Visual)
+        self.assertIsInstance(visual.geometry, Mesh)
+        self.assertEquals((1.0, 2.0, 3.0), visual.geometry.scale)
+        self.assertEquals((0, 0, 1), tuple(visual.get_position()))
+
+        self.assertEquals(str(sdf), str(parse_string(str(sdf))))
+
+    def test_iterparse_elements(self):
+        """
+        Only the requested elements should be read, one at a time.
+        """
+        models = list(iterparse_elements(BytesIO(WORLD)))
+        self.assertEquals(["first", "second"], [model.name for model in models])
+        self.assertIsNone(models[0].get_parent())
+
+        collisions = list(iterparse_elements(BytesIO(WORLD), tags=('collision', 'visual')))
+        self.assertEquals(["collision", "visual"], [el.get_tag_name() for el in collisions])
+        self.assertNotIsInstance(collisions[0], Collision)
+
+    def test_mixed_content(self):
+        """
+        Text around child elements should be kept in document order.
+        """
+        xml = '<sdf version="1.5"><light name="l">a &amp; <diffuse>1 1 1 1</diffuse>b\n' \
+              '<cast_shadows>1</cast_shadows> c </light><model name="m"><static>1</static></model></sdf>'
+        sdf = parse_string(xml)
+        light, model = sdf.elements
+        self.assertIs(Element, type(light))
+        self.assertEquals('<light name="l">a &amp; <diffuse>1 1 1 1</diffuse>b\n'
+                          '<cast_shadows>1</cast_shadows> c </light>', str(light))
+        self.assertIsInstance(model, Model)
+        self.assertEquals(str(sdf), str(parse_string(str(sdf))))
+
+        models = list(iterparse_elements(BytesIO(xml)))
+        self.assertEquals(["m"], [m.name for m in models])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,16 @@
 from __future__ import absolute_import
 import unittest
 import math
-from sdfbuilder.math import Vector3
-from sdfbuilder.structure.geometries import Box, CompoundGeometry
+import os
+import shutil
+import tempfile
+import numpy as np
+from sdfbuilder import Link
+from sdfbuilder.math import Vector3, Quaternion
+from sdfbuilder.physics.inertial import transform_inertia_tensor, combine_inertia_tensors
+from sdfbuilder.physics.mesh import STL_DTYPE, clear_mesh_cache, load_triangles, \
+    calculate_properties, get_mesh_bounds
+from sdfbuilder.structure.geometries import Box, CompoundGeometry, Mesh
 
 
 class TestGeometry(unittest.TestCase):
@@ -131,6 +139,62 @@ class TestGeometry(unittest.TestCase):
         i2 = compound.get_inertial()
         self.assertEqualTensors(i1, i2)
 
+    def test_combine_inertia_tensors(self):
+        """
+        The batched inertia combination should match summing
+        `transform_inertia_tensor` results.
+        """
+        boxes = [Box(1, 2, 3, mass=2), Box(4, 1, 1, mass=0.5), Box(2, 2, 2, mass=3)]
+        displacements = [Vector3(1, 0, 0), Vector3(0.5, -2, 1), Vector3(0, 0, 0)]
+        rotations = [Quaternion(), Quaternion.from_angle_axis(0.3, Vector3(1, 1, 0)),
+                     Quaternion.from_rpy(0.1, 0.2, 0.3)]
+
+        expected = sum(transform_inertia_tensor(box.get_mass(), box.get_inertial().get_matrix(), d, r)
+                       for box, d, r in zip(boxes, displacements, rotations))
+        actual = combine_inertia_tensors(
+            [box.get_mass() for box in boxes],
+            [box.get_inertial().get_matrix() for box in boxes],
+            [tuple(d) for d in displacements],
+            [tuple(r) for r in rotations]
+        )
+        self.assertTrue(np.allclose(expected, actual))
+        self.assertTrue(np.allclose(np.zeros((3, 3)), combine_inertia_tensors([], [], [], [])))
+
+    def test_mass_property_cache(self):
+        """
+        Cached mass properties should be recalculated when
+        the geometries change.
+        """
+        compound = CompoundGeometry()
+        sub1 = Box(1, 1, 1, mass=1)
+        sub2 = Box(1, 1, 1, mass=1)
+        sub2.translate(Vector3(2, 0, 0))
+        compound.add_geometry(sub1)
+        compound.add_geometry(sub2)
+
+        self.assertAlmostEquals(compound.get_center_of_mass().x, 1)
+        self.assertAlmostEquals(compound.get_inertial().iyy, 2 * (1 / 6.0 + 1))
+
+        # Returned values are new objects, changing them does not change the cache
+        inertial = compound.get_inertial()
+        self.assertIsNot(inertial, compound.get_inertial())
+        inertial.iyy = 0
+        compound.get_center_of_mass().x = 5
+        Link("link").inertial = compound.get_inertial()
+        self.assertAlmostEquals(compound.get_inertial().iyy, 2 * (1 / 6.0 + 1))
+        self.assertAlmostEquals(compound.get_center_of_mass().x, 1)
+        self.assertIsNone(compound.get_inertial().get_parent())
+
+        sub2.translate(Vector3(2, 0, 0))
+        self.assertAlmostEquals(compound.get_center_of_mass().x, 2)
+
+        sub1.size = (2, 1, 1)
+        self.assertAlmostEquals(sub1.get_inertial().izz, 5 / 12.0)
+
+        compound.add_geometry(Box(1, 1, 1, mass=2))
+        self.assertAlmostEquals(compound.get_mass(), 4)
+        self.assertAlmostEquals(compound.get_center_of_mass().x, 1)
+
     def assertEqualTensors(self, i1, i2):
         self.assertAlmostEquals(i1.ixx, i2.ixx)
         self.assertAlmostEquals(i1.ixy, i2.ixy)
@@ -138,5 +202,124 @@ class TestGeometry(unittest.TestCase):
         self.assertAlmostEquals(i1.iyy, i2.iyy)
         self.assertAlmostEquals(i1.iyy, i2.iyy)
 
+
+def box_triangles(x, y, z, offset):
+    """
+    Returns the outward facing triangles of a box
+    centered at the given offset.
+    """
+    corners = np.array([[i, j, k] for i in (-1, 1) for j in (-1, 1) for k in (-1, 1)], dtype=float)
+    corners = 0.5 * corners * (x, y, z) + offset
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return corners[np.array(faces)]
+
+
+class TestMesh(unittest.TestCase):
+    """
+    Tests mesh mass properties
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.triangles = box_triangles(1, 2, 3, (1, 0, -1))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        clear_mesh_cache()
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def assertBoxProperties(self, mesh, x, y, z, offset):
+        box = Box(x, y, z, mass=mesh.get_mass())
+        self.assertTrue(np.allclose(box.get_inertial().get_matrix(),
+                                    mesh.get_inertial().get_matrix()))
+        self.assertTrue(np.allclose(offset, tuple(mesh.get_center_of_mass())))
+
+    def test_formats(self):
+        """
+        Binary STL, ASCII STL and OBJ files of a box should
+        give the box mass properties.
+        """
+        records = np.zeros(len(self.triangles), dtype=STL_DTYPE)
+        records['vertices'] = self.triangles
+        binary = self.write("binary.stl", b"\0" * 80 + np.uint32(len(records)).tobytes() + records.tobytes())
+
+        facets = "".join("facet normal 0 0 0\nouter loop\n%s\nendloop\nendfacet\n" %
+                         "\n".join("vertex %r %r %r" % tuple(v) for v in t) for t in self.triangles)
+        ascii = self.write("ascii.stl", "solid box\n%sendsolid box\n" % facets)
+
+        # Write the OBJ with quads and negative indices
+        vertices = "".join("v %r %r %r\n" % tuple(v) for v in self.triangles.reshape(-1, 3))
+        faces = "".join("f %d %d %d\n" % (3 * i + 1, 3 * i + 2, 3 * i + 3)
+                        for i in range(len(self.triangles) - 2))
+        obj = self.write("box.obj", vertices + faces + "f -6/1 -5/2/1 -4\nf -3 -2 -1\n")
+
+        for path in (binary, ascii, obj):
+            mesh = Mesh("model://box/meshes/box", path=path, mass=3.0)
+            self.assertAlmostEquals(mesh.get_mesh_properties().volume, 6)
+            self.assertBoxProperties(mesh, 1, 2, 3, (1, 0, -1))
+
+    def test_scale_density(self):
+        """
+        Mass from density and scaled meshes
+        """
+        records = np.zeros(len(self.triangles), dtype=STL_DTYPE)
+        records['vertices'] = self.triangles
+        path = self.write("box.stl", b"\0" * 80 + np.uint32(len(records)).tobytes() + records.tobytes())
+
+        mesh = Mesh(path, scale=(2, 1, 0.5), density=2.0)
+        self.assertAlmostEquals(mesh.get_mass(), 12)
+        self.assertBoxProperties(mesh, 2, 2, 1.5, (2, 0, -0.5))
+
+        mesh.scale = 2
+        self.assertAlmostEquals(mesh.get_mass(), 96)
+        self.assertBoxProperties(mesh, 2, 4, 6, (2, 0, -2))
+
+    def test_binary_stl(self):
+        """
+        Binary STL files are memory mapped and reduced in chunks
+        """
+        records = np.zeros(len(self.triangles), dtype=STL_DTYPE)
+        records['vertices'] = self.triangles
+        path = self.write("box.stl", b"\0" * 80 + np.uint32(len(records)).tobytes() + records.tobytes())
+
+        triangles = load_triangles(path)
+        self.assertIsInstance(triangles.base, np.memmap)
+        self.assertIs(triangles, load_triangles(path))
+
+        chunked = calculate_properties(triangles, chunk_size=5)
+        self.assertAlmostEquals(chunked.volume, 6)
+        self.assertTrue(np.allclose(calculate_properties(self.triangles).covariance, chunked.covariance))
+
+        lower, upper = get_mesh_bounds(path, scale=(1, -2, 1))
+        self.assertTrue(np.allclose(lower, (0.5, -2, -2.5)))
+        self.assertTrue(np.allclose(upper, (1.5, 2, 0.5)))
+
+    def test_link_inertia(self):
+        """
+        Link inertials of meshes with their center of mass away from
+        the mesh origin should be taken around the link origin.
+        """
+        records = np.zeros(12, dtype=STL_DTYPE)
+        records['vertices'] = box_triangles(1, 1, 1, (0.5, 0.5, 0.5))
+        path = self.write("cube.stl", b"\0" * 80 + np.uint32(len(records)).tobytes() + records.tobytes())
+
+        # Around the mesh origin, which is a corner of the cube
+        corner = transform_inertia_tensor(1.0, Box(1, 1, 1, mass=1.0).get_inertial().get_matrix(),
+                                          Vector3(0.5, 0.5, 0.5), Quaternion())
+        made = Link("made")
+        made.make_geometry(Mesh(path, path=path, mass=1.0), visual=False)
+        self.assertTrue(np.allclose(corner, made.inertial.get_matrix()))
+
+        # Around the center of mass once it is aligned with the link origin
+        made.align_center_of_mass()
+        made.calculate_inertial()
+        self.assertTrue(np.allclose(np.eye(3) / 6.0, made.inertial.get_matrix()))
+
+
 if __name__ == '__main__':
     unittest.main()